@@ -0,0 +1,273 @@
+from bisect import bisect_left
+from heapq import merge
+from itertools import chain
+from document_index import DocumentIndex, fold
+
+# ---------------------
+# Extração Estruturada de Endereço
+# ---------------------
+
+# O endereço é procurado nos tokens do DocumentIndex: os tipos de logradouro são
+# localizados pelo mapa de posições do índice e, a partir de cada candidato,
+# apenas alguns tokens à frente são examinados, o que mantém o custo linear.
+
+# Mapeamento de tipos de logradouro
+STREET_TYPE_MAP = {
+    'rua': 'Rua',
+    'r.': 'Rua',
+    'r': 'Rua',
+    'avenida': 'Avenida',
+    'av.': 'Avenida',
+    'av': 'Avenida',
+    'alameda': 'Alameda',
+    'al.': 'Alameda',
+    'al': 'Alameda',
+    'travessa': 'Travessa',
+    'tv.': 'Travessa',
+    'tv': 'Travessa',
+    'praça': 'Praça',
+    'pça.': 'Praça',
+    'pça': 'Praça',
+    'servidão': 'Servidão',
+    'servid': 'Servidão',
+    'sv.': 'Servidão',
+    'sv': 'Servidão'
+}
+
+# Indicadores de número (nº, n°, no, número)
+NUMBER_MARKERS = {'n', 'n.', 'no', 'no.', 'nº', 'nº.', 'numero', 'num', 'num.'}
+NUMBER_MARKER_PUNCT = {'°', 'º', ':', '.'}
+
+# Palavras que iniciam um complemento
+COMPLEMENT_WORDS = {
+    'apto', 'apto.', 'apt', 'apt.', 'ap', 'ap.', 'apartamento', 'casa', 'bloco', 'bl', 'bl.',
+    'sala', 'sl', 'sl.', 'conjunto', 'cj', 'cj.', 'lote', 'lt', 'lt.', 'quadra', 'qd', 'qd.',
+    'andar', 'fundos', 'loja', 'box'
+}
+
+# Rótulos de campos do endereço
+NEIGHBORHOOD_LABELS = {'bairro'}
+CITY_LABELS = {'cidade', 'municipio'}
+CEP_LABELS = {'cep'}
+FIELD_LABELS = NEIGHBORHOOD_LABELS | CITY_LABELS | CEP_LABELS
+
+# Siglas dos estados
+STATES = {
+    'AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT', 'MS', 'MG', 'PA',
+    'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO'
+}
+
+# Separadores entre as partes do endereço
+SEPARATORS = {',', '-', '–', '/', ';', '|'}
+
+# Limites de tokens examinados para o nome da rua e para o restante do endereço,
+# o que mantém o custo por logradouro candidato constante
+MAX_STREET_WORDS = 8
+MAX_TAIL_TOKENS = 40
+
+# Número máximo de palavras de um bairro ou cidade sem rótulo
+MAX_PLACE_WORDS = 6
+
+# Formas do tipo de logradouro aceitas no texto (sem acentos); abreviações de
+# até duas letras só são aceitas com ponto para não confundir com outras palavras
+STREET_TYPE_TOKENS = {
+    fold(key): value for key, value in STREET_TYPE_MAP.items()
+    if key.endswith('.') or len(key) > 2
+}
+# Chaves do índice (sem o ponto final) dos tipos de logradouro
+STREET_TYPE_KEYS = {key.rstrip('.') for key in STREET_TYPE_TOKENS}
+
+def is_cep_at(tokens, i, bare=True):
+    """Retorna quantos tokens formam um CEP a partir da posição i (0 se não houver CEP).
+
+    Com bare=False, oito dígitos seguidos não são aceitos, apenas o formato
+    XXXXX-XXX: sem rótulo, eles podem ser datas ou números de documentos.
+    """
+    kind, value = tokens[i][:2]
+    if kind != "number":
+        return 0
+    if len(value) == 8:
+        return 1 if bare else 0
+    if (len(value) == 5 and i + 2 < len(tokens) and tokens[i + 1][1] in ('-', '.')
+            and (bare or tokens[i + 1][1] == '-')
+            and tokens[i + 2][0] == "number" and len(tokens[i + 2][1]) == 3):
+        return 3
+    return 0
+
+def find_cep(index, start=0):
+    """Encontra o CEP: o que segue um rótulo CEP ou, sem rótulo, o primeiro no formato XXXXX-XXX.
+
+    Sem rótulo, o CEP é procurado primeiro no trecho do endereço (MAX_TAIL_TOKENS
+    tokens a partir do token start) e depois no restante do texto.
+    """
+    tokens = index.tokens
+    for i in index.find("cep"):
+        j = next_number(tokens, i + 1)
+        if j is not None and is_cep_at(tokens, j):
+            return cep_text(tokens, j)
+    end = min(start + MAX_TAIL_TOKENS, len(tokens))
+    for i in chain(range(start, end), range(start), range(end, len(tokens))):
+        if is_cep_at(tokens, i, bare=False):
+            return cep_text(tokens, i)
+    return None
+
+def cep_text(tokens, i):
+    """Formata o CEP que começa no token i como XXXXX-XXX."""
+    digits = tokens[i][1] if len(tokens[i][1]) == 8 else tokens[i][1] + tokens[i + 2][1]
+    return f"{digits[:5]}-{digits[5:]}"
+
+def find_street(index):
+    """Procura o primeiro logradouro seguido de nome e número.
+
+    Os candidatos vêm do mapa de posições do índice e cada um examina no máximo
+    alguns tokens à frente. Retorna (tipo, nome, número, posição do token após
+    o número) ou None.
+    """
+    candidates = merge(*(index.find(key) for key in STREET_TYPE_KEYS))
+    for start in candidates:
+        tokens = index.tokens[start:start + MAX_STREET_WORDS + 5]
+        if tokens[0][2] not in STREET_TYPE_TOKENS:
+            continue
+        count = len(tokens)
+
+        # Nome da rua: palavras até vírgula, número ou indicador de número
+        j = 1
+        name = []
+        while j < count and len(name) < MAX_STREET_WORDS:
+            token = tokens[j]
+            if token[0] == "word":
+                if token[2] in NUMBER_MARKERS and next_number(tokens, j + 1) is not None:
+                    break
+                name.append(token)
+            elif token[1] == "'":
+                name.append(token)
+            else:
+                break
+            j += 1
+        if not name:
+            continue
+
+        # Número: após vírgula opcional e indicador de número opcional
+        if j < count and tokens[j][1] == ',':
+            j += 1
+        if j < count and tokens[j][2] in NUMBER_MARKERS:
+            j += 1
+        number_index = next_number(tokens, j)
+        if number_index is None:
+            continue
+        return STREET_TYPE_TOKENS[tokens[0][2]], segment_text(name).strip("."), tokens[number_index][1], start + number_index + 1
+    return None
+
+def next_number(tokens, j):
+    """Retorna a posição do número em j, ignorando pontuação de indicador de número, ou None."""
+    while j < len(tokens) and tokens[j][0] == "punct" and tokens[j][1] in NUMBER_MARKER_PUNCT:
+        j += 1
+    if j < len(tokens) and tokens[j][0] == "number":
+        return j
+    return None
+
+def split_segments(tokens, breaks=()):
+    """Divide os tokens após o número em segmentos separados por vírgula, hífen, barra, rótulo ou quebra de linha.
+
+    breaks são as posições (em tokens) em que uma nova linha começa. O CEP é
+    tratado como um único token, para que seu hífen não seja considerado separador.
+    """
+    segments = [[]]
+    i = 0
+    while i < len(tokens):
+        if i in breaks:
+            # Uma quebra de linha separa, por exemplo, o bairro da cidade na linha seguinte
+            segments.append([])
+        size = is_cep_at(tokens, i)
+        if size:
+            segments.append([("cep", "", "", tokens[i][3])])
+            segments.append([])
+            i += size
+            continue
+        kind, value, folded = tokens[i][:3]
+        if kind == "punct" and value in SEPARATORS:
+            segments.append([])
+        elif folded in FIELD_LABELS:
+            # Um rótulo (Bairro, Cidade, CEP) inicia um novo segmento
+            segments.append([tokens[i]])
+        elif kind != "punct" or value in (".", "'"):
+            segments[-1].append(tokens[i])
+        i += 1
+    return segments
+
+def segment_text(segment):
+    """Junta os tokens de um segmento em texto."""
+    return ' '.join(token[1] for token in segment).replace(" .", ".").replace(" ' ", "'").strip() or None
+
+def parse_address(document):
+    """Extrai os campos estruturados do primeiro endereço do texto, em tempo linear.
+
+    Aceita o texto ou o DocumentIndex do documento. Retorna um dicionário com
+    street_type, street, number, complement, cep, neighborhood, city e state
+    (campos não encontrados ficam como None), ou None se não houver logradouro com número.
+    """
+    index = DocumentIndex.of(document)
+    street = find_street(index)
+    if street is None:
+        return None
+    street_type, street_name, number, end = street
+
+    address = {
+        "street_type": street_type,
+        "street": street_name,
+        "number": number,
+        "complement": None,
+        "cep": find_cep(index, end),
+        "neighborhood": None,
+        "city": None,
+        "state": None
+    }
+
+    limit = end + MAX_TAIL_TOKENS
+    line_starts = index.line_starts
+    breaks = set()
+    for line in range(bisect_left(line_starts, end), len(line_starts)):
+        if line_starts[line] >= limit:
+            break
+        breaks.add(line_starts[line] - end)
+    segments = split_segments(index.tokens[end:limit], breaks)
+    places = []
+    for position, segment in enumerate(segments):
+        if not segment or segment[0][0] == "cep":
+            continue
+        label = segment[0][2]
+        if label in NEIGHBORHOOD_LABELS:
+            address["neighborhood"] = segment_text(segment[1:])
+        elif label in CITY_LABELS:
+            address["city"] = segment_text(segment[1:])
+        elif label in CEP_LABELS:
+            continue
+        elif position == 0:
+            # Texto logo após o número, sem separador: só é usado se for um complemento
+            if label in COMPLEMENT_WORDS:
+                address["complement"] = segment_text(segment)
+        elif address["complement"] is None and not places and label in COMPLEMENT_WORDS:
+            address["complement"] = segment_text(segment)
+        elif len(segment) == 1 and segment[0][1] in STATES:
+            # Sigla do estado: o segmento anterior é a cidade
+            address["state"] = segment[0][1]
+            if address["city"] is None and places:
+                address["city"] = segment_text(places.pop())
+            break
+        elif is_place(segment):
+            places.append(segment)
+        else:
+            # Texto que não faz parte do endereço (valores, datas etc.)
+            break
+
+    if address["neighborhood"] is None and places:
+        address["neighborhood"] = segment_text(places[0])
+    return address
+
+def is_place(segment):
+    """Verifica se o segmento parece um nome de bairro ou cidade (poucas palavras, sem números)."""
+    return len(segment) <= MAX_PLACE_WORDS and all(token[0] == "word" or token[1] == "'" for token in segment)
+
+def format_address(address):
+    """Formata o logradouro como "Tipo Nome, Número"."""
+    return f"{address['street_type']} {address['street']}, {address['number']}"
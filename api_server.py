@@ -0,0 +1,315 @@
+import argparse
+import base64
+import binascii
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+from email.parser import BytesFeedParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from verification import (
+    API_WORKERS, API_MAX_CONCURRENT, API_QUEUE_TIMEOUT, API_MAX_REQUEST_BYTES, API_READ_TIMEOUT,
+    preload_modules, start_warmup, readiness, verify_submission
+)
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# API HTTP de Verificação
+# ---------------------
+
+IMAGE_KEYS = ("document", "residence", "selfie")
+TEXT_KEYS = ("name", "cpf")
+
+# Tamanho dos blocos lidos do corpo da requisição
+READ_CHUNK_SIZE = 64 * 1024
+
+# Campos do resultado da verificação devolvidos pela API (os textos completos dos documentos não são devolvidos)
+RESULT_KEYS = ("name", "cpf", "face", "address", "errors", "findings", "stages", "duplicates", "images")
+
+class RequestError(Exception):
+    """Erro da requisição, respondido ao cliente com o status HTTP e a mensagem informados."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def read_chunks(rfile, length):
+    """Lê length bytes do corpo da requisição em blocos de READ_CHUNK_SIZE."""
+    remaining = length
+    while remaining > 0:
+        chunk = rfile.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise RequestError(400, "Corpo da requisição incompleto")
+        remaining -= len(chunk)
+        yield chunk
+
+def parse_multipart(content_type, chunks):
+    """Lê um corpo multipart/form-data, entregando cada bloco ao parser à medida que chega.
+
+    Retorna {campo: bytes} com o conteúdo de cada parte.
+    """
+    parser = BytesFeedParser()
+    parser.feed(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n")
+    for chunk in chunks:
+        parser.feed(chunk)
+    message = parser.close()
+    if not message.is_multipart():
+        raise RequestError(400, "Corpo multipart inválido")
+
+    fields = {}
+    for part in message.get_payload():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = part.get_payload(decode=True) or b""
+    return fields
+
+def decode_base64_image(value):
+    """Decodifica uma imagem em base64, aceitando também o formato data:<tipo>;base64,<dados>."""
+    if value.startswith("data:") and "," in value:
+        value = value.split(",", 1)[1]
+    return base64.b64decode(value, validate=True)
+
+def parse_json(chunks):
+    """Lê um corpo JSON com as imagens em base64 e retorna {campo: valor}, com as imagens já decodificadas."""
+    body = bytearray()
+    for chunk in chunks:
+        body.extend(chunk)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise RequestError(400, "JSON inválido")
+    if not isinstance(payload, dict):
+        raise RequestError(400, "O corpo JSON deve ser um objeto")
+
+    fields = {key: payload[key] for key in TEXT_KEYS if isinstance(payload.get(key), str)}
+    for key in IMAGE_KEYS:
+        if not isinstance(payload.get(key), str):
+            continue
+        try:
+            fields[key] = decode_base64_image(payload[key])
+        except (binascii.Error, ValueError):
+            raise RequestError(400, f"Imagem em base64 inválida: {key}")
+    return fields
+
+def submission_fields(fields):
+    """Valida os campos da verificação e retorna (nome, CPF, {imagem: bytes})."""
+    texts = {}
+    for key in TEXT_KEYS:
+        value = fields.get(key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", errors="replace")
+        texts[key] = (value or "").strip()
+    missing = [key for key in TEXT_KEYS if not texts[key]]
+    missing += [key for key in IMAGE_KEYS if not fields.get(key)]
+    if missing:
+        raise RequestError(400, "Campos ausentes: " + ", ".join(missing))
+    return texts["name"], texts["cpf"], {key: fields[key] for key in IMAGE_KEYS}
+
+class VerificationServer(ThreadingHTTPServer):
+    """Servidor HTTP da API, com um limite de verificações simultâneas por processo."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, max_concurrent=API_MAX_CONCURRENT, queue_timeout=API_QUEUE_TIMEOUT,
+                 max_request_bytes=API_MAX_REQUEST_BYTES):
+        super().__init__(address, VerificationHandler)
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.queue_timeout = queue_timeout
+        self.max_request_bytes = max_request_bytes
+
+class VerificationHandler(BaseHTTPRequestHandler):
+    """Responde POST /verify com o resultado da verificação e GET /health com o estado do processo.
+
+    GET /ready responde 200 apenas depois do aquecimento do processo (503 antes),
+    para as verificações de prontidão do balanceador ou do orquestrador.
+    """
+
+    # Tempo limite das leituras do socket, para que clientes lentos não ocupem vagas indefinidamente
+    timeout = API_READ_TIMEOUT
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/health":
+            self.send_json(200, {"status": "ok", "pid": os.getpid()})
+        elif path == "/ready":
+            state = readiness()
+            self.send_json(200 if state["ready"] else 503, {**state, "pid": os.getpid()})
+        else:
+            self.send_json(404, {"error": "Caminho não encontrado"})
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/verify":
+            self.send_json(404, {"error": "Caminho não encontrado"})
+            return
+        try:
+            length = self.content_length()
+        except RequestError as e:
+            # O corpo não será lido: a conexão é encerrada após a resposta
+            self.close_connection = True
+            self.send_json(e.status, {"error": e.message})
+            return
+
+        # A vaga é reservada antes de ler o corpo, limitando também as imagens mantidas em memória
+        if not self.server.slots.acquire(timeout=self.server.queue_timeout):
+            self.close_connection = True
+            self.send_json(503, {"error": "Muitas verificações em andamento. Tente novamente em instantes."},
+                           {"Retry-After": "1"})
+            return
+        try:
+            status, body = self.verify(length)
+        finally:
+            self.server.slots.release()
+        self.send_json(status, body)
+
+    def content_length(self):
+        """Retorna o tamanho do corpo, recusando corpos sem Content-Length ou maiores que o limite."""
+        value = self.headers.get("Content-Length")
+        if value is None:
+            raise RequestError(411, "Content-Length obrigatório")
+        try:
+            length = int(value)
+        except ValueError:
+            raise RequestError(400, "Content-Length inválido")
+        if length < 0:
+            raise RequestError(400, "Content-Length inválido")
+        if length > self.server.max_request_bytes:
+            raise RequestError(413, f"Requisição maior que o limite de {self.server.max_request_bytes} bytes")
+        return length
+
+    def verify(self, length):
+        """Lê o corpo (multipart/form-data ou JSON com imagens em base64) e executa a verificação.
+
+        Retorna (status HTTP, corpo da resposta).
+        """
+        content_type = self.headers.get("Content-Type", "")
+        chunks = read_chunks(self.rfile, length)
+        try:
+            if content_type.startswith("multipart/form-data"):
+                fields = parse_multipart(content_type, chunks)
+            elif content_type.startswith("application/json"):
+                fields = parse_json(chunks)
+            else:
+                self.close_connection = True
+                raise RequestError(415, "Use multipart/form-data ou application/json")
+            name, cpf, images = submission_fields(fields)
+        except RequestError as e:
+            return e.status, {"error": e.message}
+        except OSError as e:
+            self.close_connection = True
+            return 400, {"error": f"Erro ao ler a requisição: {e}"}
+
+        try:
+            result = verify_submission(name, cpf, images["document"], images["residence"], images["selfie"])
+        except Exception as e:
+            logger.error("Erro na verificação: %s", e)
+            return 500, {"error": "Erro ao verificar os documentos"}
+
+        if "rejected" in result:
+            # Imagens inválidas, sem rosto ou já enviadas por outro CPF: nenhuma comparação foi feita
+            return 422, result
+        return 200, {key: result[key] for key in RESULT_KEYS}
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+# ---------------------
+# Processos de Trabalho
+# ---------------------
+
+def run_worker(server):
+    """Executa o servidor no processo atual, aquecendo o cliente do Vision API em segundo plano.
+
+    Enquanto o aquecimento não termina, GET /ready responde 503.
+    """
+    # Criado após o fork: os canais gRPC não podem ser compartilhados entre processos
+    start_warmup()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+def spawn_worker(server):
+    """Cria um processo de trabalho que atende as conexões do socket já aberto e retorna seu pid."""
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            run_worker(server)
+        finally:
+            os._exit(0)
+    return pid
+
+def serve(server, workers):
+    """Atende as requisições com workers processos, que compartilham o socket aberto pelo processo principal.
+
+    Processos encerrados inesperadamente são recriados; SIGTERM ou SIGINT
+    encerram todos. Sem fork (por exemplo, no Windows), usa um único processo.
+    """
+    # Os módulos carregados sob demanda são importados uma vez, antes do fork, e compartilhados pelos processos
+    preload_modules()
+    if workers <= 1 or not hasattr(os, "fork"):
+        run_worker(server)
+        return
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    children = set()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        children.add(spawn_worker(server))
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            logger.error("Processo de trabalho %s encerrado (status %s); criando outro", pid, status)
+            children.add(spawn_worker(server))
+    server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP de verificação de documentos.")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço de escuta (padrão: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="porta de escuta (padrão: 8000)")
+    parser.add_argument("-w", "--workers", type=int, default=API_WORKERS,
+                        help=f"processos de trabalho (padrão: {API_WORKERS})")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    server = VerificationServer((args.host, args.port))
+    logger.info("API de verificação em http://%s:%s com %s processos", args.host, server.server_port, args.workers)
+    serve(server, args.workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
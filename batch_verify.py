@@ -0,0 +1,142 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from verification import VISION_MAX_IN_FLIGHT, METRICS_FILE, run_verification, start_metrics_exporter
+from metrics import record_verification, write_metrics
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# Verificação em Lote
+# ---------------------
+
+IMAGE_KEYS = ("document", "residence", "selfie")
+
+def read_manifest(manifest_path):
+    """Lê o manifesto JSONL, gerando (id, entrada) para cada linha não vazia.
+
+    Cada linha contém "name", "cpf", "document", "residence" e "selfie" (caminhos
+    das imagens, relativos ao diretório do manifesto) e, opcionalmente, "id".
+    Sem "id", o número da linha é usado como identificador.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            for key in IMAGE_KEYS:
+                entry[key] = os.path.join(base_dir, entry[key])
+            yield str(entry.get("id", line_number)), entry
+
+def load_checkpoint(output_path):
+    """Retorna os ids já processados no arquivo de resultados, descartando uma última linha incompleta."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        valid_size = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                break
+            valid_size += len(line)
+        # Remove o que foi escrito parcialmente quando a execução anterior foi interrompida
+        f.truncate(valid_size)
+    return done
+
+def read_entry_images(entry):
+    """Lê as imagens de uma entrada do manifesto."""
+    images = {}
+    for key in IMAGE_KEYS:
+        with open(entry[key], "rb") as f:
+            images[key] = f.read()
+    return images
+
+def verify_entry(entry_id, entry, cpu_pool, mode, stage_executor=None):
+    """Executa a verificação de uma entrada com o mesmo grafo de etapas do aplicativo (run_verification).
+
+    A normalização e a extração dos dados são executadas no pool de processos,
+    e a política das etapas é a mesma (VERIFICATION_POLICY).
+    """
+    try:
+        result = run_verification(
+            entry["name"], entry["cpf"], read_entry_images(entry), mode,
+            cpu_pool=cpu_pool, executor=stage_executor
+        )
+    except Exception as e:
+        logger.error("Erro ao verificar %s: %s", entry_id, e)
+        record_verification("error")
+        return {"id": entry_id, "errors": {"entry": str(e)}}
+    record_verification(result.pop("rejected", "completed"))
+
+    # O texto completo dos documentos não é incluído no resultado em lote
+    result.pop("texts", None)
+    return {"id": entry_id, **result}
+
+def run_batch(manifest_path, output_path, workers=None, concurrency=VISION_MAX_IN_FLIGHT, mode=None):
+    """Verifica todas as entradas do manifesto, gravando um resultado JSONL por entrada.
+
+    As entradas já presentes no arquivo de resultados são ignoradas, de modo que
+    uma execução interrompida continua de onde parou. Retorna o número de
+    entradas processadas nesta execução.
+    """
+    done = load_checkpoint(output_path)
+    processed = 0
+
+    # Processos criados com "spawn" para não herdar threads e canais gRPC do processo principal
+    cpu_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=cpu_context) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as io_pool, \
+            ThreadPoolExecutor(max_workers=concurrency * len(IMAGE_KEYS)) as stage_executor, \
+            open(output_path, "a", encoding="utf-8") as out:
+        pending = set()
+
+        def write_completed(completed):
+            nonlocal processed
+            for future in completed:
+                out.write(json.dumps(future.result(), ensure_ascii=False) + "\n")
+                out.flush()
+                processed += 1
+
+        for entry_id, entry in read_manifest(manifest_path):
+            if entry_id in done:
+                continue
+            # Limita as entradas em andamento para não carregar o manifesto inteiro na memória
+            if len(pending) >= concurrency * 2:
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_completed(completed)
+            pending.add(io_pool.submit(verify_entry, entry_id, entry, cpu_pool, mode, stage_executor))
+
+        write_completed(wait(pending).done)
+    return processed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verificação de documentos em lote a partir de um manifesto JSONL.")
+    parser.add_argument("manifest", help="manifesto JSONL com name, cpf, document, residence e selfie")
+    parser.add_argument("-o", "--output", required=True, help="arquivo JSONL de resultados (também usado para retomar)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="processos para as etapas de CPU")
+    parser.add_argument("-c", "--concurrency", type=int, default=VISION_MAX_IN_FLIGHT,
+                        help="verificações simultâneas nas chamadas ao Vision API")
+    parser.add_argument("--mode", choices=["batch", "concurrent"], default=None,
+                        help="modo de execução das chamadas ao Vision API")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    start_metrics_exporter()
+    processed = run_batch(args.manifest, args.output, args.workers, args.concurrency, args.mode)
+    logger.info("%d entradas processadas", processed)
+    if METRICS_FILE:
+        # Grava as métricas finais, sem esperar o próximo intervalo de exportação
+        write_metrics(METRICS_FILE)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
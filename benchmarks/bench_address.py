@@ -0,0 +1,83 @@
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from verification import extract_address_from_text, normalize_text
+
+# ---------------------
+# Benchmark de Entradas Patológicas na Extração de Endereço
+# ---------------------
+
+# Expressões da implementação anterior, mantidas aqui apenas para comparação
+LEGACY_DIRECT_PATTERN = (
+    r'(?:rua|r\.|avenida|av\.|alameda|al\.|travessa|tv\.|praça|pça\.|servid[ãa]o|sv\.?)'
+    r'\s+[^\d,\.]+[,\s]+(?:n[º°]?\.?\s*)?(\d+)'
+)
+LEGACY_LABEL_PATTERNS = [
+    r'endere[çc]o\s*:?\s*([^,\.]*(?:,|\.)?(?:[^,\.]*(?:,|\.))*[^,\.]*)',
+    r'resid[êe]ncia\s*:?\s*([^,\.]*(?:,|\.)?(?:[^,\.]*(?:,|\.))*[^,\.]*)',
+    r'local\s*:?\s*([^,\.]*(?:,|\.)?(?:[^,\.]*(?:,|\.))*[^,\.]*)',
+]
+
+def legacy_extract_address_from_text(text):
+    """Busca da implementação anterior, sem a formatação do resultado."""
+    text = normalize_text(text)
+    direct_address = re.search(LEGACY_DIRECT_PATTERN, text, re.IGNORECASE)
+    if direct_address:
+        return direct_address.group(0)
+    for pattern in LEGACY_LABEL_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            direct_match = re.search(LEGACY_DIRECT_PATTERN, match.group(1), re.IGNORECASE)
+            if direct_match:
+                return direct_match.group(0)
+    return None
+
+# Entradas patológicas: cada uma gera n repetições do trecho problemático
+PATHOLOGICAL_INPUTS = {
+    # Tipo de logradouro repetido sem número: a implementação anterior recomeça a busca em cada um
+    "repeated_street_type": lambda n: "rua x " * n,
+    # Abreviação de tipo de logradouro dentro de palavras ("dosv"): a expressão
+    # anterior não exige limite de palavra e tenta casar em cada ocorrência
+    "abbreviation_inside_words": lambda n: "dosv texto " * n,
+    # Rótulo seguido de muitas vírgulas, sem logradouro
+    "label_with_commas": lambda n: "endereço: " + "x, " * n,
+    # Texto longo de conta de consumo com o endereço no final
+    "long_bill": lambda n: "VALOR R$ 10,00. " * n + "Rua das Flores, 123 - Centro"
+}
+
+# Maior tamanho medido na implementação anterior, cujo tempo cresce de forma quadrática ou pior
+LEGACY_MAX_SIZE = 400
+
+def measure(function, text):
+    """Retorna o tempo, em segundos, de uma chamada."""
+    start = time.perf_counter()
+    function(text)
+    return time.perf_counter() - start
+
+def run(sizes=(100, 200, 400, 1000, 10000, 100000)):
+    """Mede o tempo de cada implementação em cada entrada patológica e tamanho."""
+    results = []
+    for case, build in PATHOLOGICAL_INPUTS.items():
+        for size in sizes:
+            text = build(size)
+            implementations = [("parser", extract_address_from_text)]
+            if size <= LEGACY_MAX_SIZE:
+                implementations.insert(0, ("legacy", legacy_extract_address_from_text))
+            for name, function in implementations:
+                results.append({
+                    "benchmark": "extract_address",
+                    "implementation": name,
+                    "case": case,
+                    "size": size,
+                    "text_chars": len(text),
+                    "seconds": measure(function, text)
+                })
+    return results
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import vision
+from call_policy import CallPolicy
+from fake_vision import FakeVisionClient
+
+# ---------------------
+# Benchmark da Política de Chamadas com o Cliente Falso
+# ---------------------
+
+# Requisição de uma imagem, como a do comprovante de residência
+REQUESTS = [vision.AnnotateImageRequest(
+    image=vision.Image(content=b"imagem"),
+    features=[vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)]
+)]
+
+# Cenários: (nome, parâmetros do cliente falso, parâmetros da política)
+SCENARIOS = [
+    ("tail_latency_no_hedge", {"latency": 0.01, "tail_latency": 0.3, "tail_rate": 0.02}, {}),
+    ("tail_latency_hedge", {"latency": 0.01, "tail_latency": 0.3, "tail_rate": 0.02}, {"hedge": True}),
+    ("errors_no_retry", {"latency": 0.01, "error_rate": 0.1}, {}),
+    ("errors_retry", {"latency": 0.01, "error_rate": 0.1}, {"max_attempts": 3, "backoff_base": 0.01}),
+]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_scenario(name, client_options, policy_options, calls=300, seed=0):
+    """Executa chamadas sequenciais pela política e mede latências e taxa de sucesso."""
+    client = FakeVisionClient(seed=seed, **client_options)
+    policy = CallPolicy(lambda: client, **policy_options)
+    latencies = []
+    failures = 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            policy.batch_annotate_images(REQUESTS, timeout=5)
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return {
+        "benchmark": "call_policy",
+        "scenario": name,
+        "calls": calls,
+        "success_rate": (calls - failures) / calls,
+        "p50_seconds": percentile(latencies, 0.5),
+        "p99_seconds": percentile(latencies, 0.99),
+        "api_calls": client.calls,
+        "policy": policy.stats()
+    }
+
+def run():
+    return [run_scenario(name, client_options, policy_options) for name, client_options, policy_options in SCENARIOS]
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
@@ -0,0 +1,98 @@
+import json
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpf_scanner import scan_index_cpfs
+from document_index import DocumentIndex
+from verification import extract_cpf_from_text, normalize_text
+
+# ---------------------
+# Microbenchmark da Extração de CPF
+# ---------------------
+
+# Padrões da implementação anterior, mantidos aqui apenas para comparação
+LEGACY_CPF_PATTERNS = [
+    r'CPF\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
+    r'CPF\s*:?\s*(\d{11})',
+    r'CPF\s*:?\s*(\d{3}\.?\d{3}\.?\d{3})',
+    r'CPF\s*[Nn][ºo°]\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
+    r'CPF\s*[Nn][ºo°]\s*:?\s*(\d{11})',
+    r'Cadastro\s+de\s+Pessoas?\s+Físicas?:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
+    r'Cadastro\s+de\s+Pessoas?\s+Físicas?:?\s*(\d{11})',
+    r'cpf\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
+    r'cpf\s*:?\s*(\d{11})',
+    r'cpf\s*[Nn][ºo°]\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
+    r'cpf\s*[Nn][ºo°]\s*:?\s*(\d{11})'
+]
+
+def legacy_extract_cpf_from_text(text):
+    """Implementação anterior: um re.search por padrão e depois qualquer número de 11 dígitos."""
+    text = normalize_text(text)
+    for pattern in LEGACY_CPF_PATTERNS:
+        match = re.search(pattern, text)
+        if match:
+            cpf = match.group(1).replace('.', '').replace('-', '').replace('/', '')
+            if len(cpf) == 11 and cpf.isdigit():
+                return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+            elif len(cpf) >= 9:
+                remaining_digits = re.search(r'\d{2}', text[match.end():])
+                if remaining_digits:
+                    cpf = cpf + remaining_digits.group(0)
+                    if len(cpf) == 11:
+                        return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+    for num in re.findall(r'\d+', text):
+        if len(num) == 11:
+            return f"{num[:3]}.{num[3:6]}.{num[6:9]}-{num[9:]}"
+    return None
+
+def utility_bill_text(lines, seed=0, label="cpf nº"):
+    """Gera o texto de uma conta de consumo longa, com o CPF do titular no final."""
+    rng = random.Random(seed)
+    body = []
+    for i in range(lines):
+        body.append(
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d} CONSUMO KWH {rng.randint(100, 999)} "
+            f"VALOR R$ {rng.randint(1, 500)},{rng.randint(0, 99):02d} TEL (11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)} "
+            f"COD {rng.randint(10 ** 12, 10 ** 13 - 1)}"
+        )
+    body.append(f"TITULAR MARIA DA SILVA {label} 529.982.247-25")
+    return "\n".join(body)
+
+def index_extract_cpf(index):
+    """Extração a partir dos tokens de um DocumentIndex já construído, sem o resultado memorizado no índice."""
+    candidates = scan_index_cpfs(index)
+    return candidates[0]["cpf"] if candidates else None
+
+def run(sizes=(10, 100, 1000), repeat=5, number=20):
+    """Mede o tempo médio por chamada de cada implementação para cada tamanho de texto.
+
+    "scanner" examina o texto em uma única passada; "index" usa os tokens do
+    DocumentIndex, que a verificação constrói uma única vez para todos os
+    extratores (o tempo de construção do índice não está incluído).
+    """
+    results = []
+    for lines in sizes:
+        # Com rótulo legível e com o rótulo perdido pelo OCR (exige examinar todos os números)
+        for label in ("cpf nº", "C.P.F"):
+            text = utility_bill_text(lines, label=label)
+            index = DocumentIndex(text)
+            for name, function in (("legacy", legacy_extract_cpf_from_text), ("scanner", extract_cpf_from_text),
+                                   ("index", lambda text: index_extract_cpf(index))):
+                timings = timeit.repeat(lambda: function(text), repeat=repeat, number=number)
+                results.append({
+                    "benchmark": "extract_cpf",
+                    "implementation": name,
+                    "label": label,
+                    "text_chars": len(text),
+                    "seconds_per_call": min(timings) / number,
+                    "result": function(text)
+                })
+    return results
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
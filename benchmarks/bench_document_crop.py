@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import timeit
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import synthetic_submission
+from document_crop import crop_document
+from verification import DOCUMENT_CROP_KEYS, DOCUMENT_CROP_MAX_EDGE, process_image
+
+# ---------------------
+# Benchmark do Recorte de Documentos
+# ---------------------
+
+MODES = ("color", "gray", "contrast")
+
+# O recorte é medido em um único núcleo, pois várias verificações disputam os
+# núcleos ao mesmo tempo; sem isso, o OpenCV paraleliza cada operação com todos eles
+BENCH_THREADS = 1
+
+def normalized_images(samples, tabletop):
+    """Imagens do documento e do comprovante já normalizadas para o OCR, como em normalize_submission."""
+    images = []
+    for seed in range(samples):
+        submission = synthetic_submission(seed, tabletop=tabletop)
+        for key in DOCUMENT_CROP_KEYS:
+            images.append((key, process_image(submission[key], target="ocr")["data"]))
+    return images
+
+def run(samples=5, repeat=3, number=3):
+    """Mede o tempo do recorte (em um único núcleo) e a redução do envio ao OCR em fotos sobre a mesa.
+
+    Também conta os recortes em imagens que já são só o documento (sem mesa),
+    onde nenhum recorte deve ser feito.
+    """
+    cv2.setNumThreads(BENCH_THREADS)
+    results = []
+    tabletop = normalized_images(samples, tabletop=True)
+    for mode in MODES:
+        for key in DOCUMENT_CROP_KEYS:
+            images = [data for image_key, data in tabletop if image_key == key]
+            seconds = []
+            original_bytes = cropped_bytes = found = 0
+            for data in images:
+                timings = timeit.repeat(lambda: crop_document(data, DOCUMENT_CROP_MAX_EDGE, mode), repeat=repeat, number=number)
+                seconds.append(min(timings) / number)
+                crop = crop_document(data, DOCUMENT_CROP_MAX_EDGE, mode)
+                original_bytes += len(data)
+                if crop:
+                    found += 1
+                    cropped_bytes += len(crop["data"])
+                else:
+                    cropped_bytes += len(data)
+            results.append({
+                "benchmark": "crop_document",
+                "image": key,
+                "mode": mode,
+                "threads": BENCH_THREADS,
+                "samples": len(images),
+                "seconds_per_call": sum(seconds) / len(seconds),
+                "max_seconds": max(seconds),
+                "found_rate": found / len(images),
+                "original_bytes": original_bytes // len(images),
+                "cropped_bytes": cropped_bytes // len(images),
+                "payload_ratio": cropped_bytes / original_bytes
+            })
+
+    flat = normalized_images(samples, tabletop=False)
+    results.append({
+        "benchmark": "crop_document_false_positives",
+        "samples": len(flat),
+        "cropped": sum(crop_document(data, DOCUMENT_CROP_MAX_EDGE) is not None for _, data in flat)
+    })
+    return results
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
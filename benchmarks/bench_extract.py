@@ -0,0 +1,83 @@
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_person, document_lines, bill_lines
+from verification import extract_name_from_text, extract_cpf_from_text, extract_address_fields, extract_address_from_text
+
+# ---------------------
+# Benchmark dos Extratores com Textos Sintéticos
+# ---------------------
+
+def expected_address(person):
+    """Número e CEP esperados no endereço extraído do comprovante."""
+    return {"number": person["number"], "cep": person["cep"]}
+
+def found_address(text):
+    address = extract_address_fields(text)
+    return {"number": address["number"], "cep": address["cep"]} if address else None
+
+# Extratores: (nome, texto usado, função, resultado esperado, resultado obtido)
+EXTRACTORS = (
+    # O nome é comparado sem diferenciar caixa, como em evaluate_submission
+    ("extract_name_from_text", "document", extract_name_from_text,
+     lambda person: person["name"].lower(), lambda text: (extract_name_from_text(text) or "").lower()),
+    ("extract_cpf_from_text", "document", extract_cpf_from_text,
+     lambda person: person["cpf"], extract_cpf_from_text),
+    ("extract_cpf_from_text", "residence", extract_cpf_from_text,
+     lambda person: person["cpf"], extract_cpf_from_text),
+    ("extract_address_from_text", "residence", extract_address_from_text,
+     expected_address, found_address)
+)
+
+def synthetic_texts(seed, bill_items):
+    rng = random.Random(seed)
+    person = make_person(rng)
+    kind = rng.choice(["rg", "cnh"])
+    texts = {
+        "document": "\n".join(document_lines(person, kind)),
+        "residence": "\n".join(bill_lines(person, bill_items, rng))
+    }
+    return person, texts
+
+def run_accuracy(samples=200, bill_items=40):
+    """Fração de textos sintéticos em que cada extrator encontra o valor esperado."""
+    results = []
+    cases = [synthetic_texts(seed, bill_items) for seed in range(samples)]
+    for name, source, _, expected, found in EXTRACTORS:
+        correct = sum(found(texts[source]) == expected(person) for person, texts in cases)
+        results.append({
+            "benchmark": "extractor_accuracy",
+            "extractor": name,
+            "text": source,
+            "samples": samples,
+            "accuracy": correct / samples
+        })
+    return results
+
+def run(bill_sizes=(40, 400, 4000), repeat=3, number=20):
+    """Mede o tempo por chamada de cada extrator no documento e em comprovantes cada vez mais longos."""
+    results = run_accuracy()
+    for bill_items in bill_sizes:
+        person, texts = synthetic_texts(0, bill_items)
+        for name, source, function, _, _ in EXTRACTORS:
+            # O documento não depende do tamanho do comprovante: é medido uma única vez
+            if source == "document" and bill_items != bill_sizes[0]:
+                continue
+            text = texts[source]
+            timings = timeit.repeat(lambda: function(text), repeat=repeat, number=number)
+            results.append({
+                "benchmark": "extractor",
+                "extractor": name,
+                "text": source,
+                "text_chars": len(text),
+                "seconds_per_call": min(timings) / number
+            })
+    return results
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+from google.cloud import vision
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_vision import FAKE_LANDMARKS
+from face_similarity import FaceGallery, descriptor_distances, face_descriptor, face_similarity, rotation_matrix
+from verification import FACE_MATCH_THRESHOLD, FACE_MIN_LANDMARKS, FACE_REPEAT_THRESHOLD
+
+# ---------------------
+# Benchmark da Similaridade Facial por Pontos de Referência
+# ---------------------
+
+# Variação (em pixels, com distância interocular de 80) entre os rostos de pessoas
+# diferentes e ruído da localização dos pontos pelo Vision API
+IDENTITY_SPREAD = 6.0
+LANDMARK_NOISE = 1.5
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def synthetic_identity(rng):
+    """Pontos (x, y, z) de uma pessoa sintética: o rosto de FAKE_LANDMARKS com proporções alteradas."""
+    base = np.array(list(FAKE_LANDMARKS.values()), dtype=float)
+    return base + rng.normal(0, IDENTITY_SPREAD, base.shape) * (1, 1, 0.5)
+
+def synthetic_face(points, rng, pose=(0.0, 0.0, 0.0), scale=1.0, offset=(0.0, 0.0)):
+    """FaceAnnotation da pessoa na pose (roll, pan, tilt) e na escala dadas, com ruído nos pontos."""
+    center = points.mean(axis=0)
+    placed = (points - center) @ rotation_matrix(*pose).T * scale + center + (*offset, 0.0)
+    placed[:, :2] += rng.normal(0, LANDMARK_NOISE * scale, (len(placed), 2))
+    x0, y0 = placed[:, :2].min(axis=0) - 20 * scale
+    x1, y1 = placed[:, :2].max(axis=0) + 20 * scale
+    landmark_type = vision.FaceAnnotation.Landmark.Type
+    return vision.FaceAnnotation(
+        roll_angle=pose[0], pan_angle=pose[1], tilt_angle=pose[2],
+        fd_bounding_poly=vision.BoundingPoly(vertices=[
+            vision.Vertex(x=int(x), y=int(y)) for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y1))
+        ]),
+        landmarks=[
+            vision.FaceAnnotation.Landmark(type_=landmark_type[name], position=vision.Position(x=x, y=y, z=z))
+            for name, (x, y, z) in zip(FAKE_LANDMARKS, placed)
+        ]
+    )
+
+def random_pose(rng, max_angle):
+    return tuple(rng.uniform(-max_angle, max_angle, 3))
+
+def run_pairs(people=200, max_angles=(0, 10, 20), seed=0):
+    """Acerto da comparação documento × selfie: o documento de frente e a selfie em poses até max_angle graus.
+
+    Cada pessoa é comparada com a própria selfie e com a selfie de outra pessoa.
+    """
+    rng = np.random.default_rng(seed)
+    identities = [synthetic_identity(rng) for _ in range(people)]
+    results = []
+    for max_angle in max_angles:
+        genuine, impostor = [], []
+        for i, points in enumerate(identities):
+            document = synthetic_face(points, rng)
+            selfie = synthetic_face(points, rng, random_pose(rng, max_angle), rng.uniform(0.5, 2.0), (40, 25))
+            other = synthetic_face(identities[(i + 1) % people], rng, random_pose(rng, max_angle))
+            genuine.append(face_similarity(document, selfie, min_landmarks=FACE_MIN_LANDMARKS))
+            impostor.append(face_similarity(document, other, min_landmarks=FACE_MIN_LANDMARKS))
+        correct = sum(score >= FACE_MATCH_THRESHOLD for score in genuine) + sum(
+            score < FACE_MATCH_THRESHOLD for score in impostor)
+        results.append({
+            "benchmark": "face_similarity",
+            "max_angle": max_angle,
+            "accuracy": correct / (2 * people),
+            "genuine_p05": percentile(genuine, 0.05),
+            "impostor_p95": percentile(impostor, 0.95)
+        })
+    return results
+
+def run_speed(repeat=3, number=1000, seed=0):
+    """Mede o cálculo do descritor de um FaceAnnotation e a pontuação de um par de descritores."""
+    rng = np.random.default_rng(seed)
+    points = synthetic_identity(rng)
+    face = synthetic_face(points, rng, random_pose(rng, 15))
+    descriptor = face_descriptor(face)
+    other = face_descriptor(synthetic_face(points, rng))[None, :]
+    results = []
+    for case, function in (("descriptor", lambda: face_descriptor(face)),
+                           ("pair_score", lambda: descriptor_distances(descriptor, other, FACE_MIN_LANDMARKS))):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            timings.append((time.perf_counter() - start) / number)
+        results.append({"benchmark": "face_similarity_speed", "case": case, "seconds_per_call": min(timings)})
+    return results
+
+def run_gallery(sizes=(1000, 10000, 100000), queries=50, identities=500, seed=0):
+    """Mede a comparação de uma selfie com todos os rostos de galerias cada vez maiores.
+
+    A galeria tem fotos de documento de identities pessoas; cada consulta é a
+    selfie de uma delas, que deve ser encontrada com FACE_REPEAT_THRESHOLD.
+    """
+    rng = np.random.default_rng(seed)
+    people = [synthetic_identity(rng) for _ in range(identities)]
+    # Duas fotos de documento por pessoa, repetidas até preencher a galeria
+    documents = [[face_descriptor(synthetic_face(points, rng)) for _ in range(2)] for points in people]
+    results = []
+    for size in sizes:
+        gallery = FaceGallery(size, min_landmarks=FACE_MIN_LANDMARKS)
+        for i in range(size):
+            person = i % identities
+            gallery.add(documents[person][(i // identities) % 2], str(person), "document")
+
+        latencies = []
+        found = 0
+        for _ in range(queries):
+            person = int(rng.integers(identities))
+            selfie = face_descriptor(synthetic_face(people[person], rng, random_pose(rng, 10)))
+            start = time.perf_counter()
+            matches = gallery.query(selfie, FACE_REPEAT_THRESHOLD)
+            latencies.append(time.perf_counter() - start)
+            found += any(match["ref"] == str(person) for match in matches)
+
+        p50 = percentile(latencies, 0.5)
+        results.append({
+            "benchmark": "face_gallery",
+            "entries": size,
+            "p50_seconds": p50,
+            "p95_seconds": percentile(latencies, 0.95),
+            "seconds_per_pair": p50 / size,
+            "found_rate": found / queries
+        })
+    return results
+
+def run():
+    return run_pairs() + run_speed() + run_gallery()
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
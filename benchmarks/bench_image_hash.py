@@ -0,0 +1,119 @@
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import synthetic_submission
+from image_hash import HashIndex, image_hash, hamming
+from verification import IMAGE_HASH_RADIUS, process_image
+
+# ---------------------
+# Benchmark do Hash Perceptual e do Índice de Imagens Reenviadas
+# ---------------------
+
+METHODS = ("phash", "dhash")
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def recompress(data, quality):
+    """Recodifica a imagem em JPEG com outra qualidade, como um reenvio por outro aplicativo."""
+    with Image.open(io.BytesIO(data)) as image:
+        output = io.BytesIO()
+        image.convert("RGB").save(output, format="JPEG", quality=quality)
+        return output.getvalue()
+
+def crop(data, fraction):
+    """Recorta fraction de cada borda da imagem, como um reenvio levemente cortado."""
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        dx, dy = int(width * fraction), int(height * fraction)
+        output = io.BytesIO()
+        image.crop((dx, dy, width - dx, height - dy)).convert("RGB").save(output, format="JPEG", quality=90)
+        return output.getvalue()
+
+def run_hash(repeat=3, number=20, seed=0):
+    """Mede o cálculo de cada hash e a distância entre a imagem normalizada e suas variações."""
+    data = process_image(synthetic_submission(seed)["document"], "ocr")["data"]
+    other = process_image(synthetic_submission(seed + 1)["document"], "ocr")["data"]
+    variants = (
+        ("recompressed_q60", recompress(data, 60)),
+        ("cropped_2pct", crop(data, 0.02)),
+        ("other_document", other)
+    )
+    results = []
+    for method in METHODS:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                image_hash(data, method)
+            timings.append((time.perf_counter() - start) / number)
+        results.append({"benchmark": "image_hash", "method": method, "seconds_per_call": min(timings)})
+
+        value = image_hash(data, method)
+        for variant, variant_data in variants:
+            distance = hamming(value, image_hash(variant_data, method))
+            results.append({
+                "benchmark": "image_hash_distance",
+                "method": method,
+                "variant": variant,
+                "distance": distance,
+                "match": distance <= IMAGE_HASH_RADIUS
+            })
+    return results
+
+def run_index(sizes=(10000, 100000, 1000000), queries=200, radius=IMAGE_HASH_RADIUS, seed=0):
+    """Mede a inserção, a consulta por raio de Hamming e o espaço por entrada de índices em disco cada vez maiores.
+
+    Os hashes são aleatórios; metade das consultas é uma variação (a até radius
+    bits) de um hash do índice e deve encontrá-lo.
+    """
+    rng = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            index = HashIndex(os.path.join(directory, f"hashes_{size}.db"))
+            values = [rng.getrandbits(64) for _ in range(size)]
+            start = time.perf_counter()
+            index.add_many((value, str(i), "document") for i, value in enumerate(values))
+            insert_seconds = time.perf_counter() - start
+
+            latencies = []
+            found = 0
+            for i in range(queries):
+                if i % 2:
+                    query = rng.getrandbits(64)
+                else:
+                    query = rng.choice(values)
+                    for bit in rng.sample(range(64), rng.randint(0, radius)):
+                        query ^= 1 << bit
+                start = time.perf_counter()
+                matches = index.query(query, radius)
+                latencies.append(time.perf_counter() - start)
+                found += bool(matches) and i % 2 == 0
+
+            results.append({
+                "benchmark": "hash_index",
+                "entries": size,
+                "radius": radius,
+                "insert_seconds": insert_seconds,
+                "p50_seconds": percentile(latencies, 0.5),
+                "p95_seconds": percentile(latencies, 0.95),
+                "found_rate": found / (queries // 2),
+                "bytes_per_entry": index.size_bytes() / size
+            })
+    return results
+
+def run():
+    return run_hash() + run_index()
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import sys
+import timeit
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import synthetic_submission
+from image_normalization import fix_image_orientation
+from face_prescreen import crop_face
+from verification import FACE_CROP_MARGIN, FACE_CROP_MAX_EDGE, process_image
+
+# ---------------------
+# Benchmark do Processamento de Imagens
+# ---------------------
+
+# Imagens da submissão sintética e o alvo da normalização de cada uma
+IMAGE_TARGETS = (("document", "ocr"), ("residence", "ocr"), ("selfie", "face"))
+
+def run_process_image(orientations=(1, 6), repeat=3, number=3, seed=0):
+    """Mede process_image nas três imagens sintéticas, sem e com rotação pela orientação EXIF."""
+    results = []
+    for orientation in orientations:
+        submission = synthetic_submission(seed, orientation=orientation)
+        for key, target in IMAGE_TARGETS:
+            data = submission[key]
+            timings = timeit.repeat(lambda: process_image(data, target), repeat=repeat, number=number)
+            report = process_image(data, target)
+            results.append({
+                "benchmark": "process_image",
+                "image": key,
+                "target": target,
+                "orientation": orientation,
+                "seconds_per_call": min(timings) / number,
+                "original_bytes": report["original_bytes"],
+                "normalized_bytes": report["normalized_bytes"],
+                "size": list(report["size"])
+            })
+    return results
+
+def run_fix_orientation(orientations=(1, 3, 6, 8), repeat=3, number=10, seed=0):
+    """Mede fix_image_orientation em uma imagem já decodificada, para cada orientação EXIF."""
+    results = []
+    for orientation in orientations:
+        data = synthetic_submission(seed, orientation=orientation)["document"]
+
+        def fix():
+            # A abertura é feita fora da medição; load() garante que só a transposição é medida
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            start = timeit.default_timer()
+            fix_image_orientation(image)
+            return timeit.default_timer() - start
+
+        timings = [min(fix() for _ in range(number)) for _ in range(repeat)]
+        results.append({
+            "benchmark": "fix_image_orientation",
+            "orientation": orientation,
+            "seconds_per_call": min(timings)
+        })
+    return results
+
+def run_prescreen(repeat=3, number=3, seed=0):
+    """Mede a pré-triagem local de rosto nas imagens normalizadas do documento e da selfie."""
+    submission = synthetic_submission(seed)
+    results = []
+    for key, target in (("document", "ocr"), ("selfie", "face")):
+        data = process_image(submission[key], target)["data"]
+        timings = timeit.repeat(lambda: crop_face(data, FACE_CROP_MARGIN, FACE_CROP_MAX_EDGE), repeat=repeat, number=number)
+        results.append({
+            "benchmark": "crop_face",
+            "image": key,
+            "seconds_per_call": min(timings) / number
+        })
+    return results
+
+def run():
+    return run_process_image() + run_fix_orientation() + run_prescreen()
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
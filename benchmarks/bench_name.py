@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_cpf import utility_bill_text
+from document_index import DocumentIndex
+from verification import match_name_in_text, normalize_text
+
+# ---------------------
+# Benchmark da Busca de Nome no Comprovante
+# ---------------------
+
+def legacy_match_name_in_text(name, text):
+    """Implementação anterior: nome inteiro como substring e depois cada parte como substring."""
+    clean_text = normalize_text(text, uppercase=True)
+    clean_name = normalize_text(name, uppercase=True)
+    name_parts = clean_name.split()
+    if clean_name in clean_text:
+        found_parts = name_parts
+    else:
+        found_parts = [part for part in name_parts if part in clean_text]
+    return {"match": len(found_parts) == len(name_parts), "found_parts": found_parts}
+
+# Casos de acerto: (nome, trecho do comprovante, resultado esperado)
+ACCURACY_CASES = [
+    ("Maria da Silva", "TITULAR MARIA DA SILVA", True),
+    ("Maria da Silva", "TITULAR MARÍA DA SlLVA", True),     # acento e erro de OCR (l por I)
+    ("Ana Souza", "BANANA SOUZANIA LTDA", False),           # partes dentro de outras palavras
+    ("José Pereira", "PEREIRA JOSÉ", False),                # partes fora de ordem
+    ("João Santos", "JOAO DOS SANTOS", True),               # palavra intermediária
+    ("Ana Lima", "ANA PAULA LIMA", True)
+]
+
+def run_accuracy():
+    """Compara o resultado das duas implementações com o esperado em cada caso."""
+    results = []
+    for name, text, expected in ACCURACY_CASES:
+        for implementation, function in (("legacy", legacy_match_name_in_text), ("matcher", match_name_in_text)):
+            match = function(name, text)["match"]
+            results.append({
+                "benchmark": "match_name_accuracy",
+                "implementation": implementation,
+                "name": name,
+                "text": text,
+                "expected": expected,
+                "match": match,
+                "correct": match == expected
+            })
+    return results
+
+def run(sizes=(10, 100, 1000, 10000), repeat=3, number=5):
+    """Mede o tempo médio por chamada das implementações em comprovantes cada vez mais longos.
+
+    "matcher" inclui a construção do DocumentIndex; "matcher_indexed" usa um índice
+    já construído, como em evaluate_submission, onde o índice é compartilhado pelos extratores.
+    """
+    results = run_accuracy()
+    for lines in sizes:
+        text = utility_bill_text(lines)
+        index = DocumentIndex(text)
+        implementations = (
+            ("legacy", legacy_match_name_in_text, text),
+            ("matcher", match_name_in_text, text),
+            ("matcher_indexed", match_name_in_text, index)
+        )
+        for implementation, function, document in implementations:
+            timings = timeit.repeat(lambda: function("Maria da Silva", document), repeat=repeat, number=number)
+            results.append({
+                "benchmark": "match_name",
+                "implementation": implementation,
+                "text_chars": len(text),
+                "seconds_per_call": min(timings) / number,
+                "match": function("Maria da Silva", document)["match"]
+            })
+    return results
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
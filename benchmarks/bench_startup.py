@@ -0,0 +1,144 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ---------------------
+# Benchmark da Inicialização: Importações e Primeira Verificação
+# ---------------------
+
+# Módulos importados na inicialização de cada ponto de entrada
+ENTRY_MODULES = ("verification", "api_server", "batch_verify")
+# Quantos módulos mais lentos de cada importação são reportados
+SLOWEST_MODULES = 10
+
+def fresh_env():
+    """Ambiente de um processo novo, com o cliente falso do Vision API e sem a pré-triagem de rosto
+    (o retrato desenhado das submissões sintéticas não é reconhecido pelo classificador do OpenCV)."""
+    env = dict(os.environ, VISION_BACKEND="fake", FACE_PRESCREEN="off")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, os.path.join(ROOT, "benchmarks"), env.get("PYTHONPATH")]))
+    return env
+
+def parse_importtime(stderr):
+    """Lê a saída de python -X importtime e retorna [(profundidade, módulo, tempo acumulado em segundos)].
+
+    A ordem é a da saída: cada módulo aparece depois dos que ele importa, e a
+    profundidade vem da indentação (dois espaços por nível).
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:].rstrip()
+        module = name.lstrip(" ")
+        modules.append(((len(name) - len(module)) // 2, module, int(cumulative) / 1e6))
+    return modules
+
+def import_children(modules, entry):
+    """Tempo de importação de entry e {módulo: segundos} dos módulos que ele importa diretamente.
+
+    Os filhos diretos são os de profundidade 1 entre a linha de entry e a linha
+    de profundidade 0 anterior. Retorna (None, {}) se entry não aparecer.
+    """
+    for position in range(len(modules) - 1, -1, -1):
+        depth, module, seconds = modules[position]
+        if depth == 0 and module == entry:
+            break
+    else:
+        return None, {}
+    children = {}
+    for depth, module, child_seconds in reversed(modules[:position]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children[module] = child_seconds
+    return seconds, children
+
+def run_imports(repeat=3):
+    """Mede, em processos novos, o tempo de importação de cada ponto de entrada e os módulos mais lentos."""
+    results = []
+    for module in ENTRY_MODULES:
+        runs = []
+        for _ in range(repeat):
+            completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                       cwd=ROOT, env=fresh_env(), capture_output=True, text=True, check=True)
+            runs.append(import_children(parse_importtime(completed.stderr), module))
+        seconds, children = min(runs, key=lambda run: run[0] if run[0] is not None else float("inf"))
+        results.append({"benchmark": "startup_import", "module": module, "import_seconds": seconds})
+        # Os módulos que o ponto de entrada importa diretamente (cv2, numpy, google.cloud.vision, ...)
+        slowest = sorted(children.items(), key=lambda item: item[1], reverse=True)
+        for name, child_seconds in slowest[:SLOWEST_MODULES]:
+            results.append({"benchmark": "startup_import_module", "entry": module, "module": name,
+                            "import_seconds": child_seconds})
+    return results
+
+def first_requests(warmup, submission_path):
+    """Executado no processo filho: mede a primeira e a segunda verificação, com ou sem warm_up antes.
+
+    A submissão vem pronta do processo pai (submission_path), pois gerá-la
+    aqui importaria o OpenCV e o NumPy antes da medição e esconderia o custo
+    que o aquecimento deveria cobrir.
+    """
+    with open(submission_path) as file:
+        submission = json.load(file)
+    for key in ("document", "residence", "selfie"):
+        submission[key] = base64.b64decode(submission[key])
+
+    from verification import warm_up, verify_submission
+    warmup_seconds = None
+    if warmup:
+        start = time.perf_counter()
+        warm_up()
+        warmup_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(2):
+        start = time.perf_counter()
+        verify_submission(submission["name"], submission["cpf"],
+                          submission["document"], submission["residence"], submission["selfie"])
+        latencies.append(time.perf_counter() - start)
+    return {
+        "benchmark": "startup_first_request",
+        "warmup": warmup,
+        "warmup_seconds": warmup_seconds,
+        "first_request_seconds": latencies[0],
+        "second_request_seconds": latencies[1]
+    }
+
+def run_first_requests():
+    """Mede a primeira verificação de um processo novo, sem e com aquecimento, com o cliente falso do Vision API."""
+    from synthetic import synthetic_submission
+
+    submission = synthetic_submission(0)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        submission_path = os.path.join(directory, "submission.json")
+        with open(submission_path, "w") as file:
+            json.dump({
+                "name": submission["name"],
+                "cpf": submission["cpf"],
+                **{key: base64.b64encode(submission[key]).decode("ascii") for key in ("document", "residence", "selfie")}
+            }, file)
+        for warmup in (False, True):
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", str(int(warmup)), submission_path],
+                cwd=ROOT, env=fresh_env(), capture_output=True, text=True, check=True
+            )
+            results.append(json.loads(completed.stdout))
+    return results
+
+def run():
+    return run_imports() + run_first_requests()
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        print(json.dumps(first_requests(sys.argv[2] == "1", sys.argv[3])))
+    else:
+        print(json.dumps(run(), indent=2, ensure_ascii=False))
@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuração do fluxo medido (antes de importar verification): sem a cota local de
+# chamadas, sem cache (cada verificação chama o cliente falso) e sem a pré-triagem de
+# rosto, pois o retrato desenhado não é reconhecido pelo classificador do OpenCV
+os.environ.setdefault("VISION_RATE_LIMIT", "0")
+os.environ.setdefault("VISION_CACHE_MAX_ENTRIES", "0")
+os.environ.setdefault("FACE_PRESCREEN", "off")
+
+from synthetic import synthetic_submission
+from fake_vision import FakeVisionClient
+from metrics import STAGE_SECONDS
+from verification import (
+    normalize_submission, set_vision_client, text_data, verify_submission,
+    submit_preparation, get_preparation_queue
+)
+
+# ---------------------
+# Benchmark da Verificação Completa com o Cliente Falso
+# ---------------------
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def fake_client(submissions, latency, seed=0):
+    """Cliente falso que devolve, para cada imagem enviada ao OCR, o texto sintético correspondente."""
+    texts = {}
+    for submission in submissions:
+        images = normalize_submission(submission["document"], submission["residence"], submission["selfie"])
+        for key in ("document", "residence"):
+            texts[text_data(images[key])] = submission["texts"][key]
+    return FakeVisionClient(texts=texts, latency=latency, seed=seed)
+
+def stage_totals():
+    return {dict(labels)["stage"]: (summary["count"], summary["sum"]) for labels, summary in STAGE_SECONDS.summary().items()}
+
+def stage_means(before, after):
+    """Tempo médio de cada etapa entre duas leituras das métricas."""
+    means = {}
+    for stage, (count, total) in after.items():
+        previous_count, previous_total = before.get(stage, (0, 0.0))
+        if count > previous_count:
+            means[stage] = (total - previous_total) / (count - previous_count)
+    return dict(sorted(means.items()))
+
+def prepare_uploads(submissions):
+    """Processa antecipadamente as imagens das submissões, como no envio de cada arquivo, e aguarda o término."""
+    prepared = []
+    for submission in submissions:
+        jobs = {key: submit_preparation(key, submission[key]) for key in ("document", "residence", "selfie")}
+        for job_id in jobs.values():
+            get_preparation_queue().wait(job_id)
+        prepared.append(jobs)
+    return prepared
+
+def run_level(concurrency, submissions, client, verifications, prepared=None):
+    """Executa verifications verificações com concurrency delas simultâneas.
+
+    Com prepared (os jobs de prepare_uploads, na ordem das submissões), mede
+    apenas o que resta após o processamento antecipado das imagens.
+    """
+    def verify(index):
+        submission = submissions[index % len(submissions)]
+        start = time.perf_counter()
+        result = verify_submission(submission["name"], submission["cpf"],
+                                   submission["document"], submission["residence"], submission["selfie"],
+                                   prepared=prepared[index % len(submissions)] if prepared else None)
+        return time.perf_counter() - start, result
+
+    calls_before = client.calls
+    stages_before = stage_totals()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(verify, range(verifications)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in outcomes]
+    results = [result for _, result in outcomes]
+    return {
+        "benchmark": "verification",
+        "concurrency": concurrency,
+        "prepared": bool(prepared),
+        "verifications": verifications,
+        "seconds": elapsed,
+        "verifications_per_second": verifications / elapsed,
+        "p50_seconds": percentile(latencies, 0.5),
+        "p95_seconds": percentile(latencies, 0.95),
+        "p99_seconds": percentile(latencies, 0.99),
+        "api_calls": client.calls - calls_before,
+        "rejected": sum("rejected" in result for result in results),
+        "cpf_match": sum(bool(result.get("cpf", {}).get("document", {}).get("match")) for result in results),
+        "address_found": sum(bool(result.get("address", {}).get("found")) for result in results),
+        "stage_mean_seconds": stage_means(stages_before, stage_totals())
+    }
+
+def run(levels=(1, 10, 100), latency=0.2, distinct=20, min_verifications=20):
+    """Mede a verificação completa com 1, 10 e 100 verificações simultâneas.
+
+    São geradas distinct submissões sintéticas (fotos sobre a mesa), reutilizadas
+    em rodízio; cada nível executa pelo menos min_verifications verificações (e
+    ao menos duas por verificação simultânea). O cliente falso responde após
+    latency segundos. Por fim, mede uma verificação por vez com as imagens já
+    processadas no envio, isto é, o tempo que o usuário espera ao clicar em validar.
+    """
+    submissions = [synthetic_submission(seed, tabletop=True) for seed in range(distinct)]
+    client = fake_client(submissions, latency)
+    set_vision_client(client)
+    results = [
+        run_level(concurrency, submissions, client, max(min_verifications, 2 * concurrency))
+        for concurrency in levels
+    ]
+    prepared = prepare_uploads(submissions)
+    results.append(run_level(1, submissions, client, min_verifications, prepared))
+    return results
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, ensure_ascii=False))
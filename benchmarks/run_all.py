@@ -0,0 +1,120 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+# ---------------------
+# Execução de Todos os Benchmarks
+# ---------------------
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts executados, cada um em um processo novo (sem cache, métricas ou clientes compartilhados)
+BENCHMARKS = (
+    "bench_images.py",
+    "bench_image_hash.py",
+    "bench_face_similarity.py",
+    "bench_document_crop.py",
+    "bench_extract.py",
+    "bench_cpf.py",
+    "bench_address.py",
+    "bench_name.py",
+    "bench_call_policy.py",
+    "bench_verification.py",
+    "bench_startup.py"
+)
+
+# Medidas comparadas com a execução de referência: tempos (quanto menor, melhor) e acertos (quanto maior, melhor)
+TIMING_FIELDS = ("seconds_per_call", "p50_seconds", "p95_seconds", "import_seconds", "first_request_seconds")
+ACCURACY_FIELDS = ("accuracy",)
+
+# Campos que não identificam o caso medido
+MEASURE_FIELDS = TIMING_FIELDS + ACCURACY_FIELDS + (
+    "seconds", "p99_seconds", "verifications_per_second", "stage_mean_seconds", "policy", "success_rate",
+    "api_calls", "original_bytes", "normalized_bytes", "size", "result", "match", "correct",
+    "rejected", "cpf_match", "address_found", "max_seconds", "found_rate", "cropped_bytes", "payload_ratio", "cropped",
+    "distance", "insert_seconds", "bytes_per_entry", "warmup_seconds", "second_request_seconds",
+    "genuine_p05", "impostor_p95", "seconds_per_pair"
+)
+
+def environment():
+    """Dados da máquina e da versão do código, para comparar apenas execuções equivalentes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCHMARK_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def run_benchmark(script):
+    """Executa um script de benchmark e retorna a lista de resultados que ele imprime em JSON."""
+    completed = subprocess.run([sys.executable, os.path.join(BENCHMARK_DIR, script)],
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+def case_key(result):
+    """Identifica o caso medido pelos campos que não são medidas."""
+    return json.dumps({key: value for key, value in result.items() if key not in MEASURE_FIELDS}, sort_keys=True)
+
+def compare(results, baseline, threshold):
+    """Lista os casos cujo tempo piorou mais que threshold (fração) ou cujo acerto caiu em relação à referência."""
+    reference = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = reference.get(case_key(result))
+        if previous is None:
+            continue
+        for field in TIMING_FIELDS + ACCURACY_FIELDS:
+            if result.get(field) is None or previous.get(field) is None:
+                continue
+            if field in TIMING_FIELDS:
+                regressed = result[field] > previous[field] * (1 + threshold)
+            else:
+                regressed = result[field] < previous[field]
+            if regressed:
+                regressions.append({
+                    "case": json.loads(case_key(result)),
+                    "field": field,
+                    "baseline": previous[field],
+                    "current": result[field]
+                })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa os benchmarks e grava os resultados em JSON.")
+    parser.add_argument("-o", "--output", help="arquivo JSON de resultados (padrão: saída padrão)")
+    parser.add_argument("-b", "--baseline", help="resultados de referência para detectar regressões")
+    parser.add_argument("-t", "--threshold", type=float, default=0.2,
+                        help="piora tolerada em relação à referência (fração, padrão 0.2)")
+    parser.add_argument("benchmarks", nargs="*", default=BENCHMARKS, help="scripts a executar (padrão: todos)")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "results": []}
+    for script in args.benchmarks:
+        report["results"].extend(run_benchmark(script))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        report["regressions"] = compare(report["results"], baseline, args.threshold)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    # Código de saída diferente de zero quando há regressões, para uso em integração contínua
+    return 1 if report.get("regressions") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import io
+import os
+import random
+import sys
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpf_scanner import format_cpf_digits
+from image_normalization import EXIF_ORIENTATION_TAG
+
+# ---------------------
+# Gerador de Documentos Sintéticos
+# ---------------------
+
+FIRST_NAMES = ["MARIA", "JOSÉ", "ANA", "JOÃO", "FRANCISCA", "ANTÔNIO", "LUCAS", "JULIANA", "PEDRO", "CAMILA"]
+MIDDLE_NAMES = ["", "", "DA", "DE", "DOS"]
+LAST_NAMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "PEREIRA", "LIMA", "CARVALHO", "FERREIRA", "D'ÁVILA", "GONÇALVES"]
+STREETS = [
+    ("RUA", "DAS FLORES"), ("AV.", "PAULISTA"), ("RUA", "SETE DE SETEMBRO"),
+    ("AV.", "BRASIL"), ("TRAVESSA", "DO COMÉRCIO"), ("ALAMEDA", "SANTOS")
+]
+PLACES = [
+    ("CENTRO", "SÃO PAULO", "SP"), ("BELA VISTA", "SÃO PAULO", "SP"), ("COPACABANA", "RIO DE JANEIRO", "RJ"),
+    ("SAVASSI", "BELO HORIZONTE", "MG"), ("BOA VIAGEM", "RECIFE", "PE"), ("MOINHOS DE VENTO", "PORTO ALEGRE", "RS")
+]
+
+# Transposição que, desfeita pela orientação EXIF, devolve a imagem na posição correta
+ORIENTATION_TRANSPOSE = {
+    1: None,
+    3: Image.Transpose.ROTATE_180,
+    6: Image.Transpose.ROTATE_90,
+    8: Image.Transpose.ROTATE_270
+}
+
+# Tamanhos (em pixels) das fotos: documento, comprovante (A4 a 150 dpi) e selfie
+DOCUMENT_SIZE = (1600, 1000)
+BILL_SIZE = (1240, 1754)
+SELFIE_SIZE = (1200, 1600)
+
+def cpf_check_digits(digits):
+    """Completa 9 dígitos com os dois dígitos verificadores (módulo 11)."""
+    numbers = [int(d) for d in digits]
+    for position in (9, 10):
+        total = sum(n * weight for n, weight in zip(numbers, range(position + 1, 1, -1)))
+        numbers.append(total * 10 % 11 % 10)
+    return "".join(str(n) for n in numbers)
+
+def make_person(rng):
+    """Gera os dados de uma pessoa: nome, CPF válido e endereço."""
+    parts = [rng.choice(FIRST_NAMES), rng.choice(MIDDLE_NAMES), rng.choice(LAST_NAMES)]
+    street_type, street = rng.choice(STREETS)
+    neighborhood, city, state = rng.choice(PLACES)
+    return {
+        "name": " ".join(part for part in parts if part),
+        "cpf": format_cpf_digits(cpf_check_digits("".join(str(rng.randint(0, 9)) for _ in range(9)))),
+        "street_type": street_type,
+        "street": street,
+        "number": str(rng.randint(1, 3000)),
+        "complement": rng.choice([None, f"APTO {rng.randint(1, 200)}", f"CASA {rng.randint(1, 9)}"]),
+        "neighborhood": neighborhood,
+        "city": city,
+        "state": state,
+        "cep": f"{rng.randint(1000, 99999):05d}-{rng.randint(0, 999):03d}",
+        "rg": f"{rng.randint(10, 99)}.{rng.randint(0, 999):03d}.{rng.randint(0, 999):03d}-{rng.randint(0, 9)}",
+        "birth": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2005)}"
+    }
+
+def document_lines(person, kind):
+    """Linhas do texto de um RG ou de uma CNH, na ordem em que o OCR as lê."""
+    if kind == "cnh":
+        return [
+            "REPÚBLICA FEDERATIVA DO BRASIL",
+            "MINISTÉRIO DA INFRAESTRUTURA",
+            "CARTEIRA NACIONAL DE HABILITAÇÃO",
+            "NOME",
+            person["name"],
+            "DOC. IDENTIDADE / ÓRG. EMISSOR / UF",
+            f"{person['rg']} SSP {person['state']}",
+            f"CPF {person['cpf']}   DATA NASCIMENTO {person['birth']}",
+            "CAT. HAB. B   VALIDADE 10/10/2030"
+        ]
+    return [
+        "REPÚBLICA FEDERATIVA DO BRASIL",
+        "SECRETARIA DA SEGURANÇA PÚBLICA",
+        "CARTEIRA DE IDENTIDADE",
+        f"REGISTRO GERAL {person['rg']}   DATA DE EXPEDIÇÃO 15/03/2015",
+        "NOME",
+        person["name"],
+        "FILIAÇÃO",
+        "JOSÉ DOS SANTOS",
+        f"DATA DE NASCIMENTO {person['birth']}",
+        f"CPF {person['cpf']}"
+    ]
+
+def bill_lines(person, lines, rng):
+    """Linhas do texto de uma conta de consumo com o endereço do titular e lines itens de consumo."""
+    complement = f" - {person['complement']}" if person["complement"] else ""
+    text = [
+        "COMPANHIA DE ENERGIA ELÉTRICA",
+        "CNPJ 12.345.678/0001-95",
+        f"TITULAR: {person['name']}",
+        f"CPF: {person['cpf']}",
+        f"ENDEREÇO: {person['street_type']} {person['street']}, {person['number']}{complement} - {person['neighborhood']}",
+        f"{person['city']}/{person['state']} CEP {person['cep']}",
+        "HISTÓRICO DE CONSUMO"
+    ]
+    for _ in range(lines):
+        text.append(
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d} CONSUMO KWH {rng.randint(100, 999)} "
+            f"VALOR R$ {rng.randint(1, 500)},{rng.randint(0, 99):02d}"
+        )
+    text.append(f"VENCIMENTO {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024   TOTAL A PAGAR R$ {rng.randint(50, 900)},00")
+    return text
+
+def load_font(size):
+    """Carrega uma fonte com acentos (DejaVu Sans), ou a fonte padrão do Pillow se ela não estiver instalada."""
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+def render_lines(lines, size, background, font_size, origin=(60, 60)):
+    """Desenha as linhas de texto sobre um fundo liso."""
+    image = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(image)
+    font = load_font(font_size)
+    x, y = origin
+    for line in lines:
+        if y > size[1] - font_size:
+            break
+        draw.text((x, y), line, fill=(20, 20, 20), font=font)
+        y += int(font_size * 1.4)
+    return image
+
+def draw_portrait(image, box):
+    """Desenha um retrato simplificado (fundo, rosto e olhos) na área box."""
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = box
+    width, height = right - left, bottom - top
+    draw.rectangle(box, fill=(190, 200, 210))
+    face = (left + width * 0.25, top + height * 0.15, right - width * 0.25, bottom - height * 0.25)
+    draw.ellipse(face, fill=(224, 172, 140))
+    eye_y = top + height * 0.4
+    for eye_x in (left + width * 0.4, left + width * 0.6):
+        radius = width * 0.03
+        draw.ellipse((eye_x - radius, eye_y - radius, eye_x + radius, eye_y + radius), fill=(40, 30, 30))
+    draw.line((left + width * 0.43, top + height * 0.6, right - width * 0.43, top + height * 0.6), fill=(150, 80, 80), width=4)
+
+def photograph(image, rng, coverage=0.45, tabletop=(96, 72, 52)):
+    """Coloca o documento sobre uma mesa, com perspectiva, como em uma foto de celular.
+
+    O documento ocupa aproximadamente coverage da área da foto, que mantém a
+    proporção 4:3 (ou 3:4 para documentos em pé). Retorna a foto e os cantos do
+    documento nela (superior esquerdo, superior direito, inferior direito e inferior esquerdo).
+    """
+    width, height = image.size
+    ratio = (4, 3) if width >= height else (3, 4)
+    frame_area = width * height / coverage
+    frame_width = int((frame_area * ratio[0] / ratio[1]) ** 0.5)
+    frame_height = int(frame_width * ratio[1] / ratio[0])
+
+    # Cantos do documento: centralizado com deslocamento aleatório e cada canto perturbado
+    left = (frame_width - width) / 2 + rng.uniform(-0.1, 0.1) * (frame_width - width)
+    top = (frame_height - height) / 2 + rng.uniform(-0.1, 0.1) * (frame_height - height)
+    jitter = 0.06 * min(width, height)
+    corners = np.array([
+        [left, top], [left + width, top], [left + width, top + height], [left, top + height]
+    ], dtype=np.float32) + np.array([[rng.uniform(-jitter, jitter) for _ in range(2)] for _ in range(4)], dtype=np.float32)
+
+    source = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float32)
+    frame = np.empty((frame_height, frame_width, 3), dtype=np.uint8)
+    # Mesa com um leve gradiente de iluminação
+    shade = np.linspace(0.8, 1.1, frame_width, dtype=np.float32)[None, :, None]
+    frame[:] = np.clip(np.array(tabletop, dtype=np.float32) * shade, 0, 255).astype(np.uint8)
+    cv2.warpPerspective(np.asarray(image), cv2.getPerspectiveTransform(source, corners), (frame_width, frame_height),
+                        dst=frame, borderMode=cv2.BORDER_TRANSPARENT)
+    return Image.fromarray(frame), corners.tolist()
+
+def degrade(image, rng, noise, max_rotation):
+    """Simula uma foto de celular: leve rotação e ruído gaussiano."""
+    angle = rng.uniform(-max_rotation, max_rotation)
+    if angle:
+        image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=(235, 235, 230))
+    if noise:
+        pixels = np.asarray(image, dtype=np.int16)
+        pixels = pixels + np.random.default_rng(rng.randrange(2 ** 32)).normal(0, noise, pixels.shape).astype(np.int16)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image
+
+def encode_photo(image, orientation=1, quality=92):
+    """Codifica em JPEG como uma câmera: pixels na posição do sensor e a orientação na tag EXIF."""
+    transpose = ORIENTATION_TRANSPOSE[orientation]
+    if transpose is not None:
+        image = image.transpose(transpose)
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION_TAG] = orientation
+    bytes_io = io.BytesIO()
+    image.save(bytes_io, format="JPEG", quality=quality, exif=exif.tobytes())
+    return bytes_io.getvalue()
+
+def synthetic_submission(seed, kind=None, bill_items=40, orientation=None, noise=8.0, max_rotation=3.0, tabletop=False):
+    """Gera uma submissão completa e reprodutível a partir da semente.
+
+    Retorna {"name", "cpf", "person", "kind", "document", "residence", "selfie", "texts"}:
+    as três imagens em JPEG (com ruído, rotação e orientação EXIF) e, em "texts",
+    o texto que um OCR perfeito leria do documento e do comprovante. Com
+    tabletop, o documento e o comprovante são fotografados sobre uma mesa (ver photograph).
+    """
+    rng = random.Random(seed)
+    person = make_person(rng)
+    kind = kind or rng.choice(["rg", "cnh"])
+
+    def pick_orientation():
+        return orientation if orientation is not None else rng.choice([1, 1, 3, 6, 8])
+
+    document_text = document_lines(person, kind)
+    document = render_lines(document_text, DOCUMENT_SIZE, (214, 232, 214) if kind == "cnh" else (236, 222, 226),
+                            font_size=34, origin=(520, 60))
+    draw_portrait(document, (60, 180, 460, 700))
+
+    residence_text = bill_lines(person, bill_items, rng)
+    residence = render_lines(residence_text, BILL_SIZE, (255, 255, 255), font_size=24)
+
+    if tabletop:
+        document = photograph(document, rng)[0]
+        residence = photograph(residence, rng)[0]
+
+    selfie = Image.new("RGB", SELFIE_SIZE, (120, 140, 160))
+    draw_portrait(selfie, (150, 200, SELFIE_SIZE[0] - 150, SELFIE_SIZE[1] - 100))
+
+    return {
+        "name": person["name"],
+        "cpf": person["cpf"],
+        "person": person,
+        "kind": kind,
+        "document": encode_photo(degrade(document, rng, noise, max_rotation), pick_orientation()),
+        "residence": encode_photo(degrade(residence, rng, noise, max_rotation), pick_orientation()),
+        "selfie": encode_photo(degrade(selfie, rng, noise, max_rotation), pick_orientation()),
+        "texts": {
+            "document": "\n".join(document_text),
+            "residence": "\n".join(residence_text)
+        }
+    }
@@ -0,0 +1,286 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from google.api_core import exceptions as core_exceptions
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# Política de Chamadas ao Vision API
+# ---------------------
+
+# Erros transitórios: a chamada é repetida e a falha conta para o disjuntor
+RETRYABLE_ERRORS = (
+    core_exceptions.ServiceUnavailable,
+    core_exceptions.DeadlineExceeded,
+    core_exceptions.TooManyRequests,
+    core_exceptions.InternalServerError
+)
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem contato com a API porque o disjuntor está aberto."""
+
+class RateLimitTimeout(Exception):
+    """Chamada recusada porque a cota local não liberou capacidade dentro do tempo limite."""
+
+def is_retryable(error):
+    """Verifica se o erro é transitório (inclusive quando vem dentro de um RetryError da biblioteca)."""
+    if isinstance(error, core_exceptions.RetryError):
+        error = error.cause
+    return isinstance(error, RETRYABLE_ERRORS)
+
+class TokenBucket:
+    """Limitador de taxa por balde de fichas: rate fichas por segundo, acumulando até burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Retira as fichas sem esperar; retorna False se não houver fichas suficientes."""
+        if self.rate <= 0:
+            return True
+        tokens = min(tokens, self.burst)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Espera até haver fichas suficientes, por no máximo timeout segundos; retorna se conseguiu."""
+        if self.rate <= 0:
+            return True
+        tokens = min(tokens, self.burst)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait_time = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait_time > deadline:
+                    return False
+            time.sleep(wait_time)
+
+class CircuitBreaker:
+    """Disjuntor: após failure_threshold falhas seguidas, recusa chamadas por reset_timeout segundos.
+
+    Passado esse tempo, deixa passar uma chamada de teste (meio aberto); se ela
+    funcionar, o disjuntor fecha, senão volta a abrir.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Retorna se a chamada pode ser feita agora."""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def release(self):
+        """Libera a chamada de teste do estado meio aberto sem mudar o estado do disjuntor.
+
+        Para chamadas que terminam sem indicar se a API está disponível (recusadas
+        pela cota local ou com erros não transitórios): a próxima chamada passa a ser o teste.
+        """
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Disjuntor do Vision API aberto após %d falhas", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class LatencyTracker:
+    """Guarda as latências das últimas chamadas bem-sucedidas para calcular percentis."""
+
+    def __init__(self, window):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, min_samples):
+        """Retorna o percentil das latências, ou None se houver menos de min_samples amostras."""
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class CallPolicy:
+    """Envolve as chamadas batch_annotate_images com limite de taxa, novas tentativas, disjuntor e hedging.
+
+    get_client retorna o cliente a usar em cada chamada. Cada imagem da chamada
+    consome uma ficha do limitador (a cota do Vision API é contada por imagem).
+    Erros transitórios são repetidos com espera exponencial com jitter, dentro do
+    tempo limite total da chamada. Com hedging, se uma tentativa demorar mais que
+    o percentil configurado das latências recentes, uma cópia é enviada e vale a
+    primeira resposta.
+    """
+
+    def __init__(self, get_client, rate=0, burst=1, max_attempts=1, backoff_base=0.2, backoff_max=5.0,
+                 failure_threshold=0, reset_timeout=30.0, hedge=False, hedge_percentile=0.95,
+                 hedge_min_samples=20, hedge_workers=8, latency_window=200):
+        self.get_client = get_client
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latencies = LatencyTracker(latency_window)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._hedge_workers = hedge_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                         "rejected_open": 0, "rejected_rate": 0, "failures": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        """Retorna os contadores da política, o estado do disjuntor e o atraso atual de hedging."""
+        with self._lock:
+            counters = dict(self.counters)
+        counters["breaker"] = self.breaker.state
+        counters["hedge_delay"] = self.hedge_delay()
+        return counters
+
+    def hedge_delay(self):
+        """Atraso antes de enviar a cópia da chamada, ou None se o hedging estiver desativado ou sem amostras."""
+        if not self.hedge:
+            return None
+        return self.latencies.percentile(self.hedge_percentile, self.hedge_min_samples)
+
+    def backoff(self, attempt):
+        """Espera antes da nova tentativa: exponencial, com jitter completo."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        """Envia as requisições aplicando a política (mesma assinatura do ImageAnnotatorClient)."""
+        self._count("calls")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not self.breaker.allow():
+                self._count("rejected_open")
+                raise CircuitOpenError("Vision API indisponível no momento (disjuntor aberto); tente novamente em instantes")
+            if not self.limiter.acquire(len(requests), timeout=remaining):
+                self._count("rejected_rate")
+                self.breaker.release()
+                raise RateLimitTimeout("Limite de chamadas ao Vision API atingido; tente novamente em instantes")
+            try:
+                response = self._attempt(requests, deadline, kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self._count("failures")
+                self.breaker.record_failure()
+                pause = self.backoff(attempt)
+                if attempt >= self.max_attempts or (deadline is not None and time.monotonic() + pause >= deadline):
+                    raise
+                self._count("retries")
+                logger.info("Nova tentativa %d da chamada ao Vision API após %s", attempt + 1, e)
+                time.sleep(pause)
+                continue
+            self.breaker.record_success()
+            return response
+
+    def _call(self, requests, deadline, kwargs):
+        """Executa uma chamada ao cliente, sem as novas tentativas da biblioteca, e registra a latência."""
+        self._count("attempts")
+        timeout = None if deadline is None else max(0.001, deadline - time.monotonic())
+        start = time.monotonic()
+        with timed("vision_rpc"):
+            response = self.get_client().batch_annotate_images(requests=requests, timeout=timeout, retry=None, **kwargs)
+        self.latencies.record(time.monotonic() - start)
+        return response
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._hedge_workers, thread_name_prefix="vision-hedge")
+            return self._executor
+
+    def _attempt(self, requests, deadline, kwargs):
+        """Uma tentativa, com uma cópia enviada após o atraso de hedging se a primeira demorar."""
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._call(requests, deadline, kwargs)
+
+        executor = self._get_executor()
+        primary = executor.submit(self._call, requests, deadline, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        # A cópia também consome a cota; sem fichas disponíveis, apenas aguarda a primeira
+        if done or not self.limiter.try_acquire(len(requests)):
+            return primary.result()
+
+        self._count("hedges")
+        hedge = executor.submit(self._call, requests, deadline, kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,207 @@
+import re
+
+# ---------------------
+# Localização de CPF
+# ---------------------
+
+# Rótulo de CPF: CPF, CPF Nº, Cadastro de Pessoas Físicas, em qualquer caixa. O
+# rótulo pode vir colado a "Nº" (NºCPF), que o OCR costuma juntar; a verificação
+# de limite de palavra fica depois do primeiro caractere para que o mecanismo de
+# regex possa pular rapidamente as posições que não começam com "C"
+CPF_LABEL = (
+    r'C(?<![^\Wºª°]C)(?:PF\b(?:\s*N\s*[ºo°.]+)?|adastro\s+de\s+Pessoas?\s+F[íi]sicas?\b)'
+)
+
+# Varredura única do texto: encontra, na mesma passada, os rótulos de CPF e os
+# números com formato de CPF (com ou sem pontuação, com os dígitos verificadores
+# opcionalmente separados por espaço ou quebra de linha)
+CPF_SCANNER = re.compile(
+    rf'(?P<label>{CPF_LABEL})'
+    r'|(?P<number>\d(?<![\d.]\d)\d{2}\.?\d{3}\.?\d{3}\s*[-/]?\s*\d{2})(?!\d)',
+    re.IGNORECASE
+)
+
+# Rótulo de CPF seguido diretamente do número, com pontuação opcional entre eles
+# (CPF: , CPF.: , CPF Nº.): permite encontrar o CPF rotulado com uma busca guiada
+# pelo rótulo, sem examinar cada número do texto
+LABELED_CPF_PATTERN = re.compile(
+    rf'{CPF_LABEL}'
+    r'[\s.:;#ºª°]*(\d{3}\.?\d{3}\.?\d{3}\s*[-/]?\s*\d{2})(?!\d)',
+    re.IGNORECASE
+)
+
+# Rótulos de CPF no índice do documento (sem acentos e caixa): o OCR costuma
+# juntar "Nº" ao rótulo (NºCPF), formando uma única palavra
+CPF_LABEL_KEYS = {"cpf", "nºcpf", "nocpf"}
+CPF_NUMBER_MARKER_KEYS = {"nº", "no", "n"}
+
+# Quantidades de dígitos do primeiro número de um CPF: grupos de 3 ou 6
+# dígitos seguidos de ponto, os nove primeiros dígitos ou o CPF inteiro
+CPF_START_LENGTHS = {3, 6, 9, 11}
+
+# Separadores aceitos entre os nove primeiros dígitos e os dígitos verificadores
+CHECK_DIGIT_SEPARATORS = {"-", "/"}
+
+# Penalidade (em caracteres) para rótulos que aparecem depois do número:
+# normalmente o valor vem logo após o rótulo
+FOLLOWING_LABEL_PENALTY = 20
+
+def cpf_digits(cpf):
+    """Remove a pontuação de um CPF, retornando apenas os dígitos."""
+    return ''.join(c for c in cpf if c.isdigit())
+
+def format_cpf_digits(digits):
+    """Formata 11 dígitos como XXX.XXX.XXX-XX."""
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+def is_valid_cpf(cpf):
+    """Verifica os dígitos verificadores (módulo 11) de um CPF, com ou sem pontuação."""
+    digits = cpf_digits(cpf)
+    if len(digits) != 11 or digits == digits[0] * 11:
+        return False
+    numbers = [int(d) for d in digits]
+    for position in (9, 10):
+        total = sum(n * weight for n, weight in zip(numbers, range(position + 1, 1, -1)))
+        check = total * 10 % 11 % 10
+        if numbers[position] != check:
+            return False
+    return True
+
+def scan_cpfs(text, include_invalid=False):
+    """Encontra todos os CPFs do texto em uma única passada, ordenados pela proximidade de um rótulo.
+
+    Cada candidato é um dicionário com o CPF formatado, sua posição no texto e a
+    distância (em caracteres) até o rótulo de CPF mais próximo, ou None se o
+    texto não tiver rótulos. Candidatos com dígitos verificadores inválidos só
+    são retornados com include_invalid=True.
+    """
+    if not text:
+        return []
+
+    labels = []
+    candidates = []
+    for match in CPF_SCANNER.finditer(text):
+        if match.lastgroup == "label":
+            labels.append((match.start(), match.end()))
+            continue
+        add_candidate(candidates, cpf_digits(match.group("number")), match.start(), match.end(), include_invalid)
+    return rank_candidates(candidates, labels)
+
+def add_candidate(candidates, digits, start, end, include_invalid):
+    """Adiciona um candidato a CPF, se for válido ou se include_invalid for verdadeiro."""
+    valid = is_valid_cpf(digits)
+    if valid or include_invalid:
+        candidates.append({
+            "cpf": format_cpf_digits(digits),
+            "digits": digits,
+            "start": start,
+            "end": end,
+            "valid": valid,
+            "label_distance": None
+        })
+
+def rank_candidates(candidates, labels):
+    """Calcula a distância de cada candidato ao rótulo mais próximo e ordena os candidatos (ver scan_cpfs)."""
+    for candidate in candidates:
+        distances = []
+        for start, end in labels:
+            if end <= candidate["start"]:
+                distances.append(candidate["start"] - end)
+            else:
+                distances.append(max(0, start - candidate["end"]) + FOLLOWING_LABEL_PENALTY)
+        if distances:
+            candidate["label_distance"] = min(distances)
+
+    # Candidatos válidos e próximos de um rótulo primeiro; empates pela ordem no texto
+    candidates.sort(key=lambda c: (
+        not c["valid"],
+        c["label_distance"] is None,
+        c["label_distance"] or 0,
+        c["start"]
+    ))
+    return candidates
+
+def scan_index_cpfs(index, include_invalid=False):
+    """Encontra os CPFs a partir dos tokens de um DocumentIndex, sem examinar o texto novamente.
+
+    Os candidatos são montados a partir das posições dos números guardadas no
+    índice e os rótulos, a partir do mapa de palavras; o resultado tem o mesmo
+    formato e a mesma ordem de scan_cpfs.
+    """
+    tokens = index.tokens
+    candidates = []
+    end = 0
+    for start in index.numbers:
+        # Números que fazem parte do CPF anterior ou que não podem iniciar um CPF
+        if start < end or len(tokens[start][1]) not in CPF_START_LENGTHS:
+            continue
+        match = cpf_tokens_at(index, start)
+        if match is not None:
+            digits, end = match
+            add_candidate(candidates, digits, index.token_start(start), tokens[end - 1][3], include_invalid)
+    return rank_candidates(candidates, index_cpf_labels(index))
+
+def cpf_tokens_at(index, i):
+    """Reconhece um CPF começando no token numérico i, como o padrão de CPF_SCANNER.
+
+    Retorna (dígitos, posição do token seguinte ao CPF) ou None.
+    """
+    tokens = index.tokens
+    if i > 0 and tokens[i - 1][1] == "." and tokens[i - 1][3] == index.token_start(i):
+        return None  # Continuação de outro número (1.234.567.890-12)
+
+    # Nove primeiros dígitos: grupos colados, separados por ponto apenas após o 3º e o 6º dígitos
+    digits = tokens[i][1]
+    j = i + 1
+    while len(digits) in (3, 6) and j + 1 < len(tokens):
+        dot, part = tokens[j], tokens[j + 1]
+        if (dot[1] != "." or part[0] != "number" or index.token_start(j) != tokens[j - 1][3]
+                or index.token_start(j + 1) != dot[3]):
+            break
+        digits += part[1]
+        j += 2
+    if len(digits) == 11:
+        return digits, j
+    if len(digits) != 9:
+        return None
+
+    # Dígitos verificadores, opcionalmente após espaço, quebra de linha, hífen ou barra
+    if j < len(tokens) and tokens[j][1] in CHECK_DIGIT_SEPARATORS:
+        j += 1
+    if j < len(tokens) and tokens[j][0] == "number" and len(tokens[j][1]) == 2:
+        return digits + tokens[j][1], j + 1
+    return None
+
+def index_cpf_labels(index):
+    """Posições (início, fim) no texto dos rótulos de CPF de um DocumentIndex, em ordem."""
+    tokens = index.tokens
+    labels = []
+    for key in CPF_LABEL_KEYS:
+        for i in index.find(key):
+            end = i + 1
+            # Rótulo seguido de "Nº", "N°" ou "No."
+            if end < len(tokens) and tokens[end][2].rstrip(".") in CPF_NUMBER_MARKER_KEYS:
+                end += 1
+                while end < len(tokens) and tokens[end][1] in ("º", "°", "."):
+                    end += 1
+            labels.append((index.token_start(i), tokens[end - 1][3]))
+    for i in index.find("cadastro"):
+        j = i
+        for keys in (("de",), ("pessoa", "pessoas"), ("fisica", "fisicas")):
+            j = index.next_word(j + 1)
+            if j is None or tokens[j][2].rstrip(".") not in keys:
+                break
+        else:
+            labels.append((index.token_start(i), tokens[j][3]))
+    labels.sort()
+    return labels
+
+def find_labeled_cpf(text):
+    """Retorna o primeiro CPF válido que aparece logo após um rótulo de CPF, ou None."""
+    if not text:
+        return None
+    for match in LABELED_CPF_PATTERN.finditer(text):
+        digits = cpf_digits(match.group(1))
+        if is_valid_cpf(digits):
+            return format_cpf_digits(digits)
+    return None
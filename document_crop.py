@@ -0,0 +1,131 @@
+import cv2
+import numpy as np
+
+# ---------------------
+# Localização e Recorte de Documentos
+# ---------------------
+
+# A busca pelo contorno é feita em uma cópia reduzida da imagem, com o maior
+# lado de até DETECTION_MAX_EDGE; a redução usa um fator inteiro, caso em que o
+# INTER_AREA do OpenCV faz a média de blocos inteiros (várias vezes mais rápido)
+DETECTION_MAX_EDGE = 500
+# Menor área aceita para o documento, como fração da imagem: contornos menores
+# costumam ser partes do próprio documento (a foto, um quadro de texto)
+MIN_DOCUMENT_AREA = 0.2
+# Tolerância da simplificação do contorno, como fração do perímetro
+APPROX_EPSILON = 0.02
+# Área mínima do contorno em relação ao seu fecho convexo: a borda de um documento
+# é convexa (mesmo em perspectiva), enquanto blocos de texto têm contorno irregular
+MIN_SOLIDITY = 0.9
+
+# Qualidade JPEG do documento recortado enviado ao Vision API
+CROP_JPEG_QUALITY = 90
+
+# Equalização local de contraste do modo "contrast"
+CLAHE_CLIP_LIMIT = 2.0
+CLAHE_TILE_GRID = (8, 8)
+
+def decode_document(image_data, mode):
+    """Decodifica a imagem; nos modos em tons de cinza, decodifica direto em um canal (mais rápido)."""
+    flags = cv2.IMREAD_COLOR if mode == "color" else cv2.IMREAD_GRAYSCALE
+    image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), flags)
+    if image is None:
+        raise ValueError("Imagem inválida")
+    return image
+
+def order_corners(points):
+    """Ordena quatro pontos como superior esquerdo, superior direito, inferior direito e inferior esquerdo."""
+    points = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)]
+    ], dtype=np.float32)
+
+def find_document(image):
+    """Procura o quadrilátero do documento na imagem (BGR ou em tons de cinza).
+
+    Retorna os quatro cantos ordenados (em coordenadas da imagem original) e a
+    fração da imagem ocupada pelo documento, ou None se nenhum contorno grande
+    e retangular for encontrado.
+    """
+    height, width = image.shape[:2]
+    factor = -(-max(height, width) // DETECTION_MAX_EDGE)
+    scale = 1.0 / factor
+    gray = image
+    if factor > 1:
+        gray = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    # Limiares do Canny a partir da mediana, para funcionar com fundos claros e escuros
+    median = float(np.median(gray))
+    edges = cv2.Canny(gray, int(max(0, 0.66 * median)), int(min(255, 1.33 * median)))
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    image_area = float(gray.shape[0] * gray.shape[1])
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        area = cv2.contourArea(contour)
+        if area < MIN_DOCUMENT_AREA * image_area:
+            break
+        hull = cv2.convexHull(contour)
+        if area < MIN_SOLIDITY * cv2.contourArea(hull):
+            continue
+        approx = cv2.approxPolyDP(hull, APPROX_EPSILON * cv2.arcLength(hull, True), True)
+        if len(approx) == 4:
+            corners = approx
+        else:
+            # Cantos arredondados ou bordas ruidosas: usa o retângulo mínimo do contorno
+            corners = cv2.boxPoints(cv2.minAreaRect(hull))
+        ordered = order_corners(corners) / scale
+        return ordered, cv2.contourArea(ordered) / (width * height)
+    return None
+
+def warp_document(image, corners, max_edge):
+    """Corrige a perspectiva e a inclinação do documento, retornando-o retificado com o maior lado limitado a max_edge."""
+    top_left, top_right, bottom_right, bottom_left = corners
+    width = max(np.linalg.norm(top_right - top_left), np.linalg.norm(bottom_right - bottom_left))
+    height = max(np.linalg.norm(bottom_left - top_left), np.linalg.norm(bottom_right - top_right))
+    scale = min(1.0, max_edge / max(width, height))
+    width, height = max(1, int(width * scale)), max(1, int(height * scale))
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(corners.astype(np.float32), target)
+    # INTER_AREA não é suportado pelo warpPerspective; a redução é moderada, então a interpolação linear basta
+    return cv2.warpPerspective(image, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+def enhance(image, mode):
+    """Realça o documento para o OCR no modo "contrast", equalizando o contraste localmente (CLAHE)
+    para recuperar texto apagado; nos demais modos, retorna a imagem como está."""
+    if mode == "contrast":
+        return cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID).apply(image)
+    return image
+
+def crop_document(image_data, max_edge, mode="gray"):
+    """Localiza o documento na foto, corrige a perspectiva e recorta apenas o documento para o OCR.
+
+    O modo "color" mantém as cores; "gray" converte para tons de cinza e
+    "contrast" também equaliza o contraste. Retorna um dicionário com os dados
+    JPEG do documento recortado, os cantos encontrados, o tamanho do recorte e
+    a fração da foto ocupada pelo documento, ou None se o documento não for encontrado.
+    """
+    image = decode_document(image_data, mode)
+    found = find_document(image)
+    if found is None:
+        return None
+
+    corners, area = found
+    document = enhance(warp_document(image, corners, max_edge), mode)
+    encoded, buffer = cv2.imencode(".jpg", document, [cv2.IMWRITE_JPEG_QUALITY, CROP_JPEG_QUALITY])
+    if not encoded:
+        raise ValueError("Não foi possível codificar o documento recortado")
+    return {
+        "data": buffer.tobytes(),
+        "corners": [[int(round(x)), int(round(y))] for x, y in corners],
+        "size": (document.shape[1], document.shape[0]),
+        "area": area
+    }
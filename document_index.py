@@ -0,0 +1,144 @@
+import re
+import unicodedata
+from bisect import bisect_right
+from itertools import islice
+
+# ---------------------
+# Índice de Tokens do Documento
+# ---------------------
+
+# Tokenização em tempo linear: cada caractere é consumido uma única vez, sem
+# quantificadores aninhados. Palavras podem terminar com ponto (abreviações).
+TOKEN_PATTERN = re.compile(r'(?P<number>\d+)|(?P<word>[^\W\d_]+\.?)|(?P<punct>[^\w\s])')
+
+def fold(word):
+    """Converte a palavra para minúsculas sem acentos (mantendo º), para comparação."""
+    word = word.lower()
+    if word.isascii():
+        return word
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', word.replace('º', '\0'))
+        if not unicodedata.combining(c)
+    ).replace('\0', 'º')
+
+def lookup_key(value):
+    """Forma usada como chave no índice: normalizada e sem o ponto final das abreviações."""
+    return fold(value).rstrip('.')
+
+def tokenize(text, start=0, limit=None):
+    """Divide o texto em tokens (tipo, texto, forma normalizada, posição final) a partir de start.
+
+    Com limit, para após esse número de tokens, sem examinar o restante do texto.
+    """
+    tokens = []
+    for match in islice(TOKEN_PATTERN.finditer(text, start), limit):
+        kind = match.lastgroup
+        value = match.group()
+        tokens.append((kind, value, fold(value) if kind == "word" else value, match.end()))
+    return tokens
+
+class DocumentIndex:
+    """Índice de um texto de OCR, construído uma única vez e consultado por todos os extratores.
+
+    Guarda os tokens normalizados (sem acentos), as posições de cada palavra ou
+    número (e, em numbers, as de todos os números), o início de cada linha e,
+    quando disponíveis, as caixas delimitadoras das palavras detectadas pelo
+    Vision API. Resultados derivados do texto (como os CPFs encontrados) podem
+    ser guardados com memoize para serem reutilizados.
+    """
+
+    def __init__(self, text, words=None):
+        self.text = text or ""
+        self.tokens = []
+        self.positions = {}
+        self.numbers = []
+        self.line_starts = [0]
+        self.boxes = {}
+        self._memo = {}
+
+        previous_end = 0
+        for match in TOKEN_PATTERN.finditer(self.text):
+            kind = match.lastgroup
+            value = match.group()
+            folded = fold(value) if kind == "word" else value
+            index = len(self.tokens)
+            if self.text.count('\n', previous_end, match.start()):
+                self.line_starts.append(index)
+            previous_end = match.end()
+            self.tokens.append((kind, value, folded, previous_end))
+            if kind != "punct":
+                self.positions.setdefault(folded.rstrip('.'), []).append(index)
+            if kind == "number":
+                self.numbers.append(index)
+
+        for word, box in words or ():
+            self.boxes.setdefault(lookup_key(word), []).append(box)
+
+    @classmethod
+    def of(cls, document):
+        """Retorna o próprio índice, ou constrói um a partir do texto informado."""
+        if isinstance(document, cls):
+            return document
+        return cls(document)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def find(self, term):
+        """Retorna as posições (índices de token) de uma palavra ou número, sem diferenciar acentos e caixa."""
+        return self.positions.get(lookup_key(term), [])
+
+    def find_phrase(self, terms):
+        """Retorna a posição do primeiro token de uma sequência de palavras consecutivas, ou None.
+
+        A pontuação entre as palavras é ignorada.
+        """
+        keys = [lookup_key(term) for term in terms]
+        if not keys:
+            return None
+        for start in self.positions.get(keys[0], []):
+            i = start
+            for key in keys[1:]:
+                i = self.next_word(i + 1)
+                if i is None or self.tokens[i][2].rstrip('.') != key:
+                    break
+            else:
+                return start
+        return None
+
+    def next_word(self, i):
+        """Retorna a posição da próxima palavra ou número a partir de i, ignorando pontuação, ou None."""
+        while i < len(self.tokens):
+            if self.tokens[i][0] != "punct":
+                return i
+            i += 1
+        return None
+
+    def token_start(self, i):
+        """Retorna a posição no texto onde o token i começa."""
+        return self.tokens[i][3] - len(self.tokens[i][1])
+
+    def line_of(self, i):
+        """Retorna o número da linha (a partir de 0) do token i."""
+        return bisect_right(self.line_starts, i) - 1
+
+    def line_tokens(self, line):
+        """Retorna os tokens de uma linha."""
+        end = self.line_starts[line + 1] if line + 1 < len(self.line_starts) else len(self.tokens)
+        return self.tokens[self.line_starts[line]:end]
+
+    def locate(self, term):
+        """Retorna as caixas delimitadoras (x0, y0, x1, y1) de uma palavra, se disponíveis."""
+        return self.boxes.get(lookup_key(term), [])
+
+    def memoize(self, name, function):
+        """Calcula function(texto) uma única vez por documento e reutiliza o resultado."""
+        if name not in self._memo:
+            self._memo[name] = function(self.text)
+        return self._memo[name]
+
+def memoized(document, name, function):
+    """Aplica function ao texto, reutilizando o resultado quando o documento é um DocumentIndex."""
+    if isinstance(document, DocumentIndex):
+        return document.memoize(name, function)
+    return function(document)
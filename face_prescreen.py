@@ -0,0 +1,97 @@
+import threading
+import cv2
+import numpy as np
+
+# ---------------------
+# Pré-triagem Local de Rostos
+# ---------------------
+
+# Classificador em cascata distribuído com o OpenCV
+FACE_CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+
+# A detecção é feita em uma cópia reduzida da imagem, em tons de cinza
+DETECTION_MAX_EDGE = 640
+# Parâmetros do detectMultiScale: valores tolerantes, pois um falso negativo rejeita a imagem
+DETECTION_SCALE_FACTOR = 1.1
+DETECTION_MIN_NEIGHBORS = 4
+# Menor rosto aceito, como fração do menor lado da imagem reduzida
+DETECTION_MIN_FACE_RATIO = 0.05
+
+# Qualidade JPEG do recorte enviado ao Vision API
+CROP_JPEG_QUALITY = 90
+
+# O CascadeClassifier não pode ser usado por várias threads ao mesmo tempo: uma instância por thread
+_local = threading.local()
+
+def get_face_detector():
+    """Retorna o classificador de rostos da thread atual, carregando-o na primeira chamada."""
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+        if detector.empty():
+            raise RuntimeError(f"Não foi possível carregar o classificador de rostos: {FACE_CASCADE_PATH}")
+        _local.detector = detector
+    return detector
+
+def decode_image(image_data):
+    """Decodifica os bytes de uma imagem em uma matriz BGR do OpenCV."""
+    image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Imagem inválida para a detecção de rosto")
+    return image
+
+def detect_faces(image):
+    """Detecta rostos na imagem, retornando caixas (x, y, largura, altura) em coordenadas da imagem original."""
+    height, width = image.shape[:2]
+    scale = min(1.0, DETECTION_MAX_EDGE / max(height, width))
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if scale < 1:
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    gray = cv2.equalizeHist(gray)
+
+    min_side = max(1, int(min(gray.shape[:2]) * DETECTION_MIN_FACE_RATIO))
+    boxes = get_face_detector().detectMultiScale(
+        gray,
+        scaleFactor=DETECTION_SCALE_FACTOR,
+        minNeighbors=DETECTION_MIN_NEIGHBORS,
+        minSize=(min_side, min_side)
+    )
+    return [tuple(int(round(value / scale)) for value in box) for box in boxes]
+
+def expand_box(box, margin, width, height):
+    """Amplia a caixa do rosto em margin (fração do tamanho do rosto) de cada lado, limitada à imagem."""
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    x0, y0 = max(0, x - dx), max(0, y - dy)
+    x1, y1 = min(width, x + w + dx), min(height, y + h + dy)
+    return x0, y0, x1 - x0, y1 - y0
+
+def crop_face(image_data, margin, max_edge):
+    """Procura um rosto na imagem e recorta o maior encontrado, com margem, para o Vision API.
+
+    O recorte é reduzido para que o maior lado tenha no máximo max_edge pixels.
+    Retorna um dicionário com os dados JPEG do recorte, a caixa do rosto e a
+    caixa recortada, ou None se nenhum rosto for encontrado.
+    """
+    image = decode_image(image_data)
+    faces = detect_faces(image)
+    if not faces:
+        return None
+
+    height, width = image.shape[:2]
+    face = max(faces, key=lambda box: box[2] * box[3])
+    x, y, w, h = expand_box(face, margin, width, height)
+    crop = image[y:y + h, x:x + w]
+    if max(w, h) > max_edge:
+        scale = max_edge / max(w, h)
+        crop = cv2.resize(crop, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+    encoded, buffer = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, CROP_JPEG_QUALITY])
+    if not encoded:
+        raise ValueError("Não foi possível codificar o recorte do rosto")
+    return {
+        "data": buffer.tobytes(),
+        "face_box": face,
+        "crop_box": (x, y, w, h),
+        "faces": len(faces)
+    }
@@ -0,0 +1,249 @@
+import threading
+import time
+import numpy as np
+
+# ---------------------
+# Similaridade Facial por Pontos de Referência
+# ---------------------
+
+# Pontos de referência do FaceAnnotation usados na comparação, pelo nome do tipo no Vision API.
+# As orelhas e as bochechas ficam de fora: costumam estar encobertas ou mal localizadas
+LANDMARKS = (
+    "LEFT_EYE", "RIGHT_EYE", "LEFT_EYE_PUPIL", "RIGHT_EYE_PUPIL",
+    "LEFT_EYE_LEFT_CORNER", "LEFT_EYE_RIGHT_CORNER", "RIGHT_EYE_LEFT_CORNER", "RIGHT_EYE_RIGHT_CORNER",
+    "LEFT_OF_LEFT_EYEBROW", "RIGHT_OF_LEFT_EYEBROW", "LEFT_OF_RIGHT_EYEBROW", "RIGHT_OF_RIGHT_EYEBROW",
+    "LEFT_EYEBROW_UPPER_MIDPOINT", "RIGHT_EYEBROW_UPPER_MIDPOINT",
+    "MIDPOINT_BETWEEN_EYES", "FOREHEAD_GLABELLA",
+    "NOSE_TIP", "NOSE_BOTTOM_LEFT", "NOSE_BOTTOM_RIGHT", "NOSE_BOTTOM_CENTER",
+    "UPPER_LIP", "LOWER_LIP", "MOUTH_LEFT", "MOUTH_RIGHT", "MOUTH_CENTER",
+    "CHIN_GNATHION", "CHIN_LEFT_GONION", "CHIN_RIGHT_GONION"
+)
+LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARKS)}
+
+# Pontos que mudam com a expressão (sorriso na selfie, rosto neutro no documento):
+# pesam menos na distância entre os descritores
+EXPRESSION_LANDMARKS = ("UPPER_LIP", "LOWER_LIP", "MOUTH_LEFT", "MOUTH_RIGHT", "MOUTH_CENTER", "CHIN_GNATHION")
+EXPRESSION_WEIGHT = 0.3
+
+# Peso de cada coordenada (x e y de cada ponto) do descritor
+_expression = np.isin(np.array(LANDMARKS), EXPRESSION_LANDMARKS)
+COORDINATE_WEIGHTS = np.repeat(np.where(_expression, EXPRESSION_WEIGHT, 1.0), 2).astype(np.float32)
+DESCRIPTOR_SIZE = len(COORDINATE_WEIGHTS)
+
+# Calibração padrão da pontuação: similaridade = 1 / (1 + exp(-(intercepto + inclinação * distância))).
+# Com estes valores, a similaridade é 0,5 a uma distância de 0,12 distância interocular;
+# ajuste-os com fit_calibration a partir de pares rotulados da sua base
+DEFAULT_CALIBRATION = (6.0, -50.0)
+
+# Folga, em fração da largura do rosto, além da caixa do rosto em que um ponto ainda é aceito
+BOX_MARGIN = 0.25
+
+def rotation_matrix(roll, pan, tilt):
+    """Matriz de rotação do rosto a partir dos ângulos do Vision API, em graus.
+
+    roll gira no plano da imagem (eixo z), pan vira o rosto para os lados
+    (eixo y) e tilt para cima e para baixo (eixo x).
+    """
+    roll, pan, tilt = np.radians([roll, pan, tilt])
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pan), np.sin(pan)
+    ct, st = np.cos(tilt), np.sin(tilt)
+    rz = np.array([[cr, -sr, 0], [sr, cr, 0], [0, 0, 1]])
+    ry = np.array([[cp, 0, sp], [0, 1, 0], [-sp, 0, cp]])
+    rx = np.array([[1, 0, 0], [0, ct, -st], [0, st, ct]])
+    return rz @ ry @ rx
+
+def landmark_array(face):
+    """Posições (x, y, z) dos pontos de LANDMARKS em um FaceAnnotation, com NaN nos ausentes."""
+    points = np.full((len(LANDMARKS), 3), np.nan)
+    for landmark in face.landmarks:
+        i = LANDMARK_INDEX.get(getattr(landmark.type_, "name", None))
+        if i is not None:
+            points[i] = (landmark.position.x, landmark.position.y, landmark.position.z)
+    return points
+
+def face_box(face):
+    """Caixa (x0, y0, x1, y1) do rosto: o polígono justo (fd_bounding_poly) ou, sem ele, o bounding_poly."""
+    for poly in (face.fd_bounding_poly, face.bounding_poly):
+        if poly.vertices:
+            xs = [vertex.x for vertex in poly.vertices]
+            ys = [vertex.y for vertex in poly.vertices]
+            if max(xs) > min(xs) and max(ys) > min(ys):
+                return min(xs), min(ys), max(xs), max(ys)
+    return None
+
+def frontal_landmarks(face):
+    """Pontos do rosto normalizados pela pose: de frente, com os olhos em (-0,5, 0) e (0,5, 0).
+
+    Desfaz a rotação indicada por roll, pan e tilt e projeta os pontos no
+    plano frontal (a profundidade estimada pelo Vision API é menos precisa que
+    a posição na imagem). O roll que restar é corrigido pela linha dos olhos,
+    a origem é o ponto médio entre eles e a escala, a distância entre eles.
+    Pontos fora da caixa do rosto (fd_bounding_poly) são descartados. Retorna
+    uma matriz (pontos, 2) com NaN nos ausentes, ou None sem os dois olhos.
+    """
+    points = landmark_array(face)
+    box = face_box(face)
+    if box is not None:
+        x0, y0, x1, y1 = box
+        margin = (x1 - x0) * BOX_MARGIN
+        outside = ((points[:, 0] < x0 - margin) | (points[:, 0] > x1 + margin) |
+                   (points[:, 1] < y0 - margin) | (points[:, 1] > y1 + margin))
+        points[outside] = np.nan
+
+    rotation = rotation_matrix(face.roll_angle, face.pan_angle, face.tilt_angle)
+    # Pontos em linhas: p @ R aplica a rotação inversa (R transposta) a cada ponto
+    frontal = (points @ rotation)[:, :2]
+    left, right = frontal[LANDMARK_INDEX["LEFT_EYE"]], frontal[LANDMARK_INDEX["RIGHT_EYE"]]
+    if np.isnan(left).any() or np.isnan(right).any():
+        return None
+    dx, dy = right - left
+    scale = np.hypot(dx, dy)
+    if not scale:
+        return None
+    # Gira e escala de uma vez, levando o olho esquerdo a (-0,5, 0) e o direito a (0,5, 0)
+    c, s = dx / scale ** 2, dy / scale ** 2
+    return (frontal - (left + right) / 2) @ np.array([[c, -s], [s, c]])
+
+def face_descriptor(face):
+    """Descritor geométrico de um rosto: as coordenadas (x, y) dos pontos normalizados pela pose.
+
+    Retorna um vetor float32 de DESCRIPTOR_SIZE posições (NaN nos pontos
+    ausentes), ou None se o rosto não puder ser normalizado.
+    """
+    if face is None:
+        return None
+    points = frontal_landmarks(face)
+    if points is None:
+        return None
+    return points.astype(np.float32).ravel()
+
+def descriptor_distances(descriptor, descriptors, min_landmarks):
+    """Distância de um descritor a cada linha de uma matriz de descritores.
+
+    É a raiz da média ponderada do quadrado do deslocamento de cada ponto, em
+    distâncias interoculares. Apenas os pontos presentes nos dois descritores
+    contam; com menos de min_landmarks pontos em comum, a distância é infinita.
+    """
+    difference = descriptors - descriptor
+    valid = ~np.isnan(difference)
+    weights = np.where(valid, COORDINATE_WEIGHTS, 0.0)
+    squared = np.where(valid, difference, 0.0) ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distances = np.sqrt(2 * (weights * squared).sum(axis=-1) / weights.sum(axis=-1))
+    return np.where(valid.sum(axis=-1) >= 2 * min_landmarks, distances, np.inf)
+
+def similarity_scores(distances, calibration=DEFAULT_CALIBRATION):
+    """Converte distâncias em similaridades calibradas (probabilidade de ser a mesma pessoa), entre 0 e 1."""
+    intercept, slope = calibration
+    with np.errstate(over="ignore"):
+        return 1.0 / (1.0 + np.exp(-(intercept + slope * np.asarray(distances))))
+
+def face_similarity(face1, face2, calibration=DEFAULT_CALIBRATION, min_landmarks=6):
+    """Similaridade calibrada entre dois FaceAnnotation, entre 0 e 1 (0 se algum não tiver pontos suficientes)."""
+    descriptor1, descriptor2 = face_descriptor(face1), face_descriptor(face2)
+    if descriptor1 is None or descriptor2 is None:
+        return 0.0
+    distance = descriptor_distances(descriptor1, descriptor2[None, :], min_landmarks)[0]
+    return float(similarity_scores(distance, calibration))
+
+def fit_calibration(distances, labels, iterations=25):
+    """Ajusta (intercepto, inclinação) da calibração por regressão logística (Newton-Raphson).
+
+    distances são as distâncias entre descritores de pares rotulados e labels
+    indica se cada par é da mesma pessoa (1) ou não (0).
+    """
+    x = np.asarray(distances, dtype=np.float64)
+    y = np.asarray(labels, dtype=np.float64)
+    design = np.column_stack((np.ones_like(x), x))
+    params = np.zeros(2)
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-(design @ params)))
+        gradient = design.T @ (y - p)
+        # Pequena regularização para pares perfeitamente separáveis
+        hessian = (design * (p * (1 - p))[:, None]).T @ design + 1e-6 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        params += step
+        if np.abs(step).max() < 1e-9:
+            break
+    return float(params[0]), float(params[1])
+
+# ---------------------
+# Galeria de Rostos de Documentos Já Enviados
+# ---------------------
+
+class FaceGallery:
+    """Descritores dos rostos de documentos já enviados, para comparar uma selfie com todos de uma vez.
+
+    Os descritores ficam em matrizes NumPy em memória (capacity linhas,
+    reaproveitadas da mais antiga à mais nova quando a galeria enche). Cada
+    linha guarda os pesos das coordenadas presentes (w), w * x e w * x², de
+    modo que a distância ponderada a todas as linhas sai de produtos
+    matriz-vetor: soma(w * (x - q)²) = (w * x²) @ m - 2 (w * x) @ q + w @ q²,
+    com m a máscara das coordenadas presentes na consulta. Nenhuma chamada ao
+    Vision API é feita.
+    """
+
+    def __init__(self, capacity, calibration=DEFAULT_CALIBRATION, min_landmarks=6):
+        self.capacity = capacity
+        self.calibration = calibration
+        self.min_landmarks = min_landmarks
+        self._lock = threading.Lock()
+        self._weights = np.zeros((capacity, DESCRIPTOR_SIZE), dtype=np.float32)
+        self._weighted = np.zeros((capacity, DESCRIPTOR_SIZE), dtype=np.float32)
+        self._weighted_squares = np.zeros((capacity, DESCRIPTOR_SIZE), dtype=np.float32)
+        self._present = np.zeros((capacity, DESCRIPTOR_SIZE), dtype=np.float32)
+        self._entries = [None] * capacity
+        self._next = 0
+        self._count = 0
+
+    def add(self, descriptor, ref, kind):
+        """Adiciona um descritor, com a referência de quem o enviou (ref) e o tipo de imagem (kind)."""
+        present = ~np.isnan(descriptor)
+        values = np.where(present, descriptor, 0.0)
+        weights = np.where(present, COORDINATE_WEIGHTS, 0.0)
+        with self._lock:
+            row = self._next
+            self._weights[row] = weights
+            self._weighted[row] = weights * values
+            self._weighted_squares[row] = weights * values ** 2
+            self._present[row] = present
+            self._entries[row] = (ref, kind, time.time())
+            self._next = (row + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def scores(self, descriptor):
+        """Similaridade calibrada do descritor com cada rosto da galeria, na ordem das linhas."""
+        mask = (~np.isnan(descriptor)).astype(np.float32)
+        query = np.where(mask > 0, descriptor, 0.0).astype(np.float32)
+        with self._lock:
+            count = self._count
+            squares = (self._weighted_squares[:count] @ mask
+                       - 2 * (self._weighted[:count] @ query)
+                       + self._weights[:count] @ (query ** 2))
+            total = self._weights[:count] @ mask
+            common = self._present[:count] @ mask
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distances = np.sqrt(np.maximum(2 * squares / total, 0.0))
+        distances = np.where(common >= 2 * self.min_landmarks, distances, np.inf)
+        return similarity_scores(distances, self.calibration)
+
+    def query(self, descriptor, threshold):
+        """Retorna os rostos com similaridade de pelo menos threshold, do mais ao menos semelhante.
+
+        Cada resultado é {"ref", "kind", "similarity", "created"}.
+        """
+        scores = self.scores(descriptor)
+        selected = np.flatnonzero(scores >= threshold)
+        with self._lock:
+            entries = [self._entries[i] for i in selected]
+        matches = [
+            {"ref": ref, "kind": kind, "similarity": float(score), "created": created}
+            for (ref, kind, created), score in zip(entries, scores[selected])
+        ]
+        matches.sort(key=lambda match: match["similarity"], reverse=True)
+        return matches
+
+    def __len__(self):
+        with self._lock:
+            return self._count
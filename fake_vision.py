@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from google.api_core import exceptions as core_exceptions
+from google.cloud import vision
+
+# ---------------------
+# Cliente Falso do Vision API
+# ---------------------
+
+# Texto devolvido por padrão para as requisições de TEXT_DETECTION
+FAKE_TEXT = (
+    "REPUBLICA FEDERATIVA DO BRASIL\n"
+    "NOME\nJOSE DA SILVA\n"
+    "CPF 529.982.247-25\n"
+    "Rua das Flores, 123 - Centro - São Paulo/SP CEP 01001-000"
+)
+
+# Pontos de referência (x, y, z) do rosto frontal devolvido para as requisições de FACE_DETECTION
+FAKE_LANDMARKS = {
+    "LEFT_EYE": (160, 180, 0), "RIGHT_EYE": (240, 180, 0),
+    "LEFT_EYE_PUPIL": (160, 181, -2), "RIGHT_EYE_PUPIL": (240, 181, -2),
+    "LEFT_EYE_LEFT_CORNER": (143, 181, 4), "LEFT_EYE_RIGHT_CORNER": (177, 181, 2),
+    "RIGHT_EYE_LEFT_CORNER": (223, 181, 2), "RIGHT_EYE_RIGHT_CORNER": (257, 181, 4),
+    "LEFT_OF_LEFT_EYEBROW": (135, 160, 6), "RIGHT_OF_LEFT_EYEBROW": (182, 158, -2),
+    "LEFT_OF_RIGHT_EYEBROW": (218, 158, -2), "RIGHT_OF_RIGHT_EYEBROW": (265, 160, 6),
+    "LEFT_EYEBROW_UPPER_MIDPOINT": (158, 152, 0), "RIGHT_EYEBROW_UPPER_MIDPOINT": (242, 152, 0),
+    "MIDPOINT_BETWEEN_EYES": (200, 178, -8), "FOREHEAD_GLABELLA": (200, 160, -6),
+    "NOSE_TIP": (200, 232, -30), "NOSE_BOTTOM_LEFT": (183, 242, -12),
+    "NOSE_BOTTOM_RIGHT": (217, 242, -12), "NOSE_BOTTOM_CENTER": (200, 246, -18),
+    "UPPER_LIP": (200, 266, -14), "LOWER_LIP": (200, 286, -12),
+    "MOUTH_LEFT": (172, 275, -2), "MOUTH_RIGHT": (228, 275, -2), "MOUTH_CENTER": (200, 276, -10),
+    "CHIN_GNATHION": (200, 320, -6), "CHIN_LEFT_GONION": (140, 290, 30), "CHIN_RIGHT_GONION": (260, 290, 30)
+}
+FAKE_FACE_BOX = ((120, 130), (280, 130), (280, 330), (120, 330))
+
+def fake_face(confidence):
+    """Rosto frontal fixo, com os pontos de FAKE_LANDMARKS e a caixa FAKE_FACE_BOX."""
+    landmark_type = vision.FaceAnnotation.Landmark.Type
+    return vision.FaceAnnotation(
+        detection_confidence=confidence,
+        fd_bounding_poly=vision.BoundingPoly(vertices=[vision.Vertex(x=x, y=y) for x, y in FAKE_FACE_BOX]),
+        landmarks=[
+            vision.FaceAnnotation.Landmark(type_=landmark_type[name], position=vision.Position(x=x, y=y, z=z))
+            for name, (x, y, z) in FAKE_LANDMARKS.items()
+        ]
+    )
+
+class FakeVisionClient:
+    """Cliente local com a mesma interface de batch_annotate_images do Vision API, para testes e benchmarks.
+
+    Devolve respostas fixas (text e um rosto frontal com face_confidence) e permite injetar latência
+    (latency, com tail_latency em uma fração tail_rate das chamadas), erros
+    aleatórios (error_rate) e as primeiras fail_first chamadas com erro. Respeita
+    o tempo limite da chamada, levantando DeadlineExceeded. texts associa o
+    conteúdo de imagens específicas ({bytes: texto}) ao texto devolvido para elas.
+    """
+
+    def __init__(self, text=FAKE_TEXT, face_confidence=0.95, latency=0.0, tail_latency=0.0, tail_rate=0.0,
+                 error_rate=0.0, fail_first=0, error=core_exceptions.ServiceUnavailable, seed=None, texts=None):
+        self.text = text
+        self.texts = texts or {}
+        self.face_confidence = face_confidence
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.error = error
+        self.calls = 0
+        self.images = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.images += len(requests)
+            call = self.calls
+            slow = self._random.random() < self.tail_rate
+            failed = call <= self.fail_first or self._random.random() < self.error_rate
+
+        delay = self.tail_latency if slow else self.latency
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise core_exceptions.DeadlineExceeded("Tempo limite excedido (cliente falso)")
+        time.sleep(delay)
+        if failed:
+            raise self.error("Erro injetado pelo cliente falso")
+        return vision.BatchAnnotateImagesResponse(responses=[self.response(request) for request in requests])
+
+    def response(self, request):
+        """Monta a resposta fixa de uma requisição conforme os recursos solicitados."""
+        response = vision.AnnotateImageResponse()
+        types = {feature.type_ for feature in request.features}
+        if vision.Feature.Type.TEXT_DETECTION in types:
+            text = self.texts.get(request.image.content, self.text)
+            response.text_annotations.append(vision.EntityAnnotation(description=text))
+        if vision.Feature.Type.FACE_DETECTION in types:
+            response.face_annotations.append(fake_face(self.face_confidence))
+        return response
@@ -0,0 +1,179 @@
+import io
+import os
+import sqlite3
+import threading
+import time
+from itertools import combinations
+import numpy as np
+from PIL import Image
+
+# ---------------------
+# Hash Perceptual de Imagens
+# ---------------------
+
+# Bits do hash e lado da imagem reduzida usada pelo pHash
+HASH_BITS = 64
+PHASH_SIZE = 32
+PHASH_LOW = 8
+
+def dct_matrix(size):
+    """Matriz da DCT-II ortonormal: dct_matrix(n) @ x calcula a DCT de cada coluna de x."""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.sqrt(2 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+PHASH_DCT = dct_matrix(PHASH_SIZE)
+
+def grayscale(image_data, size):
+    """Decodifica a imagem e a reduz, em tons de cinza, para size (largura, altura), como matriz float."""
+    with Image.open(io.BytesIO(image_data)) as image:
+        image.draft("L", (size[0] * 4, size[1] * 4))
+        return np.asarray(image.convert("L").resize(size, Image.BILINEAR), dtype=np.float32)
+
+def pack_bits(bits):
+    """Converte uma matriz de booleanos em um inteiro (o primeiro bit é o mais significativo)."""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+def dhash(image_data):
+    """Hash de diferença: compara cada pixel com o vizinho da direita em uma imagem 9x8."""
+    pixels = grayscale(image_data, (9, 8))
+    return pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+def phash(image_data):
+    """Hash perceptual: compara as frequências baixas da DCT de uma imagem 32x32 com a mediana delas.
+
+    Resiste a recompressão, redimensionamento e pequenas alterações de brilho e contraste.
+    """
+    pixels = grayscale(image_data, (PHASH_SIZE, PHASH_SIZE))
+    low = (PHASH_DCT @ pixels @ PHASH_DCT.T)[:PHASH_LOW, :PHASH_LOW]
+    # O componente contínuo (brilho médio) não entra na mediana
+    median = np.median(low.ravel()[1:])
+    return pack_bits(low > median)
+
+HASH_FUNCTIONS = {"dhash": dhash, "phash": phash}
+
+def image_hash(image_data, method="phash"):
+    """Calcula o hash perceptual de 64 bits de uma imagem pelo método "phash" ou "dhash"."""
+    return HASH_FUNCTIONS[method](image_data)
+
+def hamming(a, b):
+    """Número de bits diferentes entre dois hashes."""
+    return bin(a ^ b).count("1")
+
+# ---------------------
+# Índice de Hashes por Distância de Hamming
+# ---------------------
+
+def to_signed(value):
+    """Converte um hash de 64 bits para o inteiro com sinal armazenado pelo SQLite."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def to_unsigned(value):
+    """Converte o inteiro com sinal armazenado pelo SQLite de volta para o hash de 64 bits."""
+    return value + (1 << 64) if value < 0 else value
+
+def neighbors(value, bits, radius):
+    """Todos os valores de bits bits a até radius bits de distância de value (incluindo o próprio value)."""
+    values = [value]
+    for distance in range(1, radius + 1):
+        for positions in combinations(range(bits), distance):
+            flipped = value
+            for position in positions:
+                flipped ^= 1 << position
+            values.append(flipped)
+    return values
+
+class HashIndex:
+    """Índice persistente de hashes perceptuais com consultas por raio de Hamming (multi-index hashing).
+
+    Cada hash de 64 bits é dividido em chunks partes, cada uma indexada em
+    uma coluna do SQLite. Se dois hashes diferem em até r bits, alguma das
+    partes difere em até r // chunks bits; a consulta procura, pelo índice
+    de cada parte, apenas os valores a essa distância e confere a distância
+    completa dos candidatos. Assim o custo depende dos candidatos, não do
+    tamanho do índice. Sem path, o índice fica apenas em memória.
+    """
+
+    def __init__(self, path=None, chunks=4):
+        self.chunks = chunks
+        self.chunk_bits = HASH_BITS // chunks
+        self._lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        columns = ", ".join(f"c{i} INTEGER NOT NULL" for i in range(chunks))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS image_hashes "
+            f"(id INTEGER PRIMARY KEY, hash INTEGER NOT NULL, {columns}, "
+            "ref TEXT NOT NULL, kind TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        for i in range(chunks):
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS image_hashes_c{i} ON image_hashes (c{i})")
+        self._db.commit()
+        self._insert = "INSERT INTO image_hashes (hash, {}, ref, kind, created) VALUES (?, {}, ?, ?, ?)".format(
+            ", ".join(f"c{i}" for i in range(chunks)), ", ".join("?" * chunks)
+        )
+
+    def split(self, value):
+        """Divide o hash em self.chunks partes de self.chunk_bits bits."""
+        mask = (1 << self.chunk_bits) - 1
+        return [(value >> (self.chunk_bits * i)) & mask for i in range(self.chunks)]
+
+    def add(self, value, ref, kind):
+        """Adiciona um hash, com a referência de quem o enviou (ref) e o tipo de imagem (kind)."""
+        with self._lock:
+            self._db.execute(
+                self._insert,
+                (to_signed(value), *self.split(value), ref, kind, time.time())
+            )
+            self._db.commit()
+
+    def add_many(self, entries):
+        """Adiciona vários (hash, ref, kind) em uma única transação."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                self._insert,
+                ((to_signed(value), *self.split(value), ref, kind, now) for value, ref, kind in entries)
+            )
+            self._db.commit()
+
+    def query(self, value, radius):
+        """Retorna os hashes a até radius bits de value, do mais próximo ao mais distante.
+
+        Cada resultado é {"ref", "kind", "distance", "created"}.
+        """
+        sub_radius = radius // self.chunks
+        candidates = {}
+        with self._lock:
+            for i, part in enumerate(self.split(value)):
+                probes = neighbors(part, self.chunk_bits, sub_radius)
+                rows = self._db.execute(
+                    f"SELECT id, hash, ref, kind, created FROM image_hashes WHERE c{i} IN ({', '.join('?' * len(probes))})",
+                    probes
+                )
+                for row in rows:
+                    candidates[row[0]] = row[1:]
+
+        matches = []
+        for stored, ref, kind, created in candidates.values():
+            distance = hamming(value, to_unsigned(stored))
+            if distance <= radius:
+                matches.append({"ref": ref, "kind": kind, "distance": distance, "created": created})
+        matches.sort(key=lambda match: match["distance"])
+        return matches
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM image_hashes").fetchone()[0]
+
+    def size_bytes(self):
+        """Espaço ocupado pelo banco (tabela e índices), em bytes."""
+        with self._lock:
+            pages = self._db.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._db.execute("PRAGMA page_size").fetchone()[0]
+        return pages * page_size
@@ -0,0 +1,186 @@
+import io
+from contextlib import nullcontext
+from PIL import Image, ImageOps
+from metrics import timed
+
+# ---------------------
+# Normalização de Imagens
+# ---------------------
+
+# Faixa de qualidade JPEG usada na busca pelo orçamento de bytes
+JPEG_MIN_QUALITY = 50
+JPEG_MAX_QUALITY = 90
+
+# Tag EXIF de orientação
+EXIF_ORIENTATION_TAG = 0x0112
+
+# Bytes por pixel dos modos que não usam um byte por banda
+MODE_PIXEL_BYTES = {"1": 1, "I;16": 2, "I": 4, "F": 4}
+
+class ImageTooLarge(ValueError):
+    """A imagem tem mais pixels que o limite (possível bomba de descompressão)."""
+
+def read_image_bytes(source):
+    """Lê os bytes de uma imagem a partir de bytes, de um arquivo carregado ou de um objeto de arquivo."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    return source.read()
+
+def fix_image_orientation(image):
+    """Corrige a orientação da imagem com base nos metadados EXIF para evitar imagens rotacionadas.
+
+    Usa transposições (rotações múltiplas de 90° e espelhamentos), que não reamostram os pixels.
+    """
+    try:
+        return ImageOps.exif_transpose(image)
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return image  # Metadados EXIF inválidos; retorna como está
+
+def encode_jpeg(image, max_bytes, min_quality=JPEG_MIN_QUALITY, max_quality=JPEG_MAX_QUALITY):
+    """Codifica a imagem em JPEG com a maior qualidade que cabe no orçamento de bytes.
+
+    Faz uma busca binária na qualidade; se nem a qualidade mínima couber no
+    orçamento, retorna a codificação com a qualidade mínima.
+    Retorna (dados, qualidade).
+    """
+    def save(quality):
+        bytes_io = io.BytesIO()
+        image.save(bytes_io, format="JPEG", quality=quality, optimize=True)
+        return bytes_io.getvalue()
+
+    data = save(max_quality)
+    if len(data) <= max_bytes:
+        return data, max_quality
+
+    best = None
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = save(quality)
+        if len(data) <= max_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if best is None:
+        return save(min_quality), min_quality
+    return best
+
+def pixel_bytes(mode):
+    """Bytes por pixel de uma imagem decodificada no modo informado."""
+    return MODE_PIXEL_BYTES.get(mode, Image.getmodebands(mode))
+
+def draft_size(image, max_edge):
+    """Tamanho em que a imagem será decodificada: JPEGs grandes são decodificados em escala reduzida (1/2, 1/4 ou 1/8)."""
+    width, height = image.size
+    scale = max_edge / max(width, height)
+    if image.format != "JPEG" or scale >= 1:
+        return width, height
+    # Mesma escolha de Image.draft: a maior redução que mantém o tamanho pedido
+    target = (max(1, int(width * scale)), max(1, int(height * scale)))
+    reduction = min(width // target[0], height // target[1])
+    for factor in (8, 4, 2, 1):
+        if factor <= reduction:
+            return -(-width // factor), -(-height // factor)
+    return width, height
+
+def decode_memory(image, orientation, max_edge, max_bytes):
+    """Estima, a partir do cabeçalho, a memória de pico da normalização de uma imagem ainda não decodificada.
+
+    Soma o bitmap decodificado, a cópia girada pela orientação EXIF (apenas
+    quando a orientação não é 1; normalize_image não a cria nesse caso), a
+    conversão para RGB, a imagem reduzida e os buffers da codificação JPEG.
+    """
+    width, height = draft_size(image, max_edge)
+    decoded = width * height * pixel_bytes(image.mode)
+    total = decoded
+    if orientation != 1:
+        total += decoded
+    if image.mode not in ("RGB", "L"):
+        total += width * height * 3
+    edge = min(max_edge, max(width, height))
+    total += edge * edge * 3
+    return total + 2 * max_bytes
+
+def normalize_image(source, max_edge, max_bytes, budget=None, max_pixels=0):
+    """Prepara uma imagem para o Vision API limitando a resolução e o tamanho em bytes.
+
+    JPEGs grandes são decodificados em escala reduzida, a orientação EXIF é
+    corrigida sem reamostragem, o maior lado é limitado a max_edge e a imagem
+    é recodificada com a maior qualidade que cabe em max_bytes. Imagens JPEG que
+    já atendem aos limites são repassadas sem recodificação.
+
+    Imagens com mais de max_pixels pixels são recusadas com ImageTooLarge antes
+    de decodificar (0 desativa o limite). Com budget (um MemoryBudget), a
+    memória estimada pelo cabeçalho é reservada durante a decodificação e a
+    recodificação, e os bitmaps intermediários são liberados assim que deixam
+    de ser usados.
+
+    Retorna um dicionário com os dados normalizados e um relatório do processamento.
+    """
+    raw = read_image_bytes(source)
+    with timed("normalize_open"):
+        image = Image.open(io.BytesIO(raw))
+        original_size = image.size
+        orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+
+    if max_pixels and original_size[0] * original_size[1] > max_pixels:
+        raise ImageTooLarge(
+            f"Imagem com {original_size[0]}x{original_size[1]} pixels, acima do limite de {max_pixels} pixels"
+        )
+
+    # Repassa sem recodificar quando a imagem já atende a todos os limites
+    if (image.format == "JPEG" and image.mode in ("RGB", "L") and orientation == 1
+            and max(image.size) <= max_edge and len(raw) <= max_bytes):
+        return normalization_report(raw, raw, original_size, image.size, None, True)
+
+    # A estimativa só é calculada quando há um orçamento com limite
+    if budget is not None and budget.capacity:
+        reservation = budget.reserve(decode_memory(image, orientation, max_edge, max_bytes))
+    else:
+        reservation = nullcontext()
+    with reservation:
+        # Decodifica JPEGs diretamente em escala reduzida (1/2, 1/4 ou 1/8) quando possível
+        scale = max_edge / max(image.size)
+        with timed("normalize_decode"):
+            if image.format == "JPEG" and scale < 1:
+                image.draft(None, (max(1, int(image.size[0] * scale)), max(1, int(image.size[1] * scale))))
+            image.load()
+
+        # Sem orientação a corrigir, exif_transpose apenas copiaria o bitmap
+        if orientation != 1:
+            with timed("normalize_exif"):
+                image = replace_image(image, fix_image_orientation(image))
+        with timed("normalize_resize"):
+            if image.mode not in ("RGB", "L"):
+                image = replace_image(image, image.convert("RGB"))
+            if max(image.size) > max_edge:
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        with timed("normalize_encode"):
+            data, quality = encode_jpeg(image, max_bytes)
+        size = image.size
+        image.close()
+    return normalization_report(raw, data, original_size, size, quality, False)
+
+def replace_image(image, new_image):
+    """Libera o bitmap de image quando new_image é uma cópia, e retorna new_image."""
+    if new_image is not image:
+        image.close()
+    return new_image
+
+def normalization_report(raw, data, original_size, size, quality, passthrough):
+    """Monta o resultado da normalização com o relatório de bytes economizados."""
+    return {
+        "data": data,
+        "original_bytes": len(raw),
+        "normalized_bytes": len(data),
+        "saved_bytes": len(raw) - len(data),
+        "original_size": original_size,
+        "size": size,
+        "quality": quality,
+        "passthrough": passthrough
+    }
@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# Fila de Verificações em Segundo Plano
+# ---------------------
+
+# Estados de um job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Job em execução na thread atual, para que a função do job publique seu progresso
+_current = threading.local()
+
+def report_progress(progress):
+    """Publica o progresso do job em execução na thread atual (visível em JobQueue.get).
+
+    progress deve ser um novo objeto a cada chamada, pois é entregue a quem
+    consulta o job sem cópia. Fora de um job, não faz nada.
+    """
+    job = getattr(_current, "job", None)
+    if job is not None:
+        queue, job_id = job
+        queue._update(job_id, progress=progress)
+
+class JobQueue:
+    """Executa jobs em um pool limitado de threads, fora da thread do script do Streamlit.
+
+    Jobs com a mesma chave (por exemplo, as mesmas entradas de uma verificação)
+    enquanto o anterior está em andamento ou concluído com sucesso reutilizam o
+    mesmo job. Quando max_pending jobs estão aguardando ou em execução, novos
+    jobs são recusados. Jobs concluídos são descartados após result_ttl segundos.
+    """
+
+    def __init__(self, max_workers, max_pending, result_ttl):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        # Sinaliza a conclusão de jobs para quem aguarda em wait
+        self._finished = threading.Condition(self._lock)
+        self._jobs = {}
+        self._keys = {}
+        self._pending = 0
+
+    def submit(self, key, function, *args):
+        """Enfileira function(*args) e retorna o id do job, ou None se a fila estiver cheia.
+
+        Se já houver um job com a mesma chave em andamento ou concluído com
+        sucesso, retorna o id desse job sem enfileirar outro.
+        """
+        with self._lock:
+            self._expire()
+            job_id = self._keys.get(key)
+            if job_id is not None and self._jobs[job_id]["status"] != JOB_FAILED:
+                return job_id
+            if self._pending >= self.max_pending:
+                return None
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "key": key,
+                "status": JOB_QUEUED,
+                "result": None,
+                "error": None,
+                "progress": None,
+                "submitted": time.time(),
+                "started": None,
+                "finished": None
+            }
+            self._keys[key] = job_id
+            self._pending += 1
+        self._executor.submit(self._run, job_id, function, args)
+        return job_id
+
+    def _run(self, job_id, function, args):
+        """Executa um job e guarda o resultado ou o erro."""
+        self._update(job_id, status=JOB_RUNNING, started=time.time())
+        _current.job = (self, job_id)
+        try:
+            result = function(*args)
+        except Exception as e:
+            logger.error("Erro no job %s: %s", job_id, e)
+            fields = {"status": JOB_FAILED, "error": str(e)}
+        else:
+            fields = {"status": JOB_DONE, "result": result}
+        finally:
+            _current.job = None
+        # A vaga na fila é liberada junto com a conclusão: quem aguarda em wait
+        # já pode enfileirar outro job assim que for notificado
+        self._update(job_id, finished=time.time(), release=True, **fields)
+
+    def _update(self, job_id, release=False, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+            if release:
+                self._pending -= 1
+            if fields.get("finished") is not None:
+                self._finished.notify_all()
+
+    def _expire(self):
+        """Remove os jobs concluídos há mais de result_ttl segundos (chamado com o lock adquirido)."""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished"] is not None and now - job["finished"] > self.result_ttl
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._keys.get(job["key"]) == job_id:
+                del self._keys[job["key"]]
+
+    def get(self, job_id):
+        """Retorna uma cópia do estado do job, com sua posição na fila, ou None se não existir (ou tiver expirado)."""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            job["position"] = sum(
+                1 for other in self._jobs.values()
+                if other["status"] == JOB_QUEUED and other["submitted"] < job["submitted"]
+            ) if job["status"] == JOB_QUEUED else 0
+            return job
+
+    def wait(self, job_id, timeout=None):
+        """Aguarda o job terminar (por no máximo timeout segundos) e retorna seu estado, como em get.
+
+        Retorna o estado atual mesmo que o job ainda não tenha terminado, ou None se não existir.
+        """
+        with self._lock:
+            self._finished.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id]["finished"] is not None,
+                timeout
+            )
+        return self.get(job_id)
+
+    def stats(self):
+        """Retorna o número de jobs em cada estado."""
+        with self._lock:
+            counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return counts
@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+from metrics import IMAGE_MEMORY_RESERVED, IMAGE_ADMISSIONS
+
+# ---------------------
+# Orçamento de Memória da Decodificação de Imagens
+# ---------------------
+
+class MemoryBudgetExceeded(Exception):
+    """A reserva não coube no orçamento de memória dentro do tempo de espera."""
+
+class MemoryBudget:
+    """Semáforo ponderado em bytes, compartilhado pelo processo, que limita a memória das imagens decodificadas.
+
+    Cada decodificação reserva a memória estimada antes de decodificar e a
+    devolve ao terminar. Reservas que não cabem aguardam, em ordem de chegada,
+    até wait segundos; reservas maiores que o próprio orçamento são recusadas
+    de imediato. capacity igual a 0 desativa o limite.
+    """
+
+    def __init__(self, capacity, wait):
+        self.capacity = capacity
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._reserved = 0
+        # Reservas aguardando, em ordem de chegada: uma reserva grande não é ultrapassada indefinidamente pelas pequenas
+        self._waiting = []
+
+    @property
+    def reserved(self):
+        with self._lock:
+            return self._reserved
+
+    def acquire(self, nbytes, wait=None):
+        """Reserva nbytes do orçamento, aguardando até wait segundos (padrão: self.wait).
+
+        Levanta MemoryBudgetExceeded se a reserva for maior que o orçamento ou
+        não couber dentro do tempo de espera.
+        """
+        if not self.capacity:
+            return
+        if nbytes > self.capacity:
+            IMAGE_ADMISSIONS.inc(outcome="rejected")
+            raise MemoryBudgetExceeded(
+                f"A imagem precisa de {nbytes} bytes, acima do orçamento de {self.capacity} bytes"
+            )
+
+        deadline = time.monotonic() + (self.wait if wait is None else wait)
+        ticket = object()
+        with self._lock:
+            self._waiting.append(ticket)
+            queued = False
+            try:
+                while self._waiting[0] is not ticket or self._reserved + nbytes > self.capacity:
+                    queued = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        IMAGE_ADMISSIONS.inc(outcome="timeout")
+                        raise MemoryBudgetExceeded(
+                            f"Orçamento de memória esgotado: {self._reserved} de {self.capacity} bytes reservados"
+                        )
+                    self._released.wait(remaining)
+            finally:
+                self._waiting.remove(ticket)
+                # A próxima da fila pode caber agora que esta saiu da frente
+                self._released.notify_all()
+            self._reserved += nbytes
+            IMAGE_MEMORY_RESERVED.set(self._reserved)
+        IMAGE_ADMISSIONS.inc(outcome="queued" if queued else "admitted")
+
+    def release(self, nbytes):
+        """Devolve ao orçamento nbytes reservados por acquire."""
+        if not self.capacity:
+            return
+        with self._lock:
+            self._reserved -= nbytes
+            IMAGE_MEMORY_RESERVED.set(self._reserved)
+            self._released.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes, wait=None):
+        """Mantém nbytes reservados durante o bloco (ver acquire)."""
+        self.acquire(nbytes, wait)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
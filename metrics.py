@@ -0,0 +1,257 @@
+import logging
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# Métricas de Desempenho
+# ---------------------
+
+# Limites dos histogramas de tempo (em segundos) e de tamanho (em bytes)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(8))
+
+# Tipo de conteúdo do formato de texto do Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def label_text(labels):
+    """Formata os rótulos de uma série no formato do Prometheus."""
+    if not labels:
+        return ""
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+class Counter:
+    """Contador crescente, com uma série por combinação de rótulos."""
+
+    kind = "counter"
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+class Gauge(Counter):
+    """Valor que pode subir ou descer (o último valor definido)."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    """Histograma com limites fixos: cada observação custa uma busca binária e algumas somas."""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def summary(self):
+        """Retorna {rótulos: {"count", "sum", "mean", "p50", "p95"}}, com os percentis estimados pelos limites."""
+        with self._lock:
+            series = {key: (list(value["counts"]), value["sum"], value["count"]) for key, value in self._series.items()}
+        result = {}
+        for key, (counts, total, count) in series.items():
+            result[key] = {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "p50": self._quantile(counts, count, 0.5),
+                "p95": self._quantile(counts, count, 0.95)
+            }
+        return result
+
+    def _quantile(self, counts, count, fraction):
+        """Limite superior do primeiro intervalo que alcança a fração das observações."""
+        target = fraction * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(value["counts"]), value["sum"], value["count"]) for key, value in self._series.items()}
+        samples = []
+        for key, (counts, total, count) in series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((self.name + "_bucket", key + (("le", le),), cumulative))
+            samples.append((self.name + "_sum", key, total))
+            samples.append((self.name + "_count", key, count))
+        return samples
+
+class Registry:
+    """Conjunto das métricas do processo."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, description):
+        return self._register(Counter(name, description))
+
+    def gauge(self, name, description):
+        return self._register(Gauge(name, description))
+
+    def histogram(self, name, description, buckets=SECONDS_BUCKETS):
+        return self._register(Histogram(name, description, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Exporta todas as métricas no formato de texto do Prometheus."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+# Registro do processo e métricas da verificação
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("verification_stage_seconds", "Tempo de cada etapa da verificação")
+UPLOAD_BYTES = REGISTRY.histogram("vision_upload_bytes", "Bytes de imagem enviados ao Vision API por imagem", BYTES_BUCKETS)
+CACHE_REQUESTS = REGISTRY.counter("vision_cache_requests_total", "Consultas ao cache de respostas do Vision API")
+VERIFICATIONS = REGISTRY.counter("verifications_total", "Verificações concluídas")
+VERIFICATION_RSS = REGISTRY.histogram("verification_rss_bytes", "Memória residente ao fim de cada verificação", BYTES_BUCKETS)
+PEAK_RSS = REGISTRY.gauge("process_peak_rss_bytes", "Pico de memória residente do processo")
+STARTUP_SECONDS = REGISTRY.gauge("startup_phase_seconds", "Duração de cada etapa do aquecimento na inicialização")
+FIRST_VERIFICATION_SECONDS = REGISTRY.gauge("first_verification_seconds", "Duração da primeira verificação do processo")
+IMAGE_MEMORY_RESERVED = REGISTRY.gauge("image_memory_reserved_bytes", "Memória reservada para imagens em decodificação")
+IMAGE_ADMISSIONS = REGISTRY.counter("image_admissions_total", "Reservas no orçamento de memória das imagens, por resultado")
+
+@contextmanager
+def timed(stage):
+    """Mede o tempo de parede de uma etapa e o registra em verification_stage_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+def current_rss():
+    """Memória residente atual do processo, em bytes (0 se não estiver disponível)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def peak_rss():
+    """Pico de memória residente do processo, em bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def record_verification(outcome):
+    """Registra o fim de uma verificação: contagem por resultado e memória residente atual e de pico."""
+    VERIFICATIONS.inc(outcome=outcome)
+    rss = current_rss()
+    if rss:
+        VERIFICATION_RSS.observe(rss)
+    PEAK_RSS.set(peak_rss())
+
+def write_metrics(path):
+    """Grava as métricas no arquivo de forma atômica, para leitura pelo coletor de arquivos do Prometheus."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(temporary, path)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Responde GET /metrics com as métricas do processo."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+def start_exporter(port=0, path="", interval=15.0, host="127.0.0.1"):
+    """Inicia, uma única vez por processo, a exportação das métricas.
+
+    Com port, serve /metrics em host:port; com path, grava o arquivo a cada
+    interval segundos. Sem nenhum dos dois, não faz nada.
+    """
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started or not (port or path):
+            return
+        _exporter_started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            logger.error("Erro ao iniciar o servidor de métricas na porta %s: %s", port, e)
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+    if path:
+        def export():
+            while True:
+                try:
+                    write_metrics(path)
+                except OSError as e:
+                    logger.error("Erro ao gravar métricas em %s: %s", path, e)
+                time.sleep(interval)
+        threading.Thread(target=export, name="metrics-file", daemon=True).start()
@@ -0,0 +1,140 @@
+from bisect import bisect_left
+from document_index import DocumentIndex, lookup_key, tokenize
+
+# ---------------------
+# Busca Aproximada de Nomes
+# ---------------------
+
+# Distância de edição tolerada por parte do nome, conforme o tamanho da parte:
+# partes curtas (DA, DE, DOS) precisam ser exatas
+NAME_EXACT_MAX_LENGTH = 3
+NAME_ONE_EDIT_MAX_LENGTH = 7
+
+# Número máximo de tokens entre duas partes consecutivas do nome no texto
+# (pontuação e uma palavra abreviada ou omitida pelo OCR)
+NAME_MAX_GAP = 3
+
+def max_edits(part):
+    """Retorna a distância de edição tolerada para uma parte do nome."""
+    if len(part) <= NAME_EXACT_MAX_LENGTH:
+        return 0
+    if len(part) <= NAME_ONE_EDIT_MAX_LENGTH:
+        return 1
+    return 2
+
+def levenshtein(pattern, word, max_distance):
+    """Distância de Levenshtein entre duas palavras, calculada bit a bit (Myers/Hyyrö).
+
+    Cada caractere de word é processado com algumas operações sobre inteiros, em
+    vez de uma linha inteira da matriz de programação dinâmica. Retorna None se a
+    distância for maior que max_distance.
+    """
+    if abs(len(pattern) - len(word)) > max_distance:
+        return None
+    if not pattern:
+        return len(word)
+
+    peq = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    size = len(pattern)
+    full = (1 << size) - 1
+    last = 1 << (size - 1)
+    pv, mv, score = full, 0, size
+    for c in word:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score if score <= max_distance else None
+
+def part_occurrences(index, part):
+    """Retorna as ocorrências aproximadas de uma parte do nome no índice: [(posição, distância)].
+
+    A parte é comparada com cada palavra distinta do documento (e não com cada
+    ocorrência), descartando pelo tamanho as que não podem estar dentro da distância tolerada.
+    """
+    key = lookup_key(part)
+    limit = max_edits(key)
+    if limit == 0:
+        return [(position, 0) for position in index.positions.get(key, [])]
+
+    occurrences = []
+    for word, positions in index.positions.items():
+        if abs(len(word) - len(key)) > limit or not word.isalpha():
+            continue
+        distance = 0 if word == key else levenshtein(key, word, limit)
+        if distance is not None:
+            occurrences.extend((position, distance) for position in positions)
+    occurrences.sort()
+    return occurrences
+
+def find_name(name, document):
+    """Procura as partes do nome, na ordem, dentro de uma janela do texto.
+
+    As partes são comparadas com palavras inteiras, sem diferenciar acentos e
+    caixa, tolerando pequenos erros de OCR. A melhor sequência é escolhida por
+    programação dinâmica sobre as ocorrências de cada parte; partes ausentes
+    são puladas com pontuação zero. Retorna um dicionário com a pontuação (0 a
+    1, ponderada pelo tamanho das partes), as partes encontradas e ausentes, o
+    trecho correspondente no texto e sua posição.
+    """
+    index = DocumentIndex.of(document)
+    parts = [token[1] for token in tokenize(name or "") if token[0] == "word"]
+    total_weight = sum(len(part) for part in parts)
+
+    # best[j]: lista ordenada de (posição, pontuação acumulada, encadeamento) para
+    # sequências que terminam na parte j
+    best = []
+    for j, part in enumerate(parts):
+        weight = len(part) / total_weight
+        states = []
+        for position, distance in part_occurrences(index, part):
+            gain = weight * (1 - distance / len(part))
+            previous = None
+            for k in range(j):
+                # Janela permitida para a parte k: proporcional ao número de partes puladas
+                candidates = best[k]
+                lowest = position - NAME_MAX_GAP * (j - k)
+                start = bisect_left(candidates, (lowest,))
+                for state in candidates[start:bisect_left(candidates, (position,))]:
+                    if previous is None or state[1] > previous[1]:
+                        previous = state
+            score = gain + (previous[1] if previous else 0)
+            states.append((position, score, (j, position, distance), previous))
+        best.append(states)
+
+    final = max((state for states in best for state in states), key=lambda state: state[1], default=None)
+    matched = []
+    state = final
+    while state:
+        matched.append(state[2])
+        state = state[3]
+    matched.reverse()
+
+    # As partes ausentes vêm dos índices das partes, pois um nome pode repetir uma parte ("da")
+    matched_parts = {j for j, _, _ in matched}
+    result = {
+        "score": round(final[1], 4) if final else 0.0,
+        "found_parts": [parts[j] for j, _, _ in matched],
+        "missing_parts": [part for j, part in enumerate(parts) if j not in matched_parts],
+        "edits": sum(distance for _, _, distance in matched),
+        "span": None,
+        "text": None
+    }
+    if matched:
+        start = index.token_start(matched[0][1])
+        end = index.tokens[matched[-1][1]][3]
+        result["span"] = (start, end)
+        result["text"] = index.text[start:end]
+    return result
@@ -1,439 +1,49 @@
 import streamlit as st
-import io
-import numpy as np
-import cv2
-from PIL import Image, ExifTags
-from difflib import SequenceMatcher
-import re
 import os
+import time
 from dotenv import load_dotenv
-from google.cloud import vision
-import json
-import tempfile
+from verification import (
+    configure_vision_client, start_warmup, format_cpf, submit_verification, get_verification,
+    submit_preparation, start_metrics_exporter, metrics_snapshot, SECTION_STAGES
+)
+from metrics import REGISTRY
+from job_queue import JOB_QUEUED, JOB_RUNNING, JOB_FAILED
 
 # Carrega as variáveis de ambiente
 load_dotenv()
 
-# ---------------------
-# Configurações e Constantes
-# ---------------------
-
-# Configurações de detecção facial
-FACE_CONFIDENCE_THRESHOLD = 0.8
-
-# Padrões de CPF
-CPF_PATTERNS = [
-    r'CPF\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',  # CPF: 123.456.789-00
-    r'CPF\s*:?\s*(\d{11})',                         # CPF: 12345678900
-    r'CPF\s*:?\s*(\d{3}\.?\d{3}\.?\d{3})',         # CPF: 123.456.789 (faltando últimos dígitos)
-    r'CPF\s*[Nn][ºo°]\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',  # CPF Nº: 123.456.789-00
-    r'CPF\s*[Nn][ºo°]\s*:?\s*(\d{11})',            # CPF Nº: 12345678900
-    r'Cadastro\s+de\s+Pessoas?\s+Físicas?:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',  # Nome completo do CPF
-    r'Cadastro\s+de\s+Pessoas?\s+Físicas?:?\s*(\d{11})',
-    # Adiciona versões case insensitive
-    r'cpf\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
-    r'cpf\s*:?\s*(\d{11})',
-    r'cpf\s*[Nn][ºo°]\s*:?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
-    r'cpf\s*[Nn][ºo°]\s*:?\s*(\d{11})'
-]
-
-# Campos de nome
-NAME_FIELDS = [
-    "nome:", "nome", 
-    "nome e sobrenome:", "nome e sobrenome",
-    "NOME:", "NOME",
-    "NOME E SOBRENOME:", "NOME E SOBRENOME"
-]
-
-# Indicadores que não são nomes
-NON_NAME_INDICATORS = [
-    "cpf", "rg", "identidade", "cnh", "nascimento", "data",
-    "endereço", "endereco", "residência", "residencia",
-    "número", "numero", "telefone", "celular", "email",
-    "valor", "total", "vencimento", "conta", "banco",
-    "agência", "agencia", "documento"
-]
-
-# Mapeamento de tipos de logradouro
-STREET_TYPE_MAP = {
-    'rua': 'Rua',
-    'r.': 'Rua',
-    'r': 'Rua',
-    'avenida': 'Avenida',
-    'av.': 'Avenida',
-    'av': 'Avenida',
-    'alameda': 'Alameda',
-    'al.': 'Alameda',
-    'al': 'Alameda',
-    'travessa': 'Travessa',
-    'tv.': 'Travessa',
-    'tv': 'Travessa',
-    'praça': 'Praça',
-    'pça.': 'Praça',
-    'pça': 'Praça',
-    'servidão': 'Servidão',
-    'servid': 'Servidão',
-    'sv.': 'Servidão',
-    'sv': 'Servidão'
-}
-
 # ---------------------
 # Configuração do Google Cloud
 # ---------------------
 
-def setup_google_credentials():
-    """Configura as credenciais do Google Cloud tanto para ambiente local quanto para Streamlit Cloud."""
-    try:
-        # Verifica se estamos no Streamlit Cloud checando a variável de ambiente
-        if 'google_credentials' in st.secrets:
-            # Cria um dicionário com as credenciais do formato TOML
-            credentials = {
-                "type": st.secrets.google_credentials.type,
-                "project_id": st.secrets.google_credentials.project_id,
-                "private_key_id": st.secrets.google_credentials.private_key_id,
-                "private_key": st.secrets.google_credentials.private_key,
-                "client_email": st.secrets.google_credentials.client_email,
-                "client_id": st.secrets.google_credentials.client_id,
-                "auth_uri": st.secrets.google_credentials.auth_uri,
-                "token_uri": st.secrets.google_credentials.token_uri,
-                "auth_provider_x509_cert_url": st.secrets.google_credentials.auth_provider_x509_cert_url,
-                "client_x509_cert_url": st.secrets.google_credentials.client_x509_cert_url
-            }
-            
-            # Usa um arquivo temporário para armazenar as credenciais
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                json.dump(credentials, f)
-                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = f.name
-        else:
-            # Em ambiente local, usa o arquivo .credentials.json
-            if not os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = '.credentials.json'
-    except Exception as e:
-        st.error(f"Erro ao configurar credenciais do Google Cloud: {str(e)}")
-        return False
-    return True
+def google_credentials_info():
+    """Retorna as credenciais da conta de serviço definidas em st.secrets (Streamlit Cloud), ou None em ambiente local."""
+    if 'google_credentials' in st.secrets:
+        # As credenciais são usadas diretamente em memória, sem gravar arquivos temporários
+        return dict(st.secrets.google_credentials)
+    # Em ambiente local, usa o arquivo .credentials.json
+    if not os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = '.credentials.json'
+    return None
 
-# Configura as credenciais antes de inicializar o cliente
-if setup_google_credentials():
-    # Inicializa o cliente do Vision API
-    vision_client = vision.ImageAnnotatorClient()
-else:
+@st.cache_resource
+def setup_vision_client():
+    """Cria o cliente do Vision API uma única vez por processo, reutilizado por todas as sessões e execuções do script.
+
+    O token e as conexões do Vision API são preparados em segundo plano, enquanto a página é exibida.
+    """
+    start_metrics_exporter()
+    client = configure_vision_client(google_credentials_info())
+    start_warmup()
+    return client
+
+try:
+    setup_vision_client()
+except Exception as e:
+    st.error(f"Erro ao configurar credenciais do Google Cloud: {str(e)}")
     st.error("Falha ao configurar credenciais do Google Cloud. Verifique sua configuração.")
     st.stop()
 
-# ---------------------
-# Funções Auxiliares
-# ---------------------
-
-def process_image(uploaded_file):
-    """Processa uma imagem carregada, corrigindo orientação e convertendo para RGB se necessário."""
-    try:
-        image = Image.open(uploaded_file)
-        image = fix_image_orientation(image)
-        if image.mode == "RGBA":
-            image = image.convert("RGB")
-        bytes_io = io.BytesIO()
-        image.save(bytes_io, format="JPEG")
-        return bytes_io.getvalue()
-    except Exception as e:
-        st.error(f"Erro ao processar imagem: {str(e)}")
-        return None
-
-def fix_image_orientation(image):
-    """Corrige a orientação da imagem com base nos metadados EXIF para evitar imagens rotacionadas."""
-    try:
-        for orientation in ExifTags.TAGS.keys():
-            if ExifTags.TAGS[orientation] == "Orientation":
-                break
-        exif = dict(image._getexif().items())
-        if orientation in exif:
-            if exif[orientation] == 3:
-                image = image.rotate(180, expand=True)
-            elif exif[orientation] == 6:
-                image = image.rotate(270, expand=True)
-            elif exif[orientation] == 8:
-                image = image.rotate(90, expand=True)
-    except (AttributeError, KeyError, IndexError):
-        pass  # Nenhum dado EXIF encontrado; retorna como está
-    return image
-
-def extract_text(image_data):
-    """Extrai texto da imagem usando Google Cloud Vision API."""
-    try:
-        # Cria a imagem para o Vision API
-        image = vision.Image(content=image_data)
-        
-        # Realiza o reconhecimento de texto
-        response = vision_client.text_detection(image=image)
-        texts = response.text_annotations
-        
-        if texts:
-            # O primeiro texto contém todo o conteúdo detectado
-            return texts[0].description
-        
-        if response.error.message:
-            raise Exception(
-                '{}\nPara mais informações:\n{}'.format(
-                    response.error.message,
-                    response.error.details
-                )
-            )
-            
-    except Exception as e:
-        st.error(f"Erro ao extrair texto: {str(e)}")
-    return None
-
-def detect_face(image_data):
-    """Detecta rosto usando Google Cloud Vision API."""
-    try:
-        # Cria a imagem para o Vision API
-        image = vision.Image(content=image_data)
-        
-        # Realiza a detecção facial
-        response = vision_client.face_detection(image=image)
-        faces = response.face_annotations
-        
-        if faces:
-            # Retorna a confiança da detecção do primeiro rosto
-            return faces[0]
-        
-        if response.error.message:
-            raise Exception(
-                '{}\nPara mais informações:\n{}'.format(
-                    response.error.message,
-                    response.error.details
-                )
-            )
-            
-    except Exception as e:
-        st.error(f"Erro ao detectar rosto: {str(e)}")
-    return None
-
-def compare_faces(face1, face2):
-    """Compara dois rostos usando os dados do Google Cloud Vision API."""
-    if face1 and face2:
-        # Calcula a similaridade baseada na confiança da detecção
-        confidence = min(face1.detection_confidence, face2.detection_confidence)
-        # Considera rostos idênticos se a confiança for alta
-        is_identical = confidence > FACE_CONFIDENCE_THRESHOLD
-        return is_identical, confidence
-    return False, 0
-
-def compare_names(name1, name2):
-    """Compara duas strings usando uma taxa de similaridade simples."""
-    return SequenceMatcher(None, name1.lower(), name2.lower()).ratio()
-
-def normalize_text(text, uppercase=False):
-    """Normaliza o texto removendo espaços extras, quebras de linha e opcionalmente converte para maiúsculas."""
-    if not text:
-        return ""
-    normalized = ' '.join(text.replace('\n', ' ').split())
-    return normalized.upper() if uppercase else normalized
-
-def extract_cpf_from_text(text):
-    """Extrai CPF do texto do documento com correspondência de padrões aprimorada."""
-    if not text:
-        return None
-    
-    # Normaliza o texto
-    text = normalize_text(text)
-    
-    try:
-        for pattern in CPF_PATTERNS:
-            match = re.search(pattern, text)
-            if match:
-                cpf = match.group(1)
-                # Limpa o número do CPF (remove separadores)
-                cpf = cpf.replace('.', '').replace('-', '').replace('/', '')
-                
-                # Valida se parece um CPF (11 dígitos)
-                if len(cpf) == 11 and cpf.isdigit():
-                    # Formata CPF como XXX.XXX.XXX-XX
-                    return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
-                elif len(cpf) >= 9:  # Se temos pelo menos os primeiros 9 dígitos
-                    # Tenta encontrar os dígitos restantes após este match
-                    remaining_digits = re.search(r'\d{2}', text[match.end():])
-                    if remaining_digits:
-                        cpf = cpf + remaining_digits.group(0)
-                        if len(cpf) == 11:
-                            return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
-        
-        # Se nenhum CPF foi encontrado com os padrões, tenta encontrar qualquer número de 11 dígitos
-        numbers = re.findall(r'\d+', text)
-        for num in numbers:
-            if len(num) == 11:
-                return f"{num[:3]}.{num[3:6]}.{num[6:9]}-{num[9:]}"
-            
-    except Exception as e:
-        st.error(f"Erro ao extrair CPF: {str(e)}")
-    return None
-
-def extract_name_from_text(text):
-    """Extrai nome do texto do documento procurando por campos de nome."""
-    if not text:
-        return None
-    
-    # Normaliza o texto
-    text = normalize_text(text)
-    lines = text.split()
-    
-    try:
-        # Procura por campos de nome explícitos
-        nome_index = -1
-        name_fields = [
-            "nome:", "nome", 
-            "nome e sobrenome:", "nome e sobrenome",
-            "NOME:", "NOME",
-            "NOME E SOBRENOME:", "NOME E SOBRENOME"
-        ]
-        
-        # Lista de palavras que indicam que não é um nome
-        non_name_indicators = [
-            "cpf", "rg", "identidade", "cnh", "nascimento", "data",
-            "endereço", "endereco", "residência", "residencia",
-            "número", "numero", "telefone", "celular", "email",
-            "valor", "total", "vencimento", "conta", "banco",
-            "agência", "agencia", "documento"
-        ]
-        
-        # Encontra a primeira ocorrência de qualquer campo de nome
-        for i, word in enumerate(lines):
-            if i + 2 < len(lines):
-                three_word_field = f"{word} {lines[i+1]} {lines[i+2]}".lower()
-                if three_word_field in ["nome e sobrenome:", "nome e sobrenome"]:
-                    nome_index = i + 2
-                    break
-            
-            if word.lower() in ["nome:", "nome"]:
-                nome_index = i
-                break
-        
-        # Se encontrou um campo de nome, extrai o nome após o campo
-        if nome_index != -1 and nome_index + 1 < len(lines):
-            name_parts = []
-            i = nome_index + 1
-            while i < len(lines) and i < nome_index + 6:
-                current_word = lines[i].lower()
-                if current_word in non_name_indicators:
-                    break
-                
-                cleaned_word = ''.join(c for c in lines[i] if c.isalpha() or c.isspace())
-                cleaned_word = ' '.join(cleaned_word.split())
-                if re.match(r'^[A-Za-zÀ-ÿ\s]+$', cleaned_word) and len(cleaned_word) > 1:
-                    name_parts.append(cleaned_word)
-                i += 1
-            
-            if name_parts:
-                full_name = ' '.join(name_parts)
-                return ' '.join(word.capitalize() for word in full_name.split())
-                
-    except Exception as e:
-        st.error(f"Erro ao extrair nome: {str(e)}")
-    return None
-
-def extract_address_from_text(text):
-    """Extrai endereço do texto do documento."""
-    if not text:
-        return None
-    
-    # Normaliza o texto
-    text = normalize_text(text)
-    
-    try:
-        # Primeiro, tenta encontrar um padrão direto de endereço de rua
-        direct_address = re.search(
-            r'(?:rua|r\.|avenida|av\.|alameda|al\.|travessa|tv\.|praça|pça\.|servid[ãa]o|sv\.?)\s+[^\d,\.]+[,\s]+(?:n[º°]?\.?\s*)?(\d+)',
-            text,
-            re.IGNORECASE
-        )
-        
-        if direct_address:
-            # Obtém o match completo e limpa
-            address = direct_address.group(0).strip()
-            # Padroniza o tipo de logradouro
-            street_type_map = {
-                'rua': 'Rua',
-                'r.': 'Rua',
-                'r': 'Rua',
-                'avenida': 'Avenida',
-                'av.': 'Avenida',
-                'av': 'Avenida',
-                'alameda': 'Alameda',
-                'al.': 'Alameda',
-                'al': 'Alameda',
-                'travessa': 'Travessa',
-                'tv.': 'Travessa',
-                'tv': 'Travessa',
-                'praça': 'Praça',
-                'pça.': 'Praça',
-                'pça': 'Praça',
-                'servidão': 'Servidão',
-                'servid': 'Servidão',
-                'sv.': 'Servidão',
-                'sv': 'Servidão'
-            }
-            
-            # Obtém o tipo de logradouro do início do endereço
-            street_type = address.split()[0].lower().rstrip('.:,')
-            street_type = street_type_map.get(street_type, street_type.capitalize())
-            
-            # Obtém o resto do endereço (nome da rua e número)
-            rest_of_address = ' '.join(address.split()[1:])
-            
-            # Limpa caracteres extras e formata o número
-            rest_of_address = re.sub(r'n[º°]?\.?\s*(\d+)', r'\1', rest_of_address)
-            rest_of_address = re.sub(r'\s+', ' ', rest_of_address)
-            rest_of_address = rest_of_address.strip('.:,')
-            
-            # Formata o endereço final
-            if ',' in rest_of_address:
-                street_name, number = rest_of_address.rsplit(',', 1)
-                return f"{street_type} {street_name.strip()}, {number.strip()}"
-            else:
-                # Se não houver vírgula, tenta separar o número do nome da rua
-                match = re.match(r'(.*?)\s*(\d+)\s*$', rest_of_address)
-                if match:
-                    street_name, number = match.groups()
-                    return f"{street_type} {street_name.strip()}, {number.strip()}"
-                return f"{street_type} {rest_of_address}"
-            
-        # Se não encontrar match direto, tenta os padrões originais
-        address_patterns = [
-            r'endere[çc]o\s*:?\s*([^,\.]*(?:,|\.)?(?:[^,\.]*(?:,|\.))*[^,\.]*)',
-            r'resid[êe]ncia\s*:?\s*([^,\.]*(?:,|\.)?(?:[^,\.]*(?:,|\.))*[^,\.]*)',
-            r'local\s*:?\s*([^,\.]*(?:,|\.)?(?:[^,\.]*(?:,|\.))*[^,\.]*)',
-        ]
-        
-        for pattern in address_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                # Tenta encontrar um endereço de rua dentro do texto correspondente
-                address_text = match.group(1)
-                direct_match = re.search(
-                    r'(?:rua|r\.|avenida|av\.|alameda|al\.|travessa|tv\.|praça|pça\.|servid[ãa]o|sv\.?)\s+[^\d,\.]+[,\s]+(?:n[º°]?\.?\s*)?(\d+)',
-                    address_text,
-                    re.IGNORECASE
-                )
-                if direct_match:
-                    return extract_address_from_text(direct_match.group(0))
-            
-    except Exception as e:
-        st.error(f"Erro ao extrair endereço: {str(e)}")
-    return None
-
-def cleanup():
-    """Limpa arquivos temporários de credenciais."""
-    try:
-        creds_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        if creds_path and creds_path.endswith('.json') and os.path.exists(creds_path):
-            os.remove(creds_path)
-    except Exception as e:
-        st.warning(f"Aviso ao limpar arquivos temporários: {str(e)}")
-
-# Registra a função de limpeza para ser executada quando o aplicativo for fechado
-import atexit
-atexit.register(cleanup)
-
 # ---------------------
 # Layout do Aplicativo Streamlit
 # ---------------------
@@ -453,9 +63,7 @@ with col2:
     # Entrada do CPF com máscara
     input_cpf = st.text_input("Digite seu CPF (formato: XXX.XXX.XXX-XX):", key="input_cpf")
     # Limpa a entrada do CPF
-    input_cpf = ''.join(filter(str.isdigit, input_cpf))
-    if input_cpf and len(input_cpf) == 11:
-        input_cpf = f"{input_cpf[:3]}.{input_cpf[3:6]}.{input_cpf[6:9]}-{input_cpf[9:]}"
+    input_cpf = format_cpf(input_cpf)
 
 # ---------------------
 # Seção de Upload de Documentos
@@ -476,6 +84,330 @@ with col5:
     st.subheader("Selfie")
     uploaded_selfie = st.file_uploader("Envie sua selfie", type=["jpg", "png", "jpeg"], key="selfie")
 
+def prepare_upload(key, uploaded_file):
+    """Inicia o processamento da imagem assim que ela é carregada, enquanto o usuário envia as demais.
+
+    A sessão guarda, por campo, o arquivo carregado e o job de processamento;
+    um arquivo substituído ou removido descarta o job anterior da sessão.
+    """
+    prepared = st.session_state.setdefault("prepared_uploads", {})
+    if uploaded_file is None:
+        prepared.pop(key, None)
+        return
+    if key in prepared and prepared[key]["file_id"] == uploaded_file.file_id:
+        return
+    job_id = submit_preparation(key, uploaded_file)
+    prepared[key] = {"file_id": uploaded_file.file_id, "job": job_id}
+
+for key, uploaded_file in (("document", uploaded_document),
+                           ("residence", uploaded_residence),
+                           ("selfie", uploaded_selfie)):
+    prepare_upload(key, uploaded_file)
+
+# ---------------------
+# Exibição dos Resultados
+# ---------------------
+
+# Intervalo (em segundos) entre as consultas ao job de verificação em andamento
+POLL_INTERVAL = 0.5
+
+# Nomes das etapas da verificação exibidos no progresso
+STAGE_LABELS = {
+    "input": "Dados informados",
+    "images": "Processamento das imagens",
+    "annotate": "Análise das imagens",
+    "document_ocr": "Leitura do documento de identidade",
+    "residence_ocr": "Leitura do comprovante de residência",
+    "selfie_ocr": "Rosto da selfie",
+    "document_fields": "Nome e CPF do documento",
+    "residence_fields": "Nome, CPF e endereço do comprovante",
+    "face_match": "Comparação facial"
+}
+STAGE_ICONS = {"pending": "⏳", "done": "✅", "failed": "⚠️", "error": "❌", "skipped": "⏭️"}
+
+def render_rejection(result):
+    """Exibe o motivo de uma verificação recusada antes das comparações. Retorna False se não foi recusada."""
+    if result.get("rejected") == "image":
+        st.error("❌ Erro ao processar uma ou mais imagens.")
+    elif result.get("rejected") == "face":
+        # Imagens sem rosto foram recusadas antes de qualquer chamada ao Vision API
+        for key, label in (("document", "no documento de identidade"), ("selfie", "na selfie")):
+            if key in result["errors"]:
+                st.error(f"❌ Nenhum rosto encontrado {label}. Envie uma foto em que o rosto esteja visível.")
+    elif result.get("rejected") == "input":
+        # Dados informados inválidos na política "fail_fast": nenhuma imagem foi analisada
+        st.error(f"❌ Dados informados inválidos: {result['errors']['input']}")
+    elif result.get("rejected") == "duplicate":
+        # Imagens já enviadas por outro CPF foram encaminhadas à revisão sem chamar o Vision API
+        st.error("❌ Uma ou mais imagens já foram enviadas em outra verificação. A verificação foi encaminhada para revisão.")
+    else:
+        return False
+    return True
+
+def render_stages(stages):
+    """Exibe o estado e a duração de cada etapa da verificação."""
+    for name, stage in stages.items():
+        line = f"{STAGE_ICONS.get(stage['status'], '⏳')} {STAGE_LABELS.get(name, name)}"
+        if stage.get("seconds"):
+            line += f" ({stage['seconds']:.1f} s)"
+        st.caption(line)
+
+def render_waiting(status):
+    """Exibe o lugar de uma seção ainda não avaliada: aguardando ou não analisada."""
+    if status == "skipped":
+        st.caption("⏭️ Não analisado")
+    elif status == "error":
+        st.caption("❌ Erro nesta etapa")
+    else:
+        st.caption("⏳ Aguardando...")
+
+def render_name(document, residence, statuses):
+    """Seção do nome: no documento de identidade e no comprovante de residência."""
+    st.subheader("📝 Verificação do Nome")
+    col6, col7 = st.columns(2)
+    
+    with col6:
+        st.write("Documento de Identidade:")
+        if document is None:
+            render_waiting(statuses["document"])
+        elif document["name"]["found"]:
+            if document["name"]["match"]:
+                st.success("✅ Nome corresponde")
+            else:
+                st.error("❌ Nome não corresponde")
+            st.info(f"Nome encontrado: {document['name']['found']}")
+        else:
+            st.error("❌ Não foi possível extrair o nome do documento")
+    
+    with col7:
+        st.write("Comprovante de Residência:")
+        if residence is None:
+            render_waiting(statuses["residence"])
+            return
+        residence_name = residence["name"]
+        if residence_name:  # Se temos um nome do documento, procuramos ele no comprovante
+            if residence_name["match"]:
+                st.success("✅ Nome corresponde")
+                st.info(f"Nome encontrado: {residence_name['text']}")
+                if residence_name["edits"]:
+                    st.caption(f"Similaridade: {residence_name['score']:.0%} (diferenças de OCR toleradas)")
+            else:
+                st.error("❌ Nome não corresponde")
+                st.warning("Nome do documento não encontrado no comprovante de residência")
+                
+                # Cria uma seção expansível para depuração
+                with st.expander("Detalhes da verificação", expanded=False):
+                    st.write("Nome procurado:", residence_name["searched"])
+                    st.write("Partes encontradas:", ", ".join(residence_name["found_parts"]))
+                    st.write("Partes não encontradas:", ", ".join(residence_name["missing_parts"]))
+        else:
+            st.error("❌ Não foi possível validar o nome no comprovante (nome do documento não encontrado)")
+
+def render_cpf(document, residence, statuses):
+    """Seção do CPF: no documento de identidade e no comprovante de residência."""
+    st.subheader("🔢 Verificação do CPF")
+    col8, col9 = st.columns(2)
+    
+    with col8:
+        st.write("Documento de Identidade:")
+        if document is None:
+            render_waiting(statuses["document"])
+        elif document["cpf"]["found"]:
+            if document["cpf"]["match"]:
+                st.success("✅ CPF corresponde")
+            else:
+                st.error("❌ CPF não corresponde")
+            st.info(f"CPF encontrado: {document['cpf']['found']}")
+        else:
+            st.error("❌ Não foi possível extrair o CPF do documento")
+    
+    with col9:
+        st.write("Comprovante de Residência:")
+        if residence is None:
+            render_waiting(statuses["residence"])
+        elif residence["cpf"]["found"]:
+            if residence["cpf"]["match"]:
+                st.success("✅ CPF corresponde")
+            else:
+                st.error("❌ CPF não corresponde")
+            st.info(f"CPF encontrado: {residence['cpf']['found']}")
+        else:
+            st.error("❌ Não foi possível encontrar o CPF no comprovante")
+
+def render_face(face, statuses):
+    """Seção da comparação facial entre o documento e a selfie."""
+    st.subheader("👤 Verificação Facial")
+    if face is None:
+        render_waiting(statuses["face"])
+    elif face["detected"]:
+        confidence = face["confidence"]
+        if face["match"]:
+            st.success(f"✅ Rosto verificado com {confidence*100:.2f}% de similaridade")
+        else:
+            st.error(f"❌ Verificação facial falhou (Similaridade: {confidence*100:.2f}%)")
+        if face.get("repeats"):
+            st.warning("⚠️ Rosto da selfie semelhante ao de um documento enviado com outro CPF "
+                       f"(similaridade: {face['repeats'][0]['similarity']*100:.0f}%)")
+    else:
+        st.error("❌ Não foi possível detectar rostos em uma ou ambas as imagens")
+
+def render_address(residence, residence_text, statuses):
+    """Seção do endereço extraído do comprovante de residência."""
+    st.subheader("📍 Informações de Endereço")
+    if residence is None:
+        render_waiting(statuses["residence"])
+        return
+    
+    # Exibe o endereço extraído do comprovante de residência
+    residence_address = residence["address"]["found"]
+    if residence_address:
+        st.success("✅ Endereço encontrado no comprovante de residência:")
+        st.write(residence_address)
+        
+        # Exibe os demais campos do endereço encontrados
+        address_fields = residence["address"]["fields"]
+        for field, label in (("complement", "Complemento"), ("neighborhood", "Bairro"),
+                             ("city", "Cidade"), ("state", "Estado"), ("cep", "CEP")):
+            if address_fields[field]:
+                st.caption(f"{label}: {address_fields[field]}")
+        
+        # Cria uma seção expansível para depuração/verificação
+        with st.expander("Ver texto completo extraído do documento", expanded=False):
+            st.caption("Texto extraído do documento para verificação:")
+            st.text_area("Texto completo:", residence_text, height=100)
+    else:
+        st.error("❌ Não foi possível extrair o endereço do comprovante de residência")
+        st.info("Por favor, verifique se o documento está legível e contém informações de endereço.")
+        
+        # Mostra o texto extraído para depuração em uma seção recolhida
+        with st.expander("Ver texto extraído do documento", expanded=False):
+            st.caption("Texto extraído do documento:")
+            st.text_area("Texto completo:", residence_text, height=100)
+
+def render_images(images):
+    """Relatório da normalização das imagens enviadas ao Vision API."""
+    with st.expander("Detalhes do processamento das imagens", expanded=False):
+        for key, label in (("document", "Documento de identidade"),
+                           ("residence", "Comprovante de residência"),
+                           ("selfie", "Selfie")):
+            report = images[key]
+            if report["passthrough"]:
+                st.write(f"{label}: {report['original_bytes'] / 1024:.0f} KB enviados sem recodificação")
+            else:
+                st.write(
+                    f"{label}: {report['original_bytes'] / 1024:.0f} KB → "
+                    f"{report['normalized_bytes'] / 1024:.0f} KB "
+                    f"({report['saved_bytes'] / 1024:.0f} KB economizados, "
+                    f"{report['size'][0]}x{report['size'][1]} px, qualidade {report['quality']})"
+                )
+            crop = report.get("document_crop")
+            if crop and crop["found"]:
+                st.caption(
+                    f"Documento localizado e recortado: {crop['size'][0]}x{crop['size'][1]} px, "
+                    f"{crop['crop_bytes'] / 1024:.0f} KB enviados para o OCR"
+                )
+            face = report.get("face")
+            if face and face["found"]:
+                st.caption(
+                    f"Rosto recortado localmente: {face['crop_box'][2]}x{face['crop_box'][3]} px, "
+                    f"{face['crop_bytes'] / 1024:.0f} KB enviados para a detecção facial"
+                )
+
+def render_sections(sections, texts, stages):
+    """Exibe as seções do resultado; as ainda não avaliadas aparecem como aguardando ou não analisadas."""
+    statuses = {
+        section: stages.get(stage, {}).get("status", "pending")
+        for section, stage in SECTION_STAGES.items()
+    }
+    render_name(sections.get("document"), sections.get("residence"), statuses)
+    render_cpf(sections.get("document"), sections.get("residence"), statuses)
+    render_face(sections.get("face"), statuses)
+    render_address(sections.get("residence"), texts.get("residence"), statuses)
+
+def render_progress(progress):
+    """Exibe uma verificação em andamento: o estado de cada etapa e as seções já avaliadas."""
+    st.header("Resultados da Validação")
+    if not progress:
+        st.caption("⏳ Iniciando a verificação...")
+        return
+    with st.expander("Etapas da verificação", expanded=True):
+        render_stages(progress["stages"])
+    render_sections(progress["sections"], progress["texts"], progress["stages"])
+
+def render_result(result):
+    """Exibe o resultado de uma verificação concluída."""
+    if render_rejection(result):
+        return
+
+    for message in result.get("findings", {}).get("input", []):
+        st.warning(f"⚠️ {message}")
+    skipped = [name for name, stage in result.get("stages", {}).items() if stage["status"] == "skipped"]
+    if skipped:
+        st.info("ℹ️ A verificação foi interrompida após as pendências do documento de identidade; "
+                "o comprovante de residência e a selfie não foram analisados.")
+
+    for key, label in (("document", "documento de identidade"),
+                       ("residence", "comprovante de residência"),
+                       ("selfie", "selfie")):
+        if key in result["errors"]:
+            st.warning(f"⚠️ Erro ao analisar {label}: {result['errors'][key]}")
+        if key in result.get("duplicates", {}):
+            st.warning(f"⚠️ Imagem semelhante a uma já enviada com outro CPF: {label}")
+    
+    # Exibe os resultados de forma organizada
+    st.header("Resultados da Validação")
+    stages = result.get("stages", {})
+    if stages:
+        with st.expander("Etapas da verificação", expanded=False):
+            render_stages(stages)
+    
+    # As seções não avaliadas pela política "fail_fast" aparecem como não analisadas
+    sections = {
+        "document": {"name": result["name"]["document"], "cpf": result["cpf"]["document"]},
+        "residence": {"name": result["name"]["residence"], "cpf": result["cpf"]["residence"],
+                      "address": result["address"]},
+        "face": result["face"]
+    }
+    for section, stage in SECTION_STAGES.items():
+        if stages.get(stage, {}).get("status") == "skipped":
+            sections[section] = None
+    render_sections(sections, result["texts"], stages)
+    render_images(result["images"])
+
+# ---------------------
+# Painel Administrativo
+# ---------------------
+
+# Token que habilita o painel de métricas na barra lateral, ao abrir o app com ?admin=<token> (vazio desativa)
+ADMIN_TOKEN = os.getenv("METRICS_ADMIN_TOKEN", "")
+
+def render_metrics():
+    """Exibe os tempos por etapa e o estado do Vision API, do cache e da fila de verificações."""
+    snapshot = metrics_snapshot()
+    st.write("Tempo por etapa (ms):")
+    st.dataframe(
+        {
+            "etapa": list(snapshot["stages"]),
+            "execuções": [stage["count"] for stage in snapshot["stages"].values()],
+            "média": [stage["mean"] * 1000 for stage in snapshot["stages"].values()],
+            "p50 ≤": [stage["p50"] * 1000 for stage in snapshot["stages"].values()],
+            "p95 ≤": [stage["p95"] * 1000 for stage in snapshot["stages"].values()]
+        },
+        hide_index=True
+    )
+    st.caption(f"Memória de pico do processo: {snapshot['peak_rss'] / 2 ** 20:.0f} MB")
+    for key, label in (("cache", "Cache"), ("policy", "Política de chamadas"),
+                       ("client", "Canais do Vision API"), ("queue", "Fila de verificações"),
+                       ("preparation", "Processamento antecipado das imagens")):
+        if snapshot[key] is not None:
+            st.write(f"{label}:")
+            st.json(snapshot[key], expanded=False)
+    st.code(REGISTRY.render(), language="text")
+
+if ADMIN_TOKEN and st.query_params.get("admin") == ADMIN_TOKEN:
+    with st.sidebar.expander("Métricas de desempenho", expanded=False):
+        render_metrics()
+
 # ---------------------
 # Seção de Validação
 # ---------------------
@@ -485,156 +417,32 @@ if st.button("🔍 Validar Documentos", type="primary"):
     elif not uploaded_document or not uploaded_residence or not uploaded_selfie:
         st.error("⚠️ Por favor, envie todos os documentos necessários antes de prosseguir.")
     else:
-        with st.spinner("Processando documentos..."):
-            # Processa as imagens
-            doc_data = process_image(uploaded_document)
-            residence_data = process_image(uploaded_residence)
-            selfie_data = process_image(uploaded_selfie)
-            
-            if not all([doc_data, residence_data, selfie_data]):
-                st.error("❌ Erro ao processar uma ou mais imagens.")
-                st.stop()
-            
-            # Extrai texto e faces
-            document_text = extract_text(doc_data)
-            document_face = detect_face(doc_data)
-            residence_text = extract_text(residence_data)
-            selfie_face = detect_face(selfie_data)
-            
-            # Extrai informações dos documentos
-            doc_name = extract_name_from_text(document_text)
-            doc_cpf = extract_cpf_from_text(document_text)
-            
-            # Exibe os resultados de forma organizada
-            st.header("Resultados da Validação")
-            
-            # Compara o nome fornecido com os documentos
-            st.subheader("📝 Verificação do Nome")
-            col6, col7 = st.columns(2)
-            
-            with col6:
-                st.write("Documento de Identidade:")
-                if doc_name:
-                    if doc_name.lower() == input_name.lower():
-                        st.success("✅ Nome corresponde")
-                    else:
-                        st.error("❌ Nome não corresponde")
-                    st.info(f"Nome encontrado: {doc_name}")
-                else:
-                    st.error("❌ Não foi possível extrair o nome do documento")
-            
-            with col7:
-                st.write("Comprovante de Residência:")
-                if doc_name:  # Se temos um nome do documento, procuramos ele no comprovante
-                    # Prepara o texto e o nome para comparação
-                    clean_text = normalize_text(residence_text, uppercase=True)
-                    clean_name = normalize_text(doc_name, uppercase=True)
-                    
-                    # Procura pelo nome exato no texto
-                    if clean_name in clean_text:
-                        st.success("✅ Nome corresponde")
-                        st.info(f"Nome encontrado: {doc_name}")
-                    else:
-                        # Tenta encontrar o nome dividido em partes
-                        name_parts = clean_name.split()
-                        found_parts = []
-                        
-                        # Verifica cada parte do nome no texto
-                        for part in name_parts:
-                            if part in clean_text:
-                                found_parts.append(part)
-                        
-                        # Se todas as partes foram encontradas
-                        if len(found_parts) == len(name_parts):
-                            st.success("✅ Nome corresponde")
-                            st.info(f"Nome encontrado: {doc_name}")
-                        else:
-                            st.error("❌ Nome não corresponde")
-                            st.warning("Nome do documento não encontrado no comprovante de residência")
-                            
-                            # Cria uma seção expansível para depuração
-                            with st.expander("Detalhes da verificação", expanded=False):
-                                st.write("Nome procurado:", clean_name)
-                                st.write("Partes encontradas:", ", ".join(found_parts))
-                                st.write("Partes não encontradas:", ", ".join(set(name_parts) - set(found_parts)))
-                else:
-                    st.error("❌ Não foi possível validar o nome no comprovante (nome do documento não encontrado)")
-            
-            # Compara o CPF fornecido com os documentos
-            st.subheader("🔢 Verificação do CPF")
-            col8, col9 = st.columns(2)
-            
-            with col8:
-                st.write("Documento de Identidade:")
-                if doc_cpf:
-                    if doc_cpf == input_cpf:
-                        st.success("✅ CPF corresponde")
-                    else:
-                        st.error("❌ CPF não corresponde")
-                    st.info(f"CPF encontrado: {doc_cpf}")
-                else:
-                    st.error("❌ Não foi possível extrair o CPF do documento")
-            
-            with col9:
-                st.write("Comprovante de Residência:")
-                if doc_cpf:
-                    if doc_cpf == input_cpf:
-                        st.success("✅ CPF corresponde")
-                    else:
-                        st.error("❌ CPF não corresponde")
-                    st.info(f"CPF encontrado: {doc_cpf}")
-                else:
-                    # Fallback: Tenta encontrar o CPF no texto completo se doc_cpf estiver disponível
-                    if doc_cpf:
-                        # Remove toda a formatação do doc_cpf para comparação
-                        clean_doc_cpf = ''.join(filter(str.isdigit, doc_cpf))
-                        
-                        # Procura por qualquer sequência de 11 dígitos no texto
-                        cpf_matches = re.findall(r'\d{11}', residence_text.replace('.', '').replace('-', ''))
-                        
-                        found_match = False
-                        for cpf_match in cpf_matches:
-                            if cpf_match == clean_doc_cpf:
-                                found_match = True
-                                formatted_cpf = f"{cpf_match[:3]}.{cpf_match[3:6]}.{cpf_match[6:9]}-{cpf_match[9:]}"
-                                st.warning("⚠️ CPF encontrado no texto completo do comprovante:")
-                                st.info(f"CPF encontrado: {formatted_cpf}")
-                                break
-                        
-                        if not found_match:
-                            st.error("❌ Não foi possível encontrar o CPF no comprovante")
-                    else:
-                        st.error("❌ Não foi possível extrair o CPF do comprovante")
-            
-            # Comparação Facial
-            if document_face and selfie_face:
-                st.subheader("👤 Verificação Facial")
-                is_identical, confidence = compare_faces(document_face, selfie_face)
-                if is_identical:
-                    st.success(f"✅ Rosto verificado com {confidence*100:.2f}% de confiança")
-                else:
-                    st.error(f"❌ Verificação facial falhou (Confiança: {confidence*100:.2f}%)")
-            else:
-                st.error("❌ Não foi possível detectar rostos em uma ou ambas as imagens")
-
-            # Informações de Endereço
-            st.subheader("📍 Informações de Endereço")
-            
-            # Extrai e exibe o endereço do comprovante de residência
-            residence_address = extract_address_from_text(residence_text)
-            if residence_address:
-                st.success("✅ Endereço encontrado no comprovante de residência:")
-                st.write(residence_address)
-                
-                # Cria uma seção expansível para depuração/verificação
-                with st.expander("Ver texto completo extraído do documento", expanded=False):
-                    st.caption("Texto extraído do documento para verificação:")
-                    st.text_area("Texto completo:", residence_text, height=100)
-            else:
-                st.error("❌ Não foi possível extrair o endereço do comprovante de residência")
-                st.info("Por favor, verifique se o documento está legível e contém informações de endereço.")
-                
-                # Mostra o texto extraído para depuração em uma seção recolhida
-                with st.expander("Ver texto extraído do documento", expanded=False):
-                    st.caption("Texto extraído do documento:")
-                    st.text_area("Texto completo:", residence_text, height=100)
\ No newline at end of file
+        # A verificação é executada em segundo plano; a sessão guarda apenas o id do job
+        # Reutiliza o processamento antecipado das imagens; a verificação confere se corresponde ao conteúdo atual
+        prepared = {key: upload["job"] for key, upload in st.session_state.get("prepared_uploads", {}).items()}
+        job_id = submit_verification(input_name, input_cpf, uploaded_document, uploaded_residence, uploaded_selfie,
+                                     prepared=prepared)
+        if job_id is None:
+            st.error("⚠️ Muitas verificações em andamento. Tente novamente em instantes.")
+        else:
+            st.session_state["verification_job"] = job_id
+
+job_id = st.session_state.get("verification_job")
+if job_id:
+    job = get_verification(job_id)
+    if job is None:
+        del st.session_state["verification_job"]
+        st.warning("⚠️ O resultado da verificação expirou. Clique em Validar Documentos novamente.")
+    elif job["status"] in (JOB_QUEUED, JOB_RUNNING):
+        # Consulta o job novamente em instantes, sem bloquear a sessão durante a verificação
+        if job["position"]:
+            st.info(f"⏳ Aguardando na fila ({job['position']} verificações à frente)...")
+        else:
+            # Cada seção aparece assim que sua etapa termina, sem esperar as demais
+            render_progress(job["progress"])
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
+    elif job["status"] == JOB_FAILED:
+        st.error(f"❌ Erro ao verificar os documentos: {job['error']}")
+    else:
+        render_result(job["result"])
@@ -0,0 +1,102 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# Grafo de Etapas da Verificação
+# ---------------------
+
+# Estados de uma etapa
+STAGE_DONE = "done"          # concluída sem pendências
+STAGE_FAILED = "failed"      # concluída com pendências (findings)
+STAGE_ERROR = "error"        # interrompida por uma exceção
+STAGE_SKIPPED = "skipped"    # não executada
+
+# Políticas do grafo: "fail_fast" deixa de executar as etapas que dependem de uma
+# verificação com pendências; "collect" executa todas as etapas possíveis
+POLICY_FAIL_FAST = "fail_fast"
+POLICY_COLLECT = "collect"
+
+class Stage:
+    """Etapa do grafo: function(outputs) retorna (saída, pendências).
+
+    outputs são as saídas das etapas já concluídas, por nome. Uma etapa
+    com pendências (uma lista não vazia de mensagens) fica como "failed",
+    mas sua saída continua disponível para as demais.
+
+    requires: etapas que precisam terminar sem pendências; se alguma falhar
+    ou não for executada, esta também não é. after: etapas que apenas precisam
+    terminar antes, em qualquer estado (a saída delas é opcional). gated_by:
+    verificações que, na política "fail_fast", funcionam como requires e, na
+    política "collect", são ignoradas.
+    """
+
+    def __init__(self, name, function, requires=(), after=(), gated_by=()):
+        self.name = name
+        self.function = function
+        self.requires = tuple(requires)
+        self.after = tuple(after)
+        self.gated_by = tuple(gated_by)
+
+def run_stage(stage, outputs):
+    """Executa uma etapa e retorna (estado, saída, pendências, segundos)."""
+    start = time.perf_counter()
+    try:
+        output, findings = stage.function(outputs)
+    except Exception as e:
+        logger.error("Erro na etapa %s: %s", stage.name, e)
+        return STAGE_ERROR, None, [str(e)], time.perf_counter() - start
+    status = STAGE_FAILED if findings else STAGE_DONE
+    return status, output, list(findings or ()), time.perf_counter() - start
+
+def run_stages(stages, executor, policy=POLICY_COLLECT, listener=None):
+    """Executa as etapas no executor assim que suas dependências terminam, as independentes em paralelo.
+
+    Retorna (saídas, estados): saídas por nome das etapas executadas e, por
+    nome de cada etapa, {"status", "findings", "seconds"}. listener, se
+    informado, é chamado com (nome, estado, saída) a cada etapa concluída ou
+    ignorada (saída None se não houver), na thread que chamou run_stages.
+    """
+    pending = {stage.name: stage for stage in stages}
+    outputs = {}
+    states = {}
+    running = {}
+
+    def finish(name, state, output=None):
+        states[name] = state
+        if listener is not None:
+            listener(name, state, output)
+
+    while pending or running:
+        # Decide, até não haver mudanças, quais etapas pendentes são ignoradas ou podem começar
+        changed = True
+        while changed:
+            changed = False
+            for name, stage in list(pending.items()):
+                hard = stage.requires + (stage.gated_by if policy == POLICY_FAIL_FAST else ())
+                if any(dep in states and states[dep]["status"] != STAGE_DONE for dep in hard):
+                    del pending[name]
+                    finish(name, {"status": STAGE_SKIPPED, "findings": [], "seconds": 0.0})
+                    changed = True
+                elif all(dep in states for dep in hard + stage.after):
+                    del pending[name]
+                    running[executor.submit(run_stage, stage, dict(outputs))] = name
+                    changed = True
+
+        if not running:
+            # Dependências que nunca serão executadas (nomes desconhecidos ou ciclos)
+            for name in list(pending):
+                del pending[name]
+                finish(name, {"status": STAGE_SKIPPED, "findings": [], "seconds": 0.0})
+            break
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            status, output, findings, seconds = future.result()
+            if output is not None:
+                outputs[name] = output
+            finish(name, {"status": status, "findings": findings, "seconds": seconds}, output)
+    return outputs, states
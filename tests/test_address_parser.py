@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from address_parser import parse_address
+
+def test_unlabeled_eight_digits_are_not_a_cep():
+    address = parse_address("Emitido em 12052023\nRua das Flores, 123 - Centro - São Paulo/SP")
+    assert address["cep"] is None
+
+def test_labeled_eight_digits_are_a_cep():
+    address = parse_address("Doc 12345678\nRua das Flores, 123 - Centro - São Paulo/SP CEP 01001000")
+    assert address["cep"] == "01001-000"
+
+def test_cep_inside_address_preferred():
+    address = parse_address("Protocolo 11111-222\nRua das Flores, 123 - Centro - São Paulo/SP 01001-000")
+    assert address["cep"] == "01001-000"
+    assert address["neighborhood"] == "Centro"
+    assert address["city"] == "São Paulo"
+
+def test_line_break_separates_neighborhood_and_city():
+    address = parse_address("RUA DAS FLORES, 123 - CENTRO\nSÃO PAULO/SP CEP 01001-000")
+    assert address["neighborhood"] == "CENTRO"
+    assert address["city"] == "SÃO PAULO"
+    assert address["state"] == "SP"
+    assert address["cep"] == "01001-000"
+
+def test_city_on_its_own_line():
+    address = parse_address("Av. Paulista, 1000 - Bela Vista\nSão Paulo - SP\n01310-100")
+    assert address["neighborhood"] == "Bela Vista"
+    assert address["city"] == "São Paulo"
+    assert address["state"] == "SP"
+    assert address["cep"] == "01310-100"
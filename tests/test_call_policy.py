@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import pytest
+from google.api_core import exceptions as core_exceptions
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from call_policy import CallPolicy, CircuitBreaker, RateLimitTimeout
+
+class ScriptedClient:
+    """Cliente que levanta os erros da lista, na ordem, e depois responde "ok"."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+
+    def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+def half_open_policy(client, rate=0):
+    """Política com o disjuntor aberto por uma falha transitória e reset imediato (próxima chamada é o teste)."""
+    policy = CallPolicy(lambda: client, rate=rate, burst=1, failure_threshold=1, reset_timeout=0)
+    client.errors.insert(0, core_exceptions.ServiceUnavailable("indisponível"))
+    with pytest.raises(core_exceptions.ServiceUnavailable):
+        policy.batch_annotate_images(["request"])
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    return policy
+
+def test_non_retryable_error_releases_half_open_trial():
+    client = ScriptedClient([core_exceptions.InvalidArgument("imagem inválida")])
+    policy = half_open_policy(client)
+    with pytest.raises(core_exceptions.InvalidArgument):
+        policy.batch_annotate_images(["request"])
+    # A chamada seguinte volta a ser o teste e fecha o disjuntor
+    assert policy.batch_annotate_images(["request"]) == "ok"
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+def test_rate_limit_timeout_releases_half_open_trial():
+    client = ScriptedClient()
+    policy = half_open_policy(client, rate=50)
+    with pytest.raises(RateLimitTimeout):
+        policy.batch_annotate_images(["request"], timeout=0)
+    time.sleep(0.05)
+    assert policy.batch_annotate_images(["request"]) == "ok"
+    assert policy.breaker.state == CircuitBreaker.CLOSED
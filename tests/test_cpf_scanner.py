@@ -0,0 +1,54 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpf_scanner import find_labeled_cpf, scan_cpfs, scan_index_cpfs
+from document_index import DocumentIndex
+
+CPF = "529.982.247-25"
+
+@pytest.mark.parametrize("text", [
+    "CPF: 529.982.247-25",
+    "CPF.: 529.982.247-25",
+    "CPF Nº.: 529.982.247-25",
+    "CPF N° 52998224725",
+    "NºCPF 529.982.247-25",
+    "NºCPF: 529.982.247-25",
+    "Nº CPF. 529.982.247-25",
+    "N.CPF: 529.982.247-25",
+    "Cadastro de Pessoas Físicas: 529.982.247-25",
+])
+def test_labeled_cpf_ocr_variants(text):
+    assert find_labeled_cpf(text) == CPF
+    assert scan_cpfs(text)[0]["label_distance"] is not None
+    candidates = scan_index_cpfs(DocumentIndex(text))
+    assert candidates[0]["cpf"] == CPF
+    assert candidates[0]["label_distance"] is not None
+
+def test_label_inside_word_is_ignored():
+    assert find_labeled_cpf("ABCPF 529.982.247-25") is None
+    assert scan_cpfs("ABCPF 529.982.247-25")[0]["label_distance"] is None
+
+def test_labeled_cpf_preferred_over_other_numbers():
+    text = "RG 111.444.777-35\nNºCPF: 529.982.247-25"
+    assert find_labeled_cpf(text) == CPF
+    assert scan_cpfs(text)[0]["cpf"] == CPF
+
+def test_index_scan_preferred_labeled_cpf():
+    text = "RG 111.444.777-35\nNºCPF: 529.982.247-25"
+    assert scan_index_cpfs(DocumentIndex(text))[0]["cpf"] == CPF
+
+@pytest.mark.parametrize("text", [
+    "529.982.247-25", "52998224725", "529982247-25", "529.982.247 25", "529.982.247\n- 25", "529.982.247/25"
+])
+def test_index_scan_matches_text_scan(text):
+    text = "Titular: " + text + " fim"
+    expected = [(c["cpf"], c["start"], c["end"]) for c in scan_cpfs(text)]
+    assert [(c["cpf"], c["start"], c["end"]) for c in scan_index_cpfs(DocumentIndex(text))] == expected
+    assert expected[0][0] == CPF
+
+@pytest.mark.parametrize("text", ["1.529.982.247-25", "529.982.247-250", "529.982.247.25", "5299.82.247-25"])
+def test_index_scan_rejects_malformed_numbers(text):
+    assert scan_index_cpfs(DocumentIndex(text)) == scan_cpfs(text) == []
@@ -0,0 +1,43 @@
+import io
+import os
+import sys
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_normalization import EXIF_ORIENTATION_TAG, decode_memory, normalize_image, pixel_bytes
+from memory_budget import MemoryBudget
+
+def encode(image, format, **kwargs):
+    output = io.BytesIO()
+    image.save(output, format=format, **kwargs)
+    return output.getvalue()
+
+def rotated_jpeg(size=(400, 200), orientation=6):
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION_TAG] = orientation
+    return encode(Image.new("RGB", size, (200, 120, 80)), "JPEG", exif=exif.tobytes())
+
+@pytest.mark.parametrize("mode, expected", [("RGB", 3), ("RGBA", 4), ("L", 1), ("P", 1), ("I;16", 2), ("1", 1)])
+def test_pixel_bytes(mode, expected):
+    assert pixel_bytes(mode) == expected
+
+@pytest.mark.parametrize("budget", [None, MemoryBudget(0, 1.0), MemoryBudget(256 * 1024 * 1024, 1.0)])
+def test_rotated_image(budget):
+    result = normalize_image(rotated_jpeg(), 1024, 1024 * 1024, budget)
+    assert not result["passthrough"]
+    assert result["size"] == (200, 400)
+    assert budget is None or budget.reserved == 0
+
+@pytest.mark.parametrize("mode", ["RGBA", "P", "LA"])
+@pytest.mark.parametrize("budget", [None, MemoryBudget(256 * 1024 * 1024, 1.0)])
+def test_non_rgb_image(mode, budget):
+    data = encode(Image.new(mode, (300, 150)), "PNG")
+    result = normalize_image(data, 1024, 1024 * 1024, budget)
+    assert result["size"] == (300, 150)
+    assert Image.open(io.BytesIO(result["data"])).format == "JPEG"
+
+def test_decode_memory_counts_rotated_copy():
+    upright = Image.open(io.BytesIO(rotated_jpeg(orientation=1)))
+    assert decode_memory(upright, 6, 1024, 0) - decode_memory(upright, 1, 1024, 0) == 400 * 200 * 3
@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue, report_progress, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+@pytest.fixture
+def queue():
+    return JobQueue(max_workers=2, max_pending=2, result_ttl=60)
+
+def blocked_job(gate, result="ok"):
+    """Job que só termina quando gate é liberado."""
+    def function():
+        gate.wait(5)
+        return result
+    return function
+
+def test_wait_returns_result(queue):
+    job = queue.wait(queue.submit("a", lambda x: x * 2, 21), 5)
+    assert job["status"] == JOB_DONE
+    assert job["result"] == 42
+    assert job["started"] is not None and job["finished"] >= job["started"]
+
+def test_wait_timeout_returns_current_state(queue):
+    gate = threading.Event()
+    job_id = queue.submit("a", blocked_job(gate))
+    job = queue.wait(job_id, 0.05)
+    assert job["status"] in (JOB_QUEUED, JOB_RUNNING)
+    gate.set()
+    assert queue.wait(job_id, 5)["status"] == JOB_DONE
+
+def test_wait_unknown_job(queue):
+    assert queue.wait("missing", 0.01) is None
+    assert queue.get("missing") is None
+
+def test_in_flight_job_is_reused(queue):
+    gate = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        gate.wait(5)
+        return "ok"
+
+    first = queue.submit("a", function)
+    assert queue.submit("a", function) == first
+    gate.set()
+    assert queue.wait(first, 5)["status"] == JOB_DONE
+    assert len(calls) == 1
+
+def test_succeeded_job_is_reused(queue):
+    first = queue.submit("a", lambda: "ok")
+    queue.wait(first, 5)
+    assert queue.submit("a", lambda: "outro") == first
+    assert queue.get(first)["result"] == "ok"
+
+def test_failed_job_is_retried(queue):
+    def broken():
+        raise ValueError("falhou")
+
+    first = queue.submit("a", broken)
+    job = queue.wait(first, 5)
+    assert job["status"] == JOB_FAILED
+    assert job["error"] == "falhou"
+
+    second = queue.submit("a", lambda: "ok")
+    assert second != first
+    assert queue.wait(second, 5)["result"] == "ok"
+
+def test_full_queue_refuses_new_jobs(queue):
+    gate = threading.Event()
+    jobs = [queue.submit(key, blocked_job(gate)) for key in ("a", "b")]
+    assert None not in jobs
+    assert queue.submit("c", lambda: "ok") is None
+    # Jobs com a chave de um job em andamento continuam sendo aceitos
+    assert queue.submit("a", lambda: "ok") == jobs[0]
+
+    gate.set()
+    for job_id in jobs:
+        queue.wait(job_id, 5)
+    # A vaga é liberada assim que wait retorna
+    assert queue.submit("c", lambda: "ok") is not None
+
+def test_queued_position():
+    gate = threading.Event()
+    small = JobQueue(max_workers=1, max_pending=3, result_ttl=60)
+    running = small.submit("a", blocked_job(gate))
+    waiting = [small.submit(key, lambda: "ok") for key in ("b", "c")]
+    assert [small.get(job_id)["position"] for job_id in waiting] == [0, 1]
+    assert small.get(running)["position"] == 0
+    gate.set()
+    for job_id in waiting:
+        assert small.wait(job_id, 5)["status"] == JOB_DONE
+
+def test_finished_jobs_expire():
+    queue = JobQueue(max_workers=1, max_pending=2, result_ttl=0.05)
+    first = queue.submit("a", lambda: "ok")
+    queue.wait(first, 5)
+    time.sleep(0.1)
+    assert queue.get(first) is None
+    # Depois de expirar, a mesma chave executa o job novamente
+    second = queue.submit("a", lambda: "novo")
+    assert second != first
+    assert queue.wait(second, 5)["result"] == "novo"
+
+def test_running_job_does_not_expire():
+    queue = JobQueue(max_workers=1, max_pending=2, result_ttl=0.01)
+    gate = threading.Event()
+    job_id = queue.submit("a", blocked_job(gate))
+    time.sleep(0.05)
+    assert queue.get(job_id) is not None
+    gate.set()
+    assert queue.wait(job_id, 5)["status"] == JOB_DONE
+
+def test_report_progress(queue):
+    gate = threading.Event()
+    reported = threading.Event()
+
+    def function():
+        report_progress({"step": 1})
+        reported.set()
+        gate.wait(5)
+        return "ok"
+
+    job_id = queue.submit("a", function)
+    assert reported.wait(5)
+    assert queue.get(job_id)["progress"] == {"step": 1}
+    gate.set()
+    queue.wait(job_id, 5)
+    # Fora de um job, report_progress não faz nada
+    report_progress({"step": 2})
+    assert queue.get(job_id)["progress"] == {"step": 1}
+
+def test_stats(queue):
+    gate = threading.Event()
+    running = queue.submit("a", blocked_job(gate))
+    queue.wait(queue.submit("b", lambda: 1 / 0), 5)
+    assert queue.stats()[JOB_FAILED] == 1
+    gate.set()
+    queue.wait(running, 5)
+    assert queue.stats() == {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 1, JOB_FAILED: 1}
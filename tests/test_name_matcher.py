@@ -0,0 +1,15 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from name_matcher import find_name
+
+def test_repeated_part_reported_missing_once_matched():
+    result = find_name("Maria da Silva da Costa", "MARIA DA SILVA COSTA")
+    assert result["found_parts"] == ["Maria", "da", "Silva", "Costa"]
+    assert result["missing_parts"] == ["da"]
+
+def test_all_parts_found():
+    result = find_name("Maria da Silva da Costa", "Nome: MARIA DA SILVA DA COSTA")
+    assert result["missing_parts"] == []
@@ -0,0 +1,111 @@
+import os
+import sys
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stage_graph import (
+    Stage, run_stages, POLICY_COLLECT, POLICY_FAIL_FAST,
+    STAGE_DONE, STAGE_FAILED, STAGE_ERROR, STAGE_SKIPPED
+)
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+def done(output):
+    return lambda outputs: (output, [])
+
+def failed(output):
+    return lambda outputs: (output, ["pendência"])
+
+def verification_graph(document):
+    """Grafo com a forma do da verificação: o comprovante só é analisado, no fail_fast, se o documento passar."""
+    return [
+        Stage("images", done("imagens")),
+        Stage("document_ocr", done("texto"), requires=("images",)),
+        Stage("document_fields", document, requires=("document_ocr",)),
+        Stage("residence_ocr", done("comprovante"), requires=("images",), gated_by=("document_fields",)),
+        Stage("residence_fields", lambda outputs: (outputs.get("document_fields"), []),
+              requires=("residence_ocr",), after=("document_fields",))
+    ]
+
+def statuses(states):
+    return {name: state["status"] for name, state in states.items()}
+
+def test_all_stages_run_when_nothing_fails(executor):
+    for policy in (POLICY_COLLECT, POLICY_FAIL_FAST):
+        outputs, states = run_stages(verification_graph(done("dados")), executor, policy)
+        assert set(statuses(states).values()) == {STAGE_DONE}
+        assert outputs["residence_fields"] == "dados"
+
+def test_gated_by_skips_only_under_fail_fast(executor):
+    outputs, states = run_stages(verification_graph(failed("dados")), executor, POLICY_FAIL_FAST)
+    assert states["document_fields"]["status"] == STAGE_FAILED
+    assert states["document_fields"]["findings"] == ["pendência"]
+    assert states["residence_ocr"]["status"] == STAGE_SKIPPED
+    assert states["residence_fields"]["status"] == STAGE_SKIPPED
+    assert "residence_ocr" not in outputs
+
+    outputs, states = run_stages(verification_graph(failed("dados")), executor, POLICY_COLLECT)
+    assert states["residence_ocr"]["status"] == STAGE_DONE
+    assert states["residence_fields"]["status"] == STAGE_DONE
+
+def test_after_receives_the_output_of_a_failed_stage(executor):
+    outputs, _ = run_stages(verification_graph(failed("dados")), executor, POLICY_COLLECT)
+    # A saída de uma etapa com pendências continua disponível para as que vêm depois
+    assert outputs["residence_fields"] == "dados"
+
+def test_requires_skips_under_both_policies(executor):
+    for policy in (POLICY_COLLECT, POLICY_FAIL_FAST):
+        stages = [
+            Stage("input", failed(None)),
+            Stage("images", done("imagens"), requires=("input",)),
+            Stage("annotate", done("texto"), requires=("images",))
+        ]
+        outputs, states = run_stages(stages, executor, policy)
+        assert statuses(states) == {"input": STAGE_FAILED, "images": STAGE_SKIPPED, "annotate": STAGE_SKIPPED}
+        assert outputs == {}
+
+def test_exception_marks_error_and_skips_dependents(executor):
+    def broken(outputs):
+        raise ValueError("falhou")
+
+    stages = [
+        Stage("annotate", broken),
+        Stage("fields", done("dados"), requires=("annotate",)),
+        Stage("report", done("relatório"), after=("annotate",))
+    ]
+    outputs, states = run_stages(stages, executor, POLICY_COLLECT)
+    assert states["annotate"]["status"] == STAGE_ERROR
+    assert states["annotate"]["findings"] == ["falhou"]
+    assert states["fields"]["status"] == STAGE_SKIPPED
+    assert states["report"]["status"] == STAGE_DONE
+
+def test_unknown_dependency_is_skipped(executor):
+    _, states = run_stages([Stage("fields", done("dados"), requires=("missing",))], executor)
+    assert states["fields"]["status"] == STAGE_SKIPPED
+
+def test_independent_stages_run_in_parallel(executor):
+    # Cada etapa só termina quando as duas estiverem em execução ao mesmo tempo
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(outputs):
+        barrier.wait()
+        return "ok", []
+
+    stages = [Stage("residence_ocr", meet), Stage("selfie_ocr", meet)]
+    _, states = run_stages(stages, executor, POLICY_COLLECT)
+    assert statuses(states) == {"residence_ocr": STAGE_DONE, "selfie_ocr": STAGE_DONE}
+
+def test_listener_sees_every_stage(executor):
+    seen = []
+    run_stages(verification_graph(failed("dados")), executor, POLICY_FAIL_FAST,
+               lambda name, state, output: seen.append((name, state["status"])))
+    assert sorted(seen) == sorted([
+        ("images", STAGE_DONE), ("document_ocr", STAGE_DONE), ("document_fields", STAGE_FAILED),
+        ("residence_ocr", STAGE_SKIPPED), ("residence_fields", STAGE_SKIPPED)
+    ])
@@ -0,0 +1,1472 @@
+import hashlib
+import hmac
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from dotenv import load_dotenv
+from google.cloud import vision
+from vision_cache import VisionCache, cache_key
+from vision_client import VisionClientPool
+from vision_backend import ResponseStore, RecordingClient, ReplayClient
+from fake_vision import FakeVisionClient
+from call_policy import CallPolicy
+from image_normalization import normalize_image, read_image_bytes
+from memory_budget import MemoryBudget
+from address_parser import parse_address, format_address
+from cpf_scanner import scan_cpfs, scan_index_cpfs, cpf_digits, format_cpf_digits, is_valid_cpf
+from document_index import DocumentIndex
+from name_matcher import find_name
+from job_queue import JobQueue, JOB_DONE, report_progress
+from stage_graph import Stage, run_stages, STAGE_ERROR, STAGE_SKIPPED, POLICY_FAIL_FAST
+from metrics import (
+    timed, record_verification, start_exporter, peak_rss,
+    STAGE_SECONDS, UPLOAD_BYTES, CACHE_REQUESTS, STARTUP_SECONDS, FIRST_VERIFICATION_SECONDS
+)
+
+# Carrega as variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# Configurações e Constantes
+# ---------------------
+
+# Comparação facial pelos pontos de referência do Vision API: similaridade calibrada mínima
+# para considerar o documento e a selfie da mesma pessoa, pontos em comum mínimos para comparar
+# e calibração da pontuação ("intercepto,inclinação", vazio usa a padrão de face_similarity)
+FACE_MATCH_THRESHOLD = float(os.getenv("FACE_MATCH_THRESHOLD", "0.5"))
+FACE_MIN_LANDMARKS = int(os.getenv("FACE_MIN_LANDMARKS", "6"))
+FACE_CALIBRATION = os.getenv("FACE_CALIBRATION", "")
+# Rostos de documentos já enviados comparados com cada selfie (0 desativa) e similaridade
+# mínima para informar uma selfie semelhante ao documento de outro CPF
+FACE_GALLERY_SIZE = int(os.getenv("FACE_GALLERY_SIZE", "10000"))
+FACE_REPEAT_THRESHOLD = float(os.getenv("FACE_REPEAT_THRESHOLD", "0.9"))
+
+# Recursos do Vision API solicitados para cada imagem da verificação
+DOCUMENT_FEATURES = (vision.Feature.Type.TEXT_DETECTION, vision.Feature.Type.FACE_DETECTION)
+RESIDENCE_FEATURES = (vision.Feature.Type.TEXT_DETECTION,)
+SELFIE_FEATURES = (vision.Feature.Type.FACE_DETECTION,)
+# Com o rosto ou o documento recortados localmente, o documento é enviado em duas
+# imagens: uma apenas para OCR e outra apenas para detecção facial
+DOCUMENT_TEXT_FEATURES = (vision.Feature.Type.TEXT_DETECTION,)
+FACE_CROP_FEATURES = (vision.Feature.Type.FACE_DETECTION,)
+
+# Normalização das imagens: maior lado (em pixels) e tamanho máximo (em bytes) para OCR e detecção facial
+IMAGE_MAX_EDGE_OCR = int(os.getenv("IMAGE_MAX_EDGE_OCR", "2048"))
+IMAGE_MAX_BYTES_OCR = int(os.getenv("IMAGE_MAX_BYTES_OCR", str(1024 * 1024)))
+IMAGE_MAX_EDGE_FACE = int(os.getenv("IMAGE_MAX_EDGE_FACE", "1024"))
+IMAGE_MAX_BYTES_FACE = int(os.getenv("IMAGE_MAX_BYTES_FACE", str(300 * 1024)))
+
+# Orçamento de memória (em bytes) das imagens em decodificação em todo o processo (0 desativa),
+# espera máxima (em segundos) por espaço no orçamento e número máximo de pixels de uma imagem
+# (imagens maiores são recusadas antes de decodificar, como proteção contra bombas de descompressão)
+IMAGE_MEMORY_BUDGET = int(os.getenv("IMAGE_MEMORY_BUDGET", str(512 * 1024 * 1024)))
+IMAGE_MEMORY_WAIT = float(os.getenv("IMAGE_MEMORY_WAIT", "30"))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "100000000"))
+
+# Detecção de imagens reenviadas: hash perceptual das imagens normalizadas ("phash", "dhash"
+# ou "off"), arquivo SQLite do índice de hashes (vazio mantém o índice apenas em memória),
+# distância máxima (em bits) entre hashes de imagens consideradas iguais e ação ao encontrar
+# uma imagem já enviada por outro CPF: "flag" apenas informa no resultado; "reject" recusa a
+# verificação para revisão, sem chamar o Vision API
+IMAGE_HASH = os.getenv("IMAGE_HASH", "phash")
+IMAGE_HASH_PATH = os.getenv("IMAGE_HASH_PATH", "")
+IMAGE_HASH_RADIUS = int(os.getenv("IMAGE_HASH_RADIUS", "6"))
+# Chave secreta do HMAC que identifica quem enviou cada imagem no índice, sem gravar o CPF
+# (vazio gera uma chave aleatória por execução, o que não serve para um índice em disco)
+IMAGE_HASH_KEY = os.getenv("IMAGE_HASH_KEY", "")
+IMAGE_DUPLICATES = os.getenv("IMAGE_DUPLICATES", "flag")
+
+# Pré-triagem local de rostos com OpenCV antes do Vision API: "reject" recusa imagens sem
+# rosto e envia apenas o recorte do rosto; "crop" apenas recorta quando encontra um rosto; "off" desativa
+FACE_PRESCREEN = os.getenv("FACE_PRESCREEN", "reject")
+# Margem em torno do rosto (fração do tamanho do rosto) e maior lado (em pixels) do recorte
+FACE_CROP_MARGIN = float(os.getenv("FACE_CROP_MARGIN", "0.5"))
+FACE_CROP_MAX_EDGE = int(os.getenv("FACE_CROP_MAX_EDGE", "512"))
+# Imagens da verificação que devem conter um rosto
+FACE_IMAGE_KEYS = ("document", "selfie")
+
+# Recorte do documento antes do OCR: localiza o documento na foto, corrige a perspectiva
+# e envia ao OCR apenas o documento, em "gray" (tons de cinza), "contrast" (tons de cinza
+# com contraste realçado) ou "color"; "off" envia a foto inteira
+DOCUMENT_CROP = os.getenv("DOCUMENT_CROP", "gray")
+# Maior lado (em pixels) do documento recortado
+DOCUMENT_CROP_MAX_EDGE = int(os.getenv("DOCUMENT_CROP_MAX_EDGE", "1600"))
+# Imagens em que o documento é procurado (a detecção facial continua usando a foto original)
+DOCUMENT_CROP_KEYS = ("document", "residence")
+
+# Modo de execução das chamadas ao Vision API:
+# "batch" envia todas as imagens em uma única chamada; "concurrent" envia uma chamada por imagem em paralelo
+VISION_EXECUTION_MODE = os.getenv("VISION_EXECUTION_MODE", "batch")
+# Tempo limite (em segundos) de cada chamada ao Vision API, incluindo as novas tentativas
+VISION_REQUEST_TIMEOUT = float(os.getenv("VISION_REQUEST_TIMEOUT", "30"))
+# Número máximo de chamadas simultâneas ao Vision API por processo
+VISION_MAX_IN_FLIGHT = int(os.getenv("VISION_MAX_IN_FLIGHT", "8"))
+# Política de chamadas: limite de imagens por segundo enviadas ao Vision API (a cota do
+# projeto; 0 desativa) e rajada máxima acima desse ritmo
+VISION_RATE_LIMIT = float(os.getenv("VISION_RATE_LIMIT", "30"))
+VISION_RATE_BURST = int(os.getenv("VISION_RATE_BURST", "30"))
+# Tentativas por chamada para erros transitórios e espera base/máxima (em segundos) entre elas
+VISION_MAX_ATTEMPTS = int(os.getenv("VISION_MAX_ATTEMPTS", "3"))
+VISION_RETRY_BASE = float(os.getenv("VISION_RETRY_BASE", "0.2"))
+VISION_RETRY_MAX = float(os.getenv("VISION_RETRY_MAX", "5"))
+# Falhas seguidas que abrem o disjuntor (0 desativa) e tempo (em segundos) até a próxima tentativa
+VISION_BREAKER_THRESHOLD = int(os.getenv("VISION_BREAKER_THRESHOLD", "5"))
+VISION_BREAKER_RESET = float(os.getenv("VISION_BREAKER_RESET", "30"))
+# Hedging: envia uma cópia da chamada que demorar mais que o percentil das latências recentes
+VISION_HEDGE = os.getenv("VISION_HEDGE", "0") == "1"
+VISION_HEDGE_PERCENTILE = float(os.getenv("VISION_HEDGE_PERCENTILE", "0.95"))
+# Número de canais gRPC (conexões) do cliente do Vision API, usados em rodízio
+VISION_CHANNEL_POOL_SIZE = int(os.getenv("VISION_CHANNEL_POOL_SIZE", "2"))
+# Origem das respostas do Vision API: "live" (chamadas à API), "record" (chamadas à API,
+# gravando as respostas), "replay" (somente as respostas gravadas, sem acesso à rede)
+# ou "fake" (respostas fixas do cliente falso, para testes locais sem credenciais)
+VISION_BACKEND = os.getenv("VISION_BACKEND", "live")
+# Arquivo SQLite das respostas gravadas pelos modos "record" e "replay"
+VISION_RECORD_PATH = os.getenv("VISION_RECORD_PATH", "vision_recordings.db")
+
+# Cache de respostas do Vision API: número máximo de entradas e validade (em segundos) em memória
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "256"))
+VISION_CACHE_TTL = float(os.getenv("VISION_CACHE_TTL", "3600"))
+# Arquivo SQLite do cache em disco (vazio desativa) e validade (em segundos) das entradas em disco
+VISION_CACHE_PATH = os.getenv("VISION_CACHE_PATH", "")
+VISION_CACHE_DISK_TTL = float(os.getenv("VISION_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+
+# Fila de verificações em segundo plano: threads de execução, máximo de verificações
+# aguardando ou em execução (as demais são recusadas) e validade (em segundos) dos resultados
+VERIFICATION_WORKERS = int(os.getenv("VERIFICATION_WORKERS", "4"))
+VERIFICATION_QUEUE_SIZE = int(os.getenv("VERIFICATION_QUEUE_SIZE", "32"))
+VERIFICATION_JOB_TTL = float(os.getenv("VERIFICATION_JOB_TTL", "600"))
+
+# Etapas da verificação: política do grafo de etapas ("collect" executa todas as etapas e
+# reúne todas as pendências; "fail_fast" não envia o comprovante e a selfie ao Vision API
+# quando os dados informados ou os do documento já reprovam a verificação) e threads que
+# executam as etapas independentes em paralelo
+VERIFICATION_POLICY = os.getenv("VERIFICATION_POLICY", "collect")
+VERIFICATION_STAGE_WORKERS = int(os.getenv("VERIFICATION_STAGE_WORKERS", "16"))
+
+# Etapas do grafo que analisam imagens com o Vision API
+OCR_STAGES = ("annotate", "document_ocr", "residence_ocr", "selfie_ocr")
+
+# Processamento antecipado de cada imagem assim que é carregada ("1" ativa): threads
+# de execução, máximo de imagens aguardando ou em execução, validade (em segundos)
+# dos resultados e espera máxima (em segundos) da verificação por uma imagem em andamento
+PREPARE_UPLOADS = os.getenv("PREPARE_UPLOADS", "1") == "1"
+PREPARATION_WORKERS = int(os.getenv("PREPARATION_WORKERS", "4"))
+PREPARATION_QUEUE_SIZE = int(os.getenv("PREPARATION_QUEUE_SIZE", "96"))
+PREPARATION_TTL = float(os.getenv("PREPARATION_TTL", "900"))
+PREPARATION_WAIT = float(os.getenv("PREPARATION_WAIT", "60"))
+
+# Exportação das métricas de desempenho no formato do Prometheus: porta local do
+# endpoint /metrics e arquivo atualizado a cada METRICS_FILE_INTERVAL segundos (vazio/0 desativa)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.getenv("METRICS_FILE_INTERVAL", "15"))
+
+# Aquecimento na inicialização: tempo máximo (em segundos) de espera pelos canais do Vision API
+# e arquivo criado quando o processo está pronto, para verificações de prontidão (vazio desativa)
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))
+READINESS_FILE = os.getenv("READINESS_FILE", "")
+
+# API HTTP de verificação (api_server.py): processos de trabalho, verificações simultâneas
+# por processo, espera máxima (em segundos) por uma vaga antes de responder 503, tamanho
+# máximo do corpo da requisição (em bytes) e tempo limite (em segundos) de leitura do corpo
+API_WORKERS = int(os.getenv("API_WORKERS", "2"))
+API_MAX_CONCURRENT = int(os.getenv("API_MAX_CONCURRENT", "8"))
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "5"))
+API_MAX_REQUEST_BYTES = int(os.getenv("API_MAX_REQUEST_BYTES", str(30 * 1024 * 1024)))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+
+# Campos de nome (procurados no índice do documento, sem diferenciar acentos e caixa)
+NAME_FIELDS = [
+    ("nome", "e", "sobrenome"),
+    ("nome",)
+]
+
+# Indicadores que não são nomes
+NON_NAME_INDICATORS = {
+    "cpf", "rg", "identidade", "cnh", "nascimento", "data",
+    "endereco", "residencia", "numero", "telefone", "celular", "email",
+    "valor", "total", "vencimento", "conta", "banco", "agencia", "documento", "filiacao"
+}
+
+# Número máximo de palavras examinadas após o campo de nome
+MAX_NAME_WORDS = 5
+
+# ---------------------
+# Cliente do Vision API
+# ---------------------
+
+# Recursos compartilhados por todo o processo, criados sob demanda
+_resources_lock = threading.Lock()
+_vision_client = None
+_vision_cache = None
+_vision_executor = None
+_vision_policy = None
+_job_queue = None
+_preparation_queue = None
+_image_budget = None
+_hash_index = None
+_face_gallery = None
+_stage_executor = None
+_readiness = {"ready": False, "started": None, "finished": None, "phases": {}, "error": None}
+_first_verification = True
+# Chave do HMAC de submitter_ref; a aleatória é gerada na importação, antes do fork dos processos de trabalho
+_submitter_key = IMAGE_HASH_KEY.encode("utf-8") if IMAGE_HASH_KEY else os.urandom(32)
+
+def get_vision_client():
+    """Retorna o cliente do Vision API do processo, criando-o na primeira chamada.
+
+    Sem um cliente definido por configure_vision_client ou set_vision_client, usa
+    as credenciais padrão do Google Cloud (variável GOOGLE_APPLICATION_CREDENTIALS).
+    """
+    return configure_vision_client()
+
+def configure_vision_client(credentials_info=None):
+    """Cria, uma única vez por processo, o cliente do Vision API conforme VISION_BACKEND e o retorna.
+
+    No modo "live", é o pool de canais do Vision API; no modo "record", o pool
+    envolvido por um RecordingClient; no modo "replay", um ReplayClient e, no
+    modo "fake", um FakeVisionClient, que não usam credenciais nem rede.
+    credentials_info são as informações da conta de serviço (o conteúdo do
+    JSON de credenciais), usadas diretamente em memória; sem elas, usa as
+    credenciais padrão. Chamadas seguintes retornam o cliente já criado.
+    """
+    global _vision_client
+    with _resources_lock:
+        if _vision_client is None:
+            if VISION_BACKEND == "replay":
+                _vision_client = ReplayClient(ResponseStore(VISION_RECORD_PATH))
+                return _vision_client
+            if VISION_BACKEND == "fake":
+                _vision_client = FakeVisionClient()
+                return _vision_client
+            # Os canais conectam na primeira chamada; warm_up os conecta antes (ver start_warmup)
+            pool = VisionClientPool(credentials_info, size=VISION_CHANNEL_POOL_SIZE)
+            if VISION_BACKEND == "record":
+                _vision_client = RecordingClient(pool, ResponseStore(VISION_RECORD_PATH))
+            else:
+                _vision_client = pool
+        return _vision_client
+
+def set_vision_client(client):
+    """Define o cliente do Vision API usado pelas funções deste módulo."""
+    global _vision_client
+    with _resources_lock:
+        _vision_client = client
+
+def get_vision_policy():
+    """Retorna a política de chamadas (limite de taxa, novas tentativas, disjuntor e hedging) do processo."""
+    global _vision_policy
+    with _resources_lock:
+        if _vision_policy is None:
+            _vision_policy = CallPolicy(
+                get_vision_client,
+                rate=VISION_RATE_LIMIT,
+                burst=VISION_RATE_BURST,
+                max_attempts=VISION_MAX_ATTEMPTS,
+                backoff_base=VISION_RETRY_BASE,
+                backoff_max=VISION_RETRY_MAX,
+                failure_threshold=VISION_BREAKER_THRESHOLD,
+                reset_timeout=VISION_BREAKER_RESET,
+                hedge=VISION_HEDGE,
+                hedge_percentile=VISION_HEDGE_PERCENTILE,
+                hedge_workers=VISION_MAX_IN_FLIGHT
+            )
+        return _vision_policy
+
+def vision_client_health(timeout=0):
+    """Retorna o estado do cliente do Vision API (ver VisionClientPool.health), ou None se não houver pool."""
+    # No modo "record", o pool fica dentro do RecordingClient
+    client = getattr(_vision_client, "client", _vision_client)
+    if isinstance(client, VisionClientPool):
+        return client.health(timeout)
+    return None
+
+# ---------------------
+# Inicialização e Prontidão
+# ---------------------
+
+def lazy_modules():
+    """Módulos carregados apenas quando usados (OpenCV e NumPy), conforme as etapas ativadas."""
+    modules = []
+    if FACE_PRESCREEN in ("reject", "crop"):
+        modules.append("face_prescreen")
+    if DOCUMENT_CROP in ("gray", "contrast", "color"):
+        modules.append("document_crop")
+    if IMAGE_HASH in ("phash", "dhash"):
+        modules.append("image_hash")
+    modules.append("face_similarity")
+    return modules
+
+def preload_modules():
+    """Carrega os módulos de lazy_modules, por exemplo antes do fork dos processos de trabalho.
+
+    Retorna o tempo de importação de cada um, em segundos.
+    """
+    durations = {}
+    for name in lazy_modules():
+        start = time.perf_counter()
+        importlib.import_module(name)
+        durations[name] = time.perf_counter() - start
+    return durations
+
+def warmup_phase(phase, function, *args):
+    """Executa uma etapa do aquecimento, registrando sua duração no relatório de prontidão e nas métricas."""
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        seconds = time.perf_counter() - start
+        STARTUP_SECONDS.set(seconds, phase=phase)
+        with _resources_lock:
+            _readiness["phases"][phase] = seconds
+
+def warm_up(credentials_info=None, timeout=None):
+    """Prepara o processo antes do primeiro acesso e o marca como pronto.
+
+    Carrega os módulos de lazy_modules, cria o cliente do Vision API e, no
+    modo "live" ou "record", obtém o token OAuth e conecta os canais. O
+    processo fica pronto quando tudo isso termina sem erro; com READINESS_FILE,
+    o arquivo é criado nesse momento. Retorna o relatório de readiness().
+    """
+    with _resources_lock:
+        _readiness.update(ready=False, started=time.time(), finished=None, error=None)
+    try:
+        warmup_phase("imports", preload_modules)
+        client = warmup_phase("client", configure_vision_client, credentials_info)
+        pool = getattr(client, "client", client)
+        if isinstance(pool, VisionClientPool):
+            if not warmup_phase("channels", pool.warmup, WARMUP_TIMEOUT if timeout is None else timeout):
+                raise RuntimeError(pool.last_error or "Canais do Vision API não ficaram prontos")
+    except Exception as e:
+        logger.error("Erro no aquecimento: %s", e)
+        with _resources_lock:
+            _readiness.update(finished=time.time(), error=str(e))
+        return readiness()
+
+    with _resources_lock:
+        _readiness.update(ready=True, finished=time.time())
+    if READINESS_FILE:
+        try:
+            with open(READINESS_FILE, "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            logger.error("Erro ao gravar %s: %s", READINESS_FILE, e)
+    return readiness()
+
+def start_warmup(credentials_info=None):
+    """Executa warm_up em segundo plano, para que o processo atenda acessos enquanto aquece."""
+    thread = threading.Thread(target=warm_up, args=(credentials_info,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+def readiness():
+    """Retorna o estado da inicialização: {"ready", "started", "finished", "phases", "error"}.
+
+    phases traz a duração, em segundos, de cada etapa já executada de warm_up.
+    """
+    with _resources_lock:
+        return {**_readiness, "phases": dict(_readiness["phases"])}
+
+# ---------------------
+# Processamento de Imagens e Vision API
+# ---------------------
+
+def get_image_budget():
+    """Retorna o orçamento de memória das imagens em decodificação, compartilhado por todo o processo."""
+    global _image_budget
+    with _resources_lock:
+        if _image_budget is None:
+            _image_budget = MemoryBudget(IMAGE_MEMORY_BUDGET, IMAGE_MEMORY_WAIT)
+        return _image_budget
+
+def process_image(uploaded_file, target="ocr"):
+    """Normaliza uma imagem carregada para o Vision API, limitando resolução e tamanho conforme o uso.
+
+    O alvo "ocr" preserva mais resolução para o reconhecimento de texto; o alvo
+    "face" usa limites menores, suficientes para a detecção facial. A decodificação
+    reserva memória no orçamento do processo e imagens acima de IMAGE_MAX_PIXELS
+    são recusadas. Retorna o dicionário de normalize_image, com os dados em
+    "data" e o relatório de bytes economizados.
+    """
+    budget = get_image_budget()
+    try:
+        if target == "face":
+            return normalize_image(uploaded_file, IMAGE_MAX_EDGE_FACE, IMAGE_MAX_BYTES_FACE, budget, IMAGE_MAX_PIXELS)
+        return normalize_image(uploaded_file, IMAGE_MAX_EDGE_OCR, IMAGE_MAX_BYTES_OCR, budget, IMAGE_MAX_PIXELS)
+    except Exception as e:
+        logger.error("Erro ao processar imagem: %s", e)
+        return None
+
+def prescreen_face(image_data):
+    """Procura localmente um rosto na imagem e recorta o maior encontrado, antes de qualquer chamada ao Vision API.
+
+    Retorna {"found": ..., "data": recorte, ...}, ou None se a pré-triagem estiver
+    desativada ou falhar (nesse caso a imagem inteira é enviada ao Vision API).
+    """
+    if FACE_PRESCREEN not in ("reject", "crop"):
+        return None
+    try:
+        from face_prescreen import crop_face
+        with timed("face_prescreen"):
+            crop = crop_face(image_data, FACE_CROP_MARGIN, FACE_CROP_MAX_EDGE)
+    except Exception as e:
+        logger.error("Erro na pré-triagem de rosto: %s", e)
+        return None
+    if crop is None:
+        return {"found": False, "data": None}
+    return {"found": True, "crop_bytes": len(crop["data"]), **crop}
+
+def locate_document(image_data):
+    """Localiza o documento na foto e o recorta, com a perspectiva corrigida, para o OCR.
+
+    Retorna {"found": ..., "data": recorte, ...}, ou None se o recorte estiver
+    desativado ou falhar (nesse caso a foto inteira é enviada ao OCR).
+    """
+    if DOCUMENT_CROP not in ("gray", "contrast", "color"):
+        return None
+    try:
+        from document_crop import crop_document
+        with timed("document_crop"):
+            crop = crop_document(image_data, DOCUMENT_CROP_MAX_EDGE, DOCUMENT_CROP)
+    except Exception as e:
+        logger.error("Erro ao recortar o documento: %s", e)
+        return None
+    if crop is None:
+        return {"found": False, "data": None}
+    return {"found": True, "crop_bytes": len(crop["data"]), **crop}
+
+def text_data(report):
+    """Retorna os dados a enviar para o OCR: o documento recortado, se houver, ou a imagem inteira."""
+    crop = report.get("document_crop")
+    if crop and crop["found"]:
+        return crop["data"]
+    return report["data"]
+
+def face_data(report):
+    """Retorna os dados a enviar para a detecção facial: o recorte do rosto, se houver, ou a imagem inteira."""
+    face = report.get("face")
+    if face and face["found"]:
+        return face["data"]
+    return report["data"]
+
+def extract_text(image_data):
+    """Extrai texto da imagem usando Google Cloud Vision API."""
+    result = annotate_images({"image": (image_data, (vision.Feature.Type.TEXT_DETECTION,))})["image"]
+    if result["error"]:
+        logger.error("Erro ao extrair texto: %s", result["error"])
+    return result["text"]
+
+def detect_face(image_data):
+    """Detecta rosto usando Google Cloud Vision API."""
+    result = annotate_images({"image": (image_data, (vision.Feature.Type.FACE_DETECTION,))})["image"]
+    if result["error"]:
+        logger.error("Erro ao detectar rosto: %s", result["error"])
+    return result["face"]
+
+def response_error(response):
+    """Retorna a mensagem de erro de uma resposta do Vision API, ou None se não houver erro."""
+    if response.error.message:
+        return '{}\nPara mais informações:\n{}'.format(
+            response.error.message,
+            response.error.details
+        )
+    return None
+
+def get_vision_cache():
+    """Retorna o cache de respostas do Vision API compartilhado por todo o processo."""
+    global _vision_cache
+    with _resources_lock:
+        if _vision_cache is None:
+            _vision_cache = VisionCache(
+                max_entries=VISION_CACHE_MAX_ENTRIES,
+                ttl=VISION_CACHE_TTL,
+                disk_path=VISION_CACHE_PATH or None,
+                disk_ttl=VISION_CACHE_DISK_TTL,
+                serialize=vision.AnnotateImageResponse.serialize,
+                deserialize=vision.AnnotateImageResponse.deserialize
+            )
+        return _vision_cache
+
+def feature_response(response, feature):
+    """Separa da resposta do Vision API apenas a parte correspondente a um recurso, para o cache."""
+    if feature == vision.Feature.Type.TEXT_DETECTION:
+        return vision.AnnotateImageResponse(
+            text_annotations=response.text_annotations[:1],
+            full_text_annotation=response.full_text_annotation
+        )
+    return vision.AnnotateImageResponse(face_annotations=response.face_annotations[:1])
+
+def word_boxes(annotation):
+    """Retorna as palavras de um full_text_annotation com suas caixas delimitadoras (x0, y0, x1, y1)."""
+    words = []
+    for page in annotation.pages:
+        for block in page.blocks:
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    vertices = word.bounding_box.vertices
+                    if not vertices:
+                        continue
+                    xs = [vertex.x for vertex in vertices]
+                    ys = [vertex.y for vertex in vertices]
+                    text = ''.join(symbol.text for symbol in word.symbols)
+                    words.append((text, (min(xs), min(ys), max(xs), max(ys))))
+    return words
+
+def apply_response(result, response):
+    """Preenche o texto, as palavras e o rosto do resultado de uma imagem a partir de uma resposta do Vision API."""
+    if response.text_annotations:
+        # O primeiro texto contém todo o conteúdo detectado
+        result["text"] = response.text_annotations[0].description
+    if response.full_text_annotation.pages:
+        result["words"] = word_boxes(response.full_text_annotation)
+    if response.face_annotations:
+        result["face"] = response.face_annotations[0]
+
+def annotate_images(images):
+    """Analisa várias imagens em uma única chamada batch_annotate_images do Vision API.
+
+    Recebe um dicionário {chave: (dados_da_imagem, recursos)} e retorna
+    {chave: {"text": ..., "words": ..., "face": ..., "error": ...}}, com o erro de cada imagem
+    reportado separadamente em vez de interromper toda a verificação. Os recursos
+    já presentes no cache não são solicitados novamente.
+    """
+    cache = get_vision_cache()
+    results = {}
+    pending = []
+    requests = []
+    for key, (image_data, features) in images.items():
+        results[key] = {"text": None, "words": None, "face": None, "error": None}
+        missing = []
+        for feature in features:
+            cached = cache.get(cache_key(image_data, feature.name))
+            if cached is None:
+                CACHE_REQUESTS.inc(result="miss")
+                missing.append(feature)
+            else:
+                CACHE_REQUESTS.inc(result="hit")
+                apply_response(results[key], cached)
+        if missing:
+            UPLOAD_BYTES.observe(len(image_data))
+            pending.append((key, image_data, missing))
+            requests.append(vision.AnnotateImageRequest(
+                image=vision.Image(content=image_data),
+                features=[vision.Feature(type_=feature) for feature in missing]
+            ))
+    
+    if not requests:
+        return results
+    
+    try:
+        batch = get_vision_policy().batch_annotate_images(
+            requests=requests,
+            timeout=VISION_REQUEST_TIMEOUT
+        )
+    except Exception as e:
+        # Falha da chamada inteira: reporta o mesmo erro para todas as imagens pendentes
+        for key, _, _ in pending:
+            results[key]["error"] = str(e)
+        return results
+    
+    for (key, image_data, missing), response in zip(pending, batch.responses):
+        error = response_error(response)
+        if error:
+            # Respostas com erro não são armazenadas no cache
+            results[key]["error"] = error
+            continue
+        for feature in missing:
+            cache.set(cache_key(image_data, feature.name), feature_response(response, feature))
+        apply_response(results[key], response)
+    return results
+
+def get_vision_executor():
+    """Retorna o pool de threads compartilhado por todo o processo para chamadas ao Vision API.
+
+    O número de threads limita as chamadas simultâneas em andamento no processo.
+    """
+    global _vision_executor
+    with _resources_lock:
+        if _vision_executor is None:
+            _vision_executor = ThreadPoolExecutor(max_workers=VISION_MAX_IN_FLIGHT, thread_name_prefix="vision")
+        return _vision_executor
+
+def annotate_images_concurrently(images):
+    """Analisa cada imagem em uma chamada separada ao Vision API, executadas em paralelo.
+
+    Aceita e retorna os mesmos formatos de annotate_images; os resultados são
+    reunidos somente depois que todas as chamadas terminam.
+    """
+    executor = get_vision_executor()
+    futures = {
+        key: executor.submit(annotate_images, {key: images[key]})
+        for key in images
+    }
+    
+    results = {}
+    for key, future in futures.items():
+        try:
+            results.update(future.result())
+        except Exception as e:
+            results[key] = {"text": None, "words": None, "face": None, "error": str(e)}
+    return results
+
+# ---------------------
+# Extração e Comparação
+# ---------------------
+
+def face_calibration():
+    """Calibração da similaridade facial: FACE_CALIBRATION ou a padrão de face_similarity."""
+    from face_similarity import DEFAULT_CALIBRATION
+    if not FACE_CALIBRATION:
+        return DEFAULT_CALIBRATION
+    intercept, slope = (float(value) for value in FACE_CALIBRATION.split(","))
+    return intercept, slope
+
+def compare_faces(face1, face2):
+    """Compara dois rostos pela geometria dos pontos de referência do Google Cloud Vision API.
+
+    Retorna (mesma pessoa, similaridade calibrada entre 0 e 1).
+    """
+    if face1 and face2:
+        from face_similarity import face_similarity
+        similarity = face_similarity(face1, face2, face_calibration(), FACE_MIN_LANDMARKS)
+        return similarity >= FACE_MATCH_THRESHOLD, similarity
+    return False, 0
+
+def compare_names(name1, name2):
+    """Compara duas strings usando uma taxa de similaridade simples."""
+    return SequenceMatcher(None, name1.lower(), name2.lower()).ratio()
+
+def normalize_text(text, uppercase=False):
+    """Normaliza o texto removendo espaços extras, quebras de linha e opcionalmente converte para maiúsculas."""
+    if not text:
+        return ""
+    normalized = ' '.join(text.replace('\n', ' ').split())
+    return normalized.upper() if uppercase else normalized
+
+def cpf_candidates(document):
+    """CPFs válidos do texto, ordenados pela proximidade de um rótulo (ver scan_cpfs).
+
+    Com um DocumentIndex, os candidatos vêm dos números já tokenizados no
+    índice, calculados uma única vez e compartilhados pelos extratores.
+    """
+    if isinstance(document, DocumentIndex):
+        return document.memoize("cpfs", lambda text: scan_index_cpfs(document))
+    return scan_cpfs(document)
+
+def extract_cpf_from_text(document):
+    """Extrai CPF do texto do documento: o CPF válido mais próximo de um rótulo de CPF.
+
+    Aceita o texto ou o DocumentIndex do documento.
+    """
+    try:
+        # Uma única passada: o primeiro candidato é o CPF válido mais próximo de um rótulo
+        candidates = cpf_candidates(document)
+        if candidates:
+            return candidates[0]["cpf"]
+    except Exception as e:
+        logger.error("Erro ao extrair CPF: %s", e)
+    return None
+
+def find_cpf_in_text(cpf, document):
+    """Procura um CPF específico entre os CPFs válidos do texto (ou do DocumentIndex).
+
+    Retorna (encontrado, candidatos), onde encontrado é o CPF formatado se
+    estiver no texto e candidatos são todos os CPFs válidos encontrados.
+    """
+    digits = cpf_digits(cpf or "")
+    candidates = cpf_candidates(document)
+    for candidate in candidates:
+        if candidate["digits"] == digits:
+            return candidate["cpf"], candidates
+    return None, candidates
+
+def extract_name_from_text(document):
+    """Extrai nome do texto do documento procurando por campos de nome no índice do documento.
+
+    O nome são as palavras após o campo na mesma linha ou, se o campo estiver
+    sozinho na linha (como no RG e na CNH), as da linha seguinte; a leitura
+    para no fim dessa linha.
+    """
+    index = DocumentIndex.of(document)
+    if not index.tokens:
+        return None
+    
+    try:
+        # Encontra a primeira ocorrência de qualquer campo de nome
+        field_end = None
+        for field in NAME_FIELDS:
+            start = index.find_phrase(field)
+            if start is not None:
+                end = start
+                for _ in field[1:]:
+                    end = index.next_word(end + 1)
+                if field_end is None or start < field_end[0]:
+                    field_end = (start, end)
+        if field_end is None:
+            return None
+        
+        # Extrai o nome das palavras após o campo, até um indicador que não é nome ou o fim da linha
+        name_parts = []
+        i = field_end[1]
+        first = index.next_word(i + 1)
+        if first is None:
+            return None
+        line = index.line_of(first)
+        if line > index.line_of(i) + 1:
+            return None  # Sem nome na linha do campo nem na seguinte
+        line_end = index.line_starts[line + 1] if line + 1 < len(index.line_starts) else len(index.tokens)
+        for _ in range(MAX_NAME_WORDS):
+            i = index.next_word(i + 1)
+            if i is None or i >= line_end:
+                break
+            kind, value, folded = index.tokens[i][:3]
+            if folded.rstrip('.') in NON_NAME_INDICATORS:
+                break
+            # Junta as partes de nomes com apóstrofo (D'ÁVILA), como no texto original
+            while (i + 2 < len(index.tokens) and index.tokens[i + 1][1] == "'"
+                    and index.tokens[i + 2][0] == "word"
+                    and index.token_start(i + 2) == index.tokens[i + 1][3]):
+                value += index.tokens[i + 1][1] + index.tokens[i + 2][1]
+                i += 2
+            value = value.rstrip('.')
+            if kind == "word" and len(value) > 1:
+                name_parts.append(value)
+        
+        if name_parts:
+            return ' '.join(word.capitalize() for word in name_parts)
+                
+    except Exception as e:
+        logger.error("Erro ao extrair nome: %s", e)
+    return None
+
+def extract_address_fields(document):
+    """Extrai os campos estruturados do endereço (logradouro, número, complemento, CEP, bairro e cidade)."""
+    try:
+        return parse_address(document)
+    except Exception as e:
+        logger.error("Erro ao extrair endereço: %s", e)
+    return None
+
+def extract_address_from_text(document):
+    """Extrai endereço do texto do documento no formato "Tipo Nome, Número"."""
+    address = extract_address_fields(document)
+    if address:
+        return format_address(address)
+    return None
+
+def format_cpf(cpf):
+    """Limpa um CPF informado e, se tiver 11 dígitos, formata como XXX.XXX.XXX-XX."""
+    digits = cpf_digits(cpf or "")
+    if len(digits) == 11:
+        return format_cpf_digits(digits)
+    return digits
+
+def match_name_in_text(name, document):
+    """Procura o nome no texto (ou no DocumentIndex), com as partes em ordem e tolerando erros de OCR.
+
+    Retorna o resultado de find_name com o nome procurado e se todas as partes foram encontradas.
+    """
+    match = find_name(name, document)
+    match["searched"] = normalize_text(name, uppercase=True)
+    match["match"] = bool(match["found_parts"]) and not match["missing_parts"]
+    return match
+
+# ---------------------
+# Verificação Completa
+# ---------------------
+
+def normalize_upload(key, image):
+    """Normaliza uma das imagens da verificação ("document", "residence" ou "selfie"); retorna None se houver erro.
+
+    O documento e a selfie passam pela pré-triagem local de rosto, cujo
+    resultado fica em "face" no relatório da imagem; no documento e no
+    comprovante, o recorte do documento para o OCR fica em "document_crop".
+    O hash perceptual da imagem normalizada fica em "hash".
+    """
+    report = process_image(image, target="face" if key == "selfie" else "ocr")
+    if report is None:
+        return None
+    report["hash"] = perceptual_hash(report["data"])
+    if key in FACE_IMAGE_KEYS:
+        report["face"] = prescreen_face(report["data"])
+    if key in DOCUMENT_CROP_KEYS:
+        report["document_crop"] = locate_document(report["data"])
+    return report
+
+def normalize_submission(document, residence, selfie):
+    """Normaliza as três imagens de uma verificação (ver normalize_upload); imagens com erro ficam como None."""
+    return {
+        "document": normalize_upload("document", document),
+        "residence": normalize_upload("residence", residence),
+        "selfie": normalize_upload("selfie", selfie)
+    }
+
+def prescreen_errors(images):
+    """Retorna os erros das imagens recusadas pela pré-triagem de rosto ({} se nenhuma for recusada)."""
+    if FACE_PRESCREEN != "reject":
+        return {}
+    return {
+        key: "Nenhum rosto encontrado na imagem"
+        for key in FACE_IMAGE_KEYS
+        if images.get(key) and images[key].get("face") and not images[key]["face"]["found"]
+    }
+
+def perceptual_hash(image_data):
+    """Hash perceptual da imagem normalizada, em hexadecimal, ou None se estiver desativado ou falhar."""
+    if IMAGE_HASH not in ("phash", "dhash"):
+        return None
+    try:
+        from image_hash import image_hash
+        with timed("image_hash"):
+            return format(image_hash(image_data, IMAGE_HASH), "016x")
+    except Exception as e:
+        logger.error("Erro ao calcular o hash da imagem: %s", e)
+        return None
+
+def get_hash_index():
+    """Retorna o índice de hashes das imagens já enviadas, compartilhado por todo o processo."""
+    global _hash_index
+    with _resources_lock:
+        if _hash_index is None:
+            from image_hash import HashIndex
+            if IMAGE_HASH_PATH and not IMAGE_HASH_KEY:
+                logger.warning("IMAGE_HASH_KEY não definida: as imagens gravadas em %s não serão reconhecidas "
+                               "como do mesmo CPF após reiniciar", IMAGE_HASH_PATH)
+            _hash_index = HashIndex(IMAGE_HASH_PATH or None)
+        return _hash_index
+
+def submitter_ref(input_cpf):
+    """Referência de quem enviou as imagens no índice: o HMAC do CPF com IMAGE_HASH_KEY.
+
+    Um hash simples dos 11 dígitos poderia ser revertido testando todos os CPFs;
+    sem a chave, a referência não revela o CPF.
+    """
+    return hmac.new(_submitter_key, cpf_digits(input_cpf).encode("ascii"), hashlib.sha256).hexdigest()
+
+def image_hashes(images):
+    """Hashes perceptuais das imagens normalizadas ({chave: inteiro}), das que os têm."""
+    return {key: int(report["hash"], 16) for key, report in images.items() if report.get("hash")}
+
+def screen_duplicates(input_cpf, images):
+    """Procura as imagens da verificação entre as já enviadas por outros CPFs.
+
+    Retorna {chave: [{"kind", "distance", "created"}, ...]} com as imagens
+    semelhantes (a até IMAGE_HASH_RADIUS bits) de cada imagem ({} se não houver).
+    Reenvios do mesmo CPF não são reportados. As imagens só entram no índice
+    depois da verificação, em index_submission.
+    """
+    hashes = image_hashes(images)
+    if not hashes:
+        return {}
+    index = get_hash_index()
+    ref = submitter_ref(input_cpf)
+    duplicates = {}
+    with timed("duplicate_lookup"):
+        for key, value in hashes.items():
+            matches = [
+                {"kind": match["kind"], "distance": match["distance"], "created": match["created"]}
+                for match in index.query(value, IMAGE_HASH_RADIUS) if match["ref"] != ref
+            ]
+            if matches:
+                duplicates[key] = matches
+    return duplicates
+
+def index_submission(input_cpf, images, result, document_face=None):
+    """Adiciona ao índice as imagens de uma verificação concluída em que o CPF do documento confere com o informado.
+
+    O rosto do documento (document_face), quando informado, entra na galeria
+    de rostos. Verificações recusadas ou com o CPF errado (por exemplo, um erro
+    de digitação) não entram no índice nem na galeria: o reenvio corrigido não
+    é tomado por imagens de outro CPF.
+    """
+    if "rejected" in result or not result["cpf"]["document"]["match"]:
+        return
+    ref = submitter_ref(input_cpf)
+    hashes = image_hashes(images)
+    if hashes:
+        get_hash_index().add_many((value, ref, key) for key, value in hashes.items())
+    if document_face and FACE_GALLERY_SIZE > 0:
+        from face_similarity import face_descriptor
+        document = face_descriptor(document_face)
+        if document is not None:
+            get_face_gallery().add(document, ref, "document")
+
+def get_face_gallery():
+    """Retorna a galeria dos rostos de documentos já enviados, compartilhada por todo o processo."""
+    global _face_gallery
+    with _resources_lock:
+        if _face_gallery is None:
+            from face_similarity import FaceGallery
+            _face_gallery = FaceGallery(FACE_GALLERY_SIZE, face_calibration(), FACE_MIN_LANDMARKS)
+        return _face_gallery
+
+def screen_face_repeats(input_cpf, selfie_face):
+    """Compara a selfie com os rostos dos documentos enviados por outros CPFs.
+
+    Retorna [{"kind", "similarity", "created"}, ...] com os rostos de
+    similaridade de pelo menos FACE_REPEAT_THRESHOLD ([] se não houver ou se
+    FACE_GALLERY_SIZE for 0). O rosto do documento só entra na galeria depois
+    da verificação, em index_submission.
+    """
+    if FACE_GALLERY_SIZE <= 0:
+        return []
+    from face_similarity import face_descriptor
+    gallery = get_face_gallery()
+    ref = submitter_ref(input_cpf)
+    with timed("face_repeat_lookup"):
+        repeats = []
+        selfie = face_descriptor(selfie_face)
+        if selfie is not None:
+            repeats = [
+                {"kind": match["kind"], "similarity": match["similarity"], "created": match["created"]}
+                for match in gallery.query(selfie, FACE_REPEAT_THRESHOLD) if match["ref"] != ref
+            ]
+    return repeats
+
+def duplicate_errors(duplicates):
+    """Retorna os erros das imagens recusadas por já terem sido enviadas ({} se IMAGE_DUPLICATES não for "reject")."""
+    if IMAGE_DUPLICATES != "reject":
+        return {}
+    return {key: "Imagem já enviada em outra verificação" for key in duplicates}
+
+def image_requests(key, report):
+    """Retorna as requisições ao Vision API de uma imagem normalizada, no formato de annotate_images.
+
+    Quando a pré-triagem recortou um rosto, apenas o recorte é enviado para a
+    detecção facial; quando o documento foi recortado, apenas o documento
+    retificado é enviado para o OCR. Se o texto e o rosto do documento vierem
+    de imagens diferentes, o rosto é solicitado à parte, em "document_face".
+    """
+    if key == "residence":
+        return {"residence": (text_data(report), RESIDENCE_FEATURES)}
+    if key == "selfie":
+        return {"selfie": (face_data(report), SELFIE_FEATURES)}
+    document_text = text_data(report)
+    document_face = face_data(report)
+    if document_text is document_face:
+        return {"document": (document_text, DOCUMENT_FEATURES)}
+    return {
+        "document": (document_text, DOCUMENT_TEXT_FEATURES),
+        "document_face": (document_face, FACE_CROP_FEATURES)
+    }
+
+def annotate_submission(images, mode=None):
+    """Extrai texto e rostos das imagens normalizadas de uma verificação com o Vision API.
+
+    Recebe os relatórios de normalize_submission (ou apenas parte deles) e usa
+    o modo de execução configurado em VISION_EXECUTION_MODE, a menos que mode
+    seja informado. As requisições de cada imagem são as de image_requests.
+    Retorna um resultado por imagem recebida, por exemplo {"document": ..., "residence": ..., "selfie": ...}.
+    """
+    if (mode or VISION_EXECUTION_MODE) == "concurrent":
+        annotate = annotate_images_concurrently
+    else:
+        annotate = annotate_images
+    
+    requests = {}
+    for key, report in images.items():
+        requests.update(image_requests(key, report))
+    
+    annotations = annotate(requests)
+    if "document_face" in annotations:
+        face = annotations.pop("document_face")
+        annotations["document"]["face"] = face["face"]
+        annotations["document"]["error"] = annotations["document"]["error"] or face["error"]
+    return annotations
+
+def evaluate_document(input_name, input_cpf, annotation):
+    """Extrai nome e CPF do documento de identidade e compara com os dados informados.
+
+    Retorna {"name": {"found", "match"}, "cpf": {"found", "match"}}.
+    """
+    # Cada texto é indexado uma única vez e consultado por todos os extratores
+    with timed("index"):
+        index = DocumentIndex(annotation["text"], annotation.get("words"))
+    with timed("extract_name"):
+        doc_name = extract_name_from_text(index)
+    with timed("extract_cpf"):
+        doc_cpf = extract_cpf_from_text(index)
+    input_cpf = format_cpf(input_cpf)
+    return {
+        "name": {
+            "found": doc_name,
+            "match": bool(doc_name) and doc_name.lower() == input_name.lower()
+        },
+        "cpf": {
+            "found": doc_cpf,
+            "match": bool(doc_cpf) and doc_cpf == input_cpf
+        }
+    }
+
+def evaluate_residence(doc_name, input_cpf, annotation):
+    """Procura no comprovante de residência o nome do documento e o CPF informado e extrai o endereço.
+
+    Sem doc_name (nome não encontrado no documento), o nome não é procurado.
+    Retorna {"name": ..., "cpf": {"found", "match"}, "address": {"found", "fields"}}.
+    """
+    with timed("index"):
+        index = DocumentIndex(annotation["text"], annotation.get("words"))
+    with timed("match_name"):
+        residence_name = match_name_in_text(doc_name, index) if doc_name else None
+    with timed("find_cpf"):
+        residence_cpf, residence_cpfs = find_cpf_in_text(format_cpf(input_cpf), index)
+    with timed("extract_address"):
+        address = extract_address_fields(index)
+    return {
+        "name": residence_name,
+        "cpf": {
+            "found": residence_cpf or (residence_cpfs[0]["cpf"] if residence_cpfs else None),
+            "match": residence_cpf is not None
+        },
+        "address": {
+            "found": format_address(address) if address else None,
+            "fields": address
+        }
+    }
+
+def evaluate_faces(document_face, selfie_face):
+    """Compara o rosto do documento com o da selfie.
+
+    Retorna {"detected", "match", "confidence"}, em que confidence é a similaridade calibrada dos rostos.
+    """
+    face_detected = bool(document_face and selfie_face)
+    with timed("compare_faces"):
+        is_identical, confidence = compare_faces(document_face, selfie_face)
+    return {
+        "detected": face_detected,
+        "match": face_detected and is_identical,
+        "confidence": float(confidence)
+    }
+
+def submission_result(document, residence, face, annotations):
+    """Monta o resultado da verificação a partir das partes avaliadas.
+
+    Partes não avaliadas (None, por exemplo etapas interrompidas pela política
+    "fail_fast") aparecem como não encontradas.
+    """
+    document = document or {"name": {"found": None, "match": False}, "cpf": {"found": None, "match": False}}
+    residence = residence or {
+        "name": None,
+        "cpf": {"found": None, "match": False},
+        "address": {"found": None, "fields": None}
+    }
+    return {
+        "name": {"document": document["name"], "residence": residence["name"]},
+        "cpf": {"document": document["cpf"], "residence": residence["cpf"]},
+        "face": face or {"detected": False, "match": False, "confidence": 0.0},
+        "address": residence["address"],
+        "texts": {
+            "document": annotations.get("document", {}).get("text"),
+            "residence": annotations.get("residence", {}).get("text")
+        },
+        "errors": {key: annotation["error"] for key, annotation in annotations.items() if annotation["error"]}
+    }
+
+def evaluate_submission(input_name, input_cpf, annotations):
+    """Extrai nome, CPF e endereço dos textos e compara com os dados informados.
+
+    Retorna um dicionário serializável em JSON com o resultado de cada verificação.
+    """
+    document = evaluate_document(input_name, input_cpf, annotations["document"])
+    residence = evaluate_residence(document["name"]["found"], input_cpf, annotations["residence"])
+    face = evaluate_faces(annotations["document"]["face"], annotations["selfie"]["face"])
+    return submission_result(document, residence, face, annotations)
+
+def input_findings(input_name, input_cpf):
+    """Pendências dos dados informados: nome vazio ou CPF com dígitos verificadores inválidos."""
+    findings = []
+    if not (input_name or "").strip():
+        findings.append("Nome não informado")
+    if not is_valid_cpf(input_cpf or ""):
+        findings.append("CPF informado inválido")
+    return findings
+
+def document_findings(document):
+    """Pendências do documento de identidade que já reprovam a verificação."""
+    findings = []
+    if not document["name"]["found"]:
+        findings.append("Nome não encontrado no documento")
+    if not document["cpf"]["found"]:
+        findings.append("CPF não encontrado no documento")
+    elif not document["cpf"]["match"]:
+        findings.append("CPF do documento diferente do informado")
+    return findings
+
+def image_summary(report):
+    """Retorna o relatório de normalização de uma imagem sem os dados da imagem e dos recortes."""
+    summary = {key: value for key, value in report.items() if key != "data"}
+    for crop in ("face", "document_crop"):
+        if report.get(crop):
+            summary[crop] = {key: value for key, value in report[crop].items() if key != "data"}
+    return summary
+
+def verify_submission(input_name, input_cpf, document, residence, selfie, mode=None, prepared=None):
+    """Executa a verificação completa de uma submissão: normalização, Vision API e comparações.
+
+    As imagens podem ser bytes, caminhos abertos como arquivo ou arquivos carregados.
+    prepared ({chave: id do job}) indica as imagens já processadas por
+    submit_preparation, cujos resultados são reutilizados. O tempo de cada
+    etapa e a memória do processo são registrados nas métricas.
+    """
+    global _first_verification
+    start = time.perf_counter()
+    with timed("verification"):
+        result = _verify_submission(input_name, input_cpf, document, residence, selfie, mode, prepared or {})
+    record_verification(result.get("rejected", "completed"))
+    # A primeira verificação do processo revela o custo que o aquecimento não cobriu.
+    # Verificações concorrentes (jobs da fila) disputam a marcação: só uma a registra.
+    with _resources_lock:
+        first = _first_verification
+        _first_verification = False
+    if first:
+        FIRST_VERIFICATION_SECONDS.set(time.perf_counter() - start)
+    return result
+
+def get_stage_executor():
+    """Retorna o pool de threads que executa as etapas das verificações, compartilhado por todo o processo."""
+    global _stage_executor
+    with _resources_lock:
+        if _stage_executor is None:
+            _stage_executor = ThreadPoolExecutor(max_workers=VERIFICATION_STAGE_WORKERS, thread_name_prefix="stage")
+        return _stage_executor
+
+def stage_annotations(outputs):
+    """Junta os resultados do Vision API de todas as etapas de OCR já concluídas ({imagem: resultado})."""
+    annotations = {}
+    for name in OCR_STAGES:
+        annotations.update(outputs.get(name, {}))
+    return annotations
+
+def verification_stages(input_name, input_cpf, uploads, prepared, mode, policy, cpu_pool=None):
+    """Monta o grafo de etapas de uma verificação (ver run_stages).
+
+    dados informados → imagens → OCR do documento → dados do documento →
+    OCR do comprovante e rosto da selfie → comprovante e comparação facial.
+    Na política "fail_fast", o comprovante e a selfie só vão ao Vision API se
+    os dados informados e os do documento estiverem corretos; na política
+    "collect", as três imagens são analisadas juntas, como em annotate_submission,
+    exceto no modo "concurrent", em que cada imagem tem sua etapa e cada parte
+    do resultado é avaliada assim que suas imagens ficam prontas.
+
+    Com cpu_pool (um pool de processos, na verificação em lote), a
+    normalização e a extração dos dados são executadas nele.
+    """
+    def cpu(function, *args):
+        if cpu_pool is None:
+            return function(*args)
+        # As etapas nos processos filhos são medidas aqui, incluindo a transferência entre processos
+        with timed("cpu_pool"):
+            return cpu_pool.submit(function, *args).result()
+
+    def check_input(outputs):
+        return None, input_findings(input_name, input_cpf)
+
+    def prepare_images(outputs):
+        with timed("prepared_wait"):
+            ready = {
+                key: prepared_image(key, uploads[key], prepared[key])
+                for key in uploads if prepared.get(key)
+            }
+        with timed("normalize"):
+            images = {
+                key: ready[key]["report"] if ready.get(key) else cpu(normalize_upload, key, uploads[key])
+                for key in uploads
+            }
+        failed = [key for key, report in images.items() if report is None]
+        if failed:
+            errors = {key: "Erro ao processar imagem" for key in failed}
+            return {"rejected": {"rejected": "image", "errors": errors}}, list(errors.values())
+        summaries = {key: image_summary(report) for key, report in images.items()}
+
+        # Imagens sem rosto são recusadas sem nenhuma chamada ao Vision API
+        errors = prescreen_errors(images)
+        if errors:
+            return {"rejected": {"rejected": "face", "errors": errors, "images": summaries}}, list(errors.values())
+
+        # Imagens já enviadas por outro CPF podem ser encaminhadas à revisão sem chamar o Vision API
+        duplicates = screen_duplicates(input_cpf, images)
+        errors = duplicate_errors(duplicates)
+        if errors:
+            rejected = {"rejected": "duplicate", "errors": errors, "duplicates": duplicates, "images": summaries}
+            return {"rejected": rejected}, list(errors.values())
+        return {"images": images, "ready": ready, "duplicates": duplicates, "summaries": summaries}, []
+
+    def annotate(keys):
+        def function(outputs):
+            images, ready = outputs["images"]["images"], outputs["images"]["ready"]
+            # Apenas as imagens sem resultado antecipado (ou cujo resultado teve erro) vão ao Vision API
+            annotations = {
+                key: ready[key]["annotation"] for key in keys
+                if ready.get(key) and ready[key]["annotation"] and not ready[key]["annotation"]["error"]
+            }
+            with timed("annotate"):
+                missing = {key: images[key] for key in keys if key not in annotations}
+                if missing:
+                    annotations.update(annotate_submission(missing, mode))
+            return annotations, []
+        return function
+
+    def check_document(outputs):
+        document = cpu(evaluate_document, input_name, input_cpf, stage_annotations(outputs)["document"])
+        return document, document_findings(document)
+
+    def check_residence(outputs):
+        doc_name = outputs["document_fields"]["name"]["found"] if "document_fields" in outputs else None
+        return cpu(evaluate_residence, doc_name, input_cpf, stage_annotations(outputs)["residence"]), []
+
+    def check_faces(outputs):
+        annotations = stage_annotations(outputs)
+        document_face, selfie_face = annotations["document"]["face"], annotations["selfie"]["face"]
+        face = evaluate_faces(document_face, selfie_face)
+        # Selfies semelhantes ao documento de outro CPF indicam a mesma pessoa em várias identidades
+        face["repeats"] = screen_face_repeats(input_cpf, selfie_face)
+        findings = ["Rosto da selfie semelhante ao de um documento enviado com outro CPF"] if face["repeats"] else []
+        return face, findings
+
+    if policy == POLICY_FAIL_FAST:
+        sources = {"document": "document_ocr", "residence": "residence_ocr", "selfie": "selfie_ocr"}
+        ocr = [
+            Stage("document_ocr", annotate(("document",)), requires=("images",)),
+            Stage("residence_ocr", annotate(("residence",)), requires=("images",), gated_by=("document_fields",)),
+            Stage("selfie_ocr", annotate(("selfie",)), requires=("images",), gated_by=("document_fields",))
+        ]
+    elif (mode or VISION_EXECUTION_MODE) == "concurrent":
+        sources = {"document": "document_ocr", "residence": "residence_ocr", "selfie": "selfie_ocr"}
+        ocr = [Stage(sources[key], annotate((key,)), requires=("images",)) for key in uploads]
+    else:
+        sources = {key: "annotate" for key in uploads}
+        ocr = [Stage("annotate", annotate(tuple(uploads)), requires=("images",))]
+    return [
+        Stage("input", check_input),
+        Stage("images", prepare_images, gated_by=("input",)),
+        *ocr,
+        Stage("document_fields", check_document, requires=(sources["document"],)),
+        Stage("residence_fields", check_residence, requires=(sources["residence"],), after=("document_fields",)),
+        Stage("face_match", check_faces, requires=(sources["document"], sources["selfie"]))
+    ]
+
+# Etapa que produz cada seção do resultado exibida durante a verificação
+SECTION_STAGES = {"document": "document_fields", "residence": "residence_fields", "face": "face_match"}
+
+def progress_listener(stages):
+    """Cria o listener de run_stages que publica o progresso parcial da verificação no job atual.
+
+    O progresso é {"stages": {nome: {"status", "seconds"}}, "sections":
+    {"document", "residence", "face"}, "texts": {"document", "residence"}}:
+    as seções e os textos aparecem assim que as etapas que os produzem
+    terminam. Cada publicação é uma cópia nova, pois a interface a lê de
+    outra thread.
+    """
+    progress = {
+        "stages": {stage.name: {"status": "pending", "seconds": 0.0} for stage in stages},
+        "sections": {},
+        "texts": {}
+    }
+    report_progress(progress)
+    sections = {stage: section for section, stage in SECTION_STAGES.items()}
+
+    def listener(name, state, output):
+        progress["stages"] = dict(progress["stages"], **{name: {"status": state["status"], "seconds": state["seconds"]}})
+        if name in sections and output is not None:
+            progress["sections"] = dict(progress["sections"], **{sections[name]: output})
+        if name in OCR_STAGES and output:
+            progress["texts"] = dict(progress["texts"], **{key: annotation["text"] for key, annotation in output.items()})
+        report_progress(dict(progress))
+    return listener
+
+def _verify_submission(input_name, input_cpf, document, residence, selfie, mode, prepared):
+    uploads = {"document": document, "residence": residence, "selfie": selfie}
+    return run_verification(input_name, input_cpf, uploads, mode, prepared, progress=True)
+
+def run_verification(input_name, input_cpf, uploads, mode=None, prepared=None, cpu_pool=None, executor=None,
+                     progress=False, policy=None):
+    """Executa o grafo de etapas de uma verificação (verification_stages) e monta o resultado.
+
+    Usado pelo aplicativo e pela verificação em lote, com a política
+    VERIFICATION_POLICY, a menos que policy seja informada. executor é o pool
+    de threads das etapas (o de get_stage_executor, se não for informado); com
+    progress=True, o progresso é publicado no job atual. Verificações recusadas
+    antes do Vision API retornam {"rejected", "errors", ...}.
+    """
+    policy = policy or VERIFICATION_POLICY
+    stages = verification_stages(input_name, input_cpf, uploads, prepared or {}, mode, policy, cpu_pool)
+    listener = progress_listener(stages) if progress else None
+    outputs, states = run_stages(stages, executor or get_stage_executor(), policy, listener)
+
+    for name, state in states.items():
+        if state["status"] == STAGE_ERROR:
+            raise RuntimeError(f"Erro na etapa {name}: {state['findings'][0]}")
+    if "rejected" in outputs.get("images", {}):
+        return outputs["images"]["rejected"]
+    if states["images"]["status"] == STAGE_SKIPPED:
+        # Dados informados inválidos na política "fail_fast": nenhuma imagem foi processada
+        return {"rejected": "input", "errors": {"input": "; ".join(states["input"]["findings"])}}
+
+    result = submission_result(
+        outputs.get("document_fields"), outputs.get("residence_fields"), outputs.get("face_match"),
+        stage_annotations(outputs)
+    )
+    result["findings"] = {name: state["findings"] for name, state in states.items() if state["findings"]}
+    result["stages"] = {name: {"status": state["status"], "seconds": state["seconds"]} for name, state in states.items()}
+    result["duplicates"] = outputs["images"]["duplicates"]
+    result["images"] = outputs["images"]["summaries"]
+    index_submission(
+        input_cpf, outputs["images"]["images"], result, stage_annotations(outputs).get("document", {}).get("face")
+    )
+    return result
+
+# ---------------------
+# Processamento Antecipado das Imagens Carregadas
+# ---------------------
+
+def get_preparation_queue():
+    """Retorna a fila do processamento antecipado das imagens, compartilhada por todo o processo.
+
+    É separada da fila de verificações, pois as verificações aguardam as
+    imagens em andamento: na mesma fila, poderiam ocupar todas as threads.
+    """
+    global _preparation_queue
+    with _resources_lock:
+        if _preparation_queue is None:
+            _preparation_queue = JobQueue(
+                max_workers=PREPARATION_WORKERS,
+                max_pending=PREPARATION_QUEUE_SIZE,
+                result_ttl=PREPARATION_TTL
+            )
+        return _preparation_queue
+
+def preparation_key(key, image_data):
+    """Chave do processamento antecipado de uma imagem: o campo e o hash do conteúdo."""
+    return "{}:{}".format(key, hashlib.sha256(image_data).hexdigest())
+
+def annotates_on_upload(key):
+    """Indica se o processamento antecipado já envia a imagem ao Vision API.
+
+    Com IMAGE_DUPLICATES="reject", nenhuma imagem vai ao Vision API antes da
+    busca por imagens já enviadas; na política "fail_fast", o comprovante e a
+    selfie só vão depois da análise do documento. Nesses casos a imagem é
+    apenas normalizada, e a verificação decide se a analisa.
+    """
+    if IMAGE_DUPLICATES == "reject":
+        return False
+    return VERIFICATION_POLICY != POLICY_FAIL_FAST or key == "document"
+
+def prepare_image(key, image_data):
+    """Normaliza uma imagem e, quando annotates_on_upload permite, já a analisa com o Vision API.
+
+    Retorna {"report": relatório de normalize_upload (None se houver erro),
+    "annotation": resultado de annotate_images (None se a imagem foi recusada
+    pela pré-triagem de rosto ou não foi analisada)}.
+    """
+    with timed("prepare"):
+        report = normalize_upload(key, image_data)
+        if report is None or not annotates_on_upload(key) or prescreen_errors({key: report}):
+            return {"report": report, "annotation": None}
+        return {"report": report, "annotation": annotate_submission({key: report})[key]}
+
+def submit_preparation(key, image):
+    """Inicia em segundo plano o processamento de uma imagem assim que é carregada.
+
+    Retorna o id do job, ou None se o processamento antecipado estiver
+    desativado ou a fila estiver cheia (a imagem é então processada na
+    verificação). A mesma imagem carregada novamente reutiliza o mesmo job.
+    """
+    if not PREPARE_UPLOADS:
+        return None
+    image_data = read_image_bytes(image)
+    return get_preparation_queue().submit(preparation_key(key, image_data), prepare_image, key, image_data)
+
+def prepared_image(key, image, job_id):
+    """Retorna o resultado do processamento antecipado da imagem, aguardando-o se ainda estiver em andamento.
+
+    Retorna None se o job não existir mais, tiver falhado ou não corresponder
+    ao conteúdo atual da imagem (por exemplo, se o arquivo foi substituído).
+    """
+    job = get_preparation_queue().wait(job_id, PREPARATION_WAIT)
+    if job is None or job["status"] != JOB_DONE:
+        return None
+    if job["key"] != preparation_key(key, read_image_bytes(image)):
+        return None
+    return job["result"]
+
+# ---------------------
+# Verificação em Segundo Plano
+# ---------------------
+
+def get_job_queue():
+    """Retorna a fila de verificações em segundo plano compartilhada por todo o processo."""
+    global _job_queue
+    with _resources_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                max_workers=VERIFICATION_WORKERS,
+                max_pending=VERIFICATION_QUEUE_SIZE,
+                result_ttl=VERIFICATION_JOB_TTL
+            )
+        return _job_queue
+
+def submission_key(input_name, input_cpf, images):
+    """Gera a chave de deduplicação de uma verificação a partir das entradas e do conteúdo das imagens."""
+    digest = hashlib.sha256()
+    for value in (normalize_text(input_name, uppercase=True), format_cpf(input_cpf)):
+        digest.update(value.encode("utf-8") + b"\0")
+    for data in images:
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+def submit_verification(input_name, input_cpf, document, residence, selfie, mode=None, prepared=None):
+    """Enfileira uma verificação completa e retorna o id do job, ou None se a fila estiver cheia.
+
+    Os bytes das imagens são lidos antes de enfileirar, para que o job não
+    dependa dos arquivos carregados da sessão. prepared são os jobs de
+    submit_preparation das imagens (ver verify_submission). Verificações
+    idênticas em andamento ou já concluídas reutilizam o mesmo job.
+    """
+    images = [read_image_bytes(image) for image in (document, residence, selfie)]
+    key = submission_key(input_name, input_cpf, images)
+    return get_job_queue().submit(key, verify_submission, input_name, input_cpf, *images, mode, prepared)
+
+def get_verification(job_id):
+    """Retorna o estado de um job de verificação (ver JobQueue.get), ou None se não existir."""
+    return get_job_queue().get(job_id)
+
+# ---------------------
+# Métricas de Desempenho
+# ---------------------
+
+def start_metrics_exporter():
+    """Inicia a exportação das métricas configurada em METRICS_PORT e METRICS_FILE (uma única vez por processo)."""
+    start_exporter(port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL)
+
+def metrics_snapshot():
+    """Resumo das métricas do processo para o painel administrativo.
+
+    Retorna os tempos por etapa ({etapa: {"count", "mean", "p50", "p95"}}, em
+    segundos), os contadores do cache e da política de chamadas, o estado dos
+    canais do Vision API, da fila de verificações e do processamento antecipado
+    das imagens, o estado da inicialização e a memória de pico.
+    """
+    stages = {
+        dict(labels)["stage"]: summary
+        for labels, summary in STAGE_SECONDS.summary().items()
+    }
+    policy = _vision_policy
+    queue = _job_queue
+    preparation = _preparation_queue
+    return {
+        "stages": dict(sorted(stages.items())),
+        "cache": get_vision_cache().stats(),
+        "policy": policy.stats() if policy else None,
+        "client": vision_client_health(),
+        "queue": queue.stats() if queue else None,
+        "preparation": preparation.stats() if preparation else None,
+        "startup": readiness(),
+        "peak_rss": peak_rss()
+    }
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from google.cloud import vision
+
+# ---------------------
+# Gravação e Reprodução de Respostas do Vision API
+# ---------------------
+
+# Código gRPC NOT_FOUND, usado nas respostas de requisições que não foram gravadas
+NOT_FOUND_CODE = 5
+
+def request_hash(request):
+    """Gera a chave de uma requisição a partir do seu conteúdo serializado (imagem e recursos)."""
+    return hashlib.sha256(vision.AnnotateImageRequest.serialize(request)).hexdigest()
+
+class ResponseStore:
+    """Arquivo SQLite com as respostas do Vision API por requisição, em protobuf compactado com zlib."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vision_responses "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        """Retorna a resposta gravada para a chave, ou None se não existir."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM vision_responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return vision.AnnotateImageResponse.deserialize(zlib.decompress(row[0]))
+
+    def set_many(self, items):
+        """Grava vários pares (chave, resposta) em uma única transação."""
+        now = time.time()
+        rows = [
+            (key, zlib.compress(vision.AnnotateImageResponse.serialize(response)), now)
+            for key, response in items
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vision_responses (key, value, created) VALUES (?, ?, ?)",
+                rows
+            )
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM vision_responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class RecordingClient:
+    """Envolve um cliente do Vision API e grava cada resposta recebida no ResponseStore.
+
+    Tem a mesma interface de batch_annotate_images; as chamadas continuam indo
+    ao cliente envolvido (normalmente o VisionClientPool).
+    """
+
+    def __init__(self, client, store):
+        self.client = client
+        self.store = store
+        self.recorded = 0
+
+    def batch_annotate_images(self, requests, **kwargs):
+        batch = self.client.batch_annotate_images(requests=requests, **kwargs)
+        self.store.set_many(
+            (request_hash(request), response)
+            for request, response in zip(requests, batch.responses)
+        )
+        self.recorded += len(batch.responses)
+        return batch
+
+class ReplayClient:
+    """Responde batch_annotate_images com as respostas gravadas, sem nenhum acesso à rede.
+
+    Requisições sem resposta gravada recebem uma resposta com erro NOT_FOUND,
+    reportada como erro da imagem (como os erros do Vision API), sem interromper
+    as demais imagens da chamada.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def batch_annotate_images(self, requests, **kwargs):
+        responses = []
+        for request in requests:
+            response = self.store.get(request_hash(request))
+            with self._lock:
+                if response is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if response is None:
+                response = vision.AnnotateImageResponse(error={
+                    "code": NOT_FOUND_CODE,
+                    "message": "Resposta não gravada para esta imagem (modo de reprodução)"
+                })
+            responses.append(response)
+        return vision.BatchAnnotateImagesResponse(responses=responses)
+
+    def stats(self):
+        """Retorna as requisições respondidas e as não encontradas entre as gravadas."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------------
+# Cache de Resultados do Vision API
+# ---------------------
+
+def cache_key(image_data, feature):
+    """Gera a chave do cache a partir do hash do conteúdo da imagem e do tipo de recurso."""
+    return f"{hashlib.sha256(image_data).hexdigest()}:{feature}"
+
+
+class VisionCache:
+    """Cache em dois níveis para respostas do Vision API, endereçado pelo conteúdo da imagem.
+
+    O primeiro nível é um LRU em memória com limite de entradas e expiração por
+    tempo (TTL). O segundo nível, opcional, é um banco SQLite em disco que pode
+    ser compartilhado entre sessões e reinícios do aplicativo.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, disk_path=None, disk_ttl=7 * 24 * 3600,
+                 serialize=pickle.dumps, deserialize=pickle.loads):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS vision_cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            # Remove as entradas expiradas de execuções anteriores
+            self._db.execute(
+                "DELETE FROM vision_cache WHERE created <= ?",
+                (time.time() - self.disk_ttl,)
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Retorna o valor armazenado para a chave, ou None se não existir ou tiver expirado."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM vision_cache WHERE key = ? AND created > ?",
+                    (key, now - self.disk_ttl)
+                ).fetchone()
+                if row is not None:
+                    value = self.deserialize(row[0])
+                    self._store(key, value, now)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """Armazena o valor nos dois níveis do cache."""
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO vision_cache (key, value, created) VALUES (?, ?, ?)",
+                    (key, self.serialize(value), now)
+                )
+                self._db.commit()
+
+    def _store(self, key, value, now):
+        """Insere no LRU em memória, descartando as entradas menos usadas além do limite."""
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Retorna os contadores de acertos e falhas do cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,191 @@
+import itertools
+import logging
+import threading
+import time
+import google.auth
+import grpc
+from google.api_core import exceptions as core_exceptions
+from google.api_core import retry as retries
+from google.cloud import vision
+from google.cloud.vision_v1.services.image_annotator.transports import ImageAnnotatorGrpcTransport
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+
+logger = logging.getLogger(__name__)
+
+# ---------------------
+# Pool de Canais do Vision API
+# ---------------------
+
+# Opções dos canais gRPC: keepalive para manter as conexões aquecidas entre as
+# verificações e um pool de subcanais próprio por canal, para que cada canal
+# abra sua própria conexão em vez de compartilhar a mesma
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_receive_message_length", 64 * 1024 * 1024),
+    ("grpc.use_local_subchannel_pool", 1)
+]
+
+# Novas tentativas da biblioteca para erros transitórios, limitadas ao tempo total da
+# chamada: o padrão da biblioteca insiste por até 600 segundos, o que ignoraria o
+# tempo limite configurado e impediria a reconexão do canal
+DEFAULT_RETRY = retries.Retry(
+    initial=0.1,
+    maximum=60.0,
+    multiplier=1.3,
+    predicate=retries.if_exception_type(core_exceptions.DeadlineExceeded, core_exceptions.ServiceUnavailable)
+)
+
+# Erros que indicam um canal quebrado: o canal é recriado antes da próxima chamada
+RECONNECT_ERRORS = (core_exceptions.ServiceUnavailable, core_exceptions.Unauthenticated)
+
+def load_credentials(credentials_info):
+    """Cria as credenciais a partir das informações da conta de serviço em memória, ou usa as credenciais padrão.
+
+    As credenciais padrão também são resolvidas aqui, e não pelo canal, para que
+    o token possa ser obtido antes da primeira chamada (ver VisionClientPool.authenticate).
+    """
+    if not credentials_info:
+        credentials, _ = google.auth.default(scopes=ImageAnnotatorGrpcTransport.AUTH_SCOPES)
+        return credentials
+    return service_account.Credentials.from_service_account_info(
+        dict(credentials_info),
+        scopes=ImageAnnotatorGrpcTransport.AUTH_SCOPES
+    )
+
+def channel_ready(channel, timeout):
+    """Verifica se o canal está conectado, aguardando até timeout segundos (e iniciando a conexão se necessário)."""
+    future = grpc.channel_ready_future(channel)
+    try:
+        future.result(timeout=timeout)
+        return True
+    except grpc.FutureTimeoutError:
+        future.cancel()
+        return False
+
+class VisionClientPool:
+    """Conjunto de clientes do Vision API, cada um com seu próprio canal gRPC, usados em rodízio.
+
+    Oferece o mesmo batch_annotate_images do ImageAnnotatorClient, de modo que
+    pode substituí-lo diretamente. As credenciais são criadas uma única vez a
+    partir das informações em memória (sem arquivo temporário). Um canal que
+    falha com erro de conexão é recriado antes de ser usado novamente.
+    """
+
+    def __init__(self, credentials_info=None, size=1, host=ImageAnnotatorGrpcTransport.DEFAULT_HOST):
+        self.host = host
+        self.size = max(1, size)
+        self._credentials = load_credentials(credentials_info)
+        self._lock = threading.Lock()
+        self._channels = [None] * self.size
+        self._clients = [None] * self.size
+        self._broken = [False] * self.size
+        self._next = itertools.cycle(range(self.size))
+        self.reconnects = 0
+        self.last_error = None
+        self.last_error_time = None
+        for index in range(self.size):
+            self._connect(index)
+
+    def _connect(self, index):
+        """Cria (ou recria) o canal e o cliente de uma posição do pool."""
+        channel = ImageAnnotatorGrpcTransport.create_channel(
+            self.host,
+            credentials=self._credentials,
+            options=CHANNEL_OPTIONS
+        )
+        client = vision.ImageAnnotatorClient(transport=ImageAnnotatorGrpcTransport(host=self.host, channel=channel))
+        old_channel = self._channels[index]
+        self._channels[index] = channel
+        self._clients[index] = client
+        self._broken[index] = False
+        if old_channel is not None:
+            old_channel.close()
+
+    def _acquire(self):
+        """Escolhe o próximo canal do rodízio, recriando-o se estiver marcado como quebrado."""
+        with self._lock:
+            index = next(self._next)
+            if self._broken[index]:
+                self._connect(index)
+                self.reconnects += 1
+            return index, self._clients[index]
+
+    def batch_annotate_images(self, requests, **kwargs):
+        """Envia as requisições pelo próximo canal do pool (mesma assinatura do ImageAnnotatorClient)."""
+        index, client = self._acquire()
+        if "timeout" in kwargs and "retry" not in kwargs:
+            kwargs["retry"] = DEFAULT_RETRY.with_timeout(kwargs["timeout"])
+        try:
+            return client.batch_annotate_images(requests=requests, **kwargs)
+        except (*RECONNECT_ERRORS, core_exceptions.RetryError) as e:
+            # Quando as novas tentativas se esgotam, o erro original fica em e.cause
+            if isinstance(e, core_exceptions.RetryError) and not isinstance(e.cause, RECONNECT_ERRORS):
+                raise
+            with self._lock:
+                self._broken[index] = True
+                self.last_error = str(e)
+                self.last_error_time = time.time()
+            logger.warning("Canal %d do Vision API será recriado: %s", index, e)
+            raise
+
+    def reconnect(self):
+        """Recria todos os canais do pool."""
+        with self._lock:
+            for index in range(self.size):
+                self._connect(index)
+            self.reconnects += self.size
+
+    def authenticate(self):
+        """Obtém o token OAuth das credenciais, se ainda não houver um válido, antes da primeira chamada."""
+        with self._lock:
+            if not self._credentials.valid:
+                self._credentials.refresh(Request())
+
+    def warmup(self, timeout=10):
+        """Obtém o token OAuth e estabelece as conexões (incluindo o handshake TLS) antes da primeira chamada.
+
+        Retorna True se o token foi obtido e todos os canais ficaram prontos dentro do tempo limite.
+        """
+        ready = True
+        try:
+            self.authenticate()
+        except Exception as e:
+            logger.warning("Não foi possível obter o token do Vision API: %s", e)
+            with self._lock:
+                self.last_error = str(e)
+                self.last_error_time = time.time()
+            ready = False
+        for index, channel in enumerate(list(self._channels)):
+            if not channel_ready(channel, timeout):
+                logger.warning("Canal %d do Vision API não ficou pronto em %ss", index, timeout)
+                ready = False
+        return ready
+
+    def health(self, timeout=0):
+        """Retorna o estado do pool: canais prontos, canais a recriar, reconexões e o último erro.
+
+        Com timeout maior que zero, aguarda cada canal ficar pronto por até timeout segundos.
+        """
+        ready = sum(channel_ready(channel, timeout) for channel in list(self._channels))
+        with self._lock:
+            broken = sum(self._broken)
+            return {
+                "healthy": broken == 0,
+                "channels": self.size,
+                "ready": ready,
+                "broken": broken,
+                "reconnects": self.reconnects,
+                "last_error": self.last_error,
+                "last_error_time": self.last_error_time
+            }
+
+    def close(self):
+        """Fecha todos os canais do pool."""
+        with self._lock:
+            for channel in self._channels:
+                if channel is not None:
+                    channel.close()